@@ -1,10 +1,9 @@
 from django.contrib import admin
-from django.http import HttpResponse
-from django.template.loader import render_to_string
-from django.http import HttpResponse
-from weasyprint import HTML
-from django.template.loader import render_to_string
-import tempfile
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path
 from .models import (
     User,
     Restaurant,
@@ -14,7 +13,9 @@ from .models import (
     OrderMenuItem,
     Courier,
     Delivery,
+    OrderPdfExport,
 )
+from .tasks import export_orders_pdf_task
 from import_export.admin import ExportMixin
 from django.utils.html import format_html
 from django.urls import reverse
@@ -24,8 +25,8 @@ from simple_history.admin import SimpleHistoryAdmin
 class OrderMenuItemInline(admin.TabularInline):
     model = OrderMenuItem
     extra = 1
-    fields = ("menu_item", "quantity", "price")
-    readonly_fields = ("price",)
+    fields = ("menu_item", "quantity", "unit_price", "price")
+    readonly_fields = ("unit_price", "price")
 
     @admin.display(description="Цена")
     def price(self, obj):
@@ -50,22 +51,30 @@ class OrderAdmin(SimpleHistoryAdmin, ExportMixin):
     actions = ["export_as_pdf"]
 
     def export_as_pdf(self, request, queryset):
-        """Генерация PDF для выбранных заказов."""
-        orders = queryset
-        html_string = render_to_string("Delivery/admin/orders_pdf_template.html", {"orders": orders})
-        html = HTML(string=html_string)
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            html.write_pdf(target=tmp_file.name)
-            with open(tmp_file.name, "rb") as pdf:
-                response = HttpResponse(pdf.read(), content_type="application/pdf")
-                response["Content-Disposition"] = "inline; filename=orders.pdf"
-                return response
+        """
+        Ставит выгрузку выбранных заказов в PDF в очередь. Файл формируется
+        в фоне и появляется в разделе «PDF-выгрузки заказов».
+        """
+        export = OrderPdfExport.objects.create(
+            order_ids=list(queryset.values_list("pk", flat=True)),
+            created_by=request.user,
+        )
+        transaction.on_commit(lambda: export_orders_pdf_task.delay(export.pk))
+
+        url = reverse("admin:Delivery_orderpdfexport_change", args=[export.pk])
+        self.message_user(
+            request,
+            format_html(
+                'Выгрузка {} заказов поставлена в очередь: <a href="{}">{}</a>',
+                len(export.order_ids),
+                url,
+                export,
+            ),
+        )
 
     export_as_pdf.short_description = "Экспортировать в PDF"
 
 
-
 @admin.register(MenuItem)
 class MenuItemAdmin(SimpleHistoryAdmin, ExportMixin):
     list_display = ("name", "price", "is_available", "restaurant")
@@ -100,8 +109,8 @@ class UserAdmin(SimpleHistoryAdmin):
 
 @admin.register(Courier)
 class CourierAdmin(SimpleHistoryAdmin):
-    list_display = ("user", "vehicle_type")
-    list_filter = ("vehicle_type",)
+    list_display = ("user", "vehicle_type", "is_on_shift")
+    list_filter = ("vehicle_type", "is_on_shift")
 
 
 @admin.register(Delivery)
@@ -109,3 +118,57 @@ class DeliveryAdmin(SimpleHistoryAdmin):
     list_display = ("order", "courier", "delivery_time", "delivery_status")
     list_filter = ("delivery_status",)
     search_fields = ("order__id", "courier__user__username")
+
+
+@admin.register(OrderPdfExport)
+class OrderPdfExportAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "orders_count", "created_by", "created_at", "download")
+    list_filter = ("status",)
+    readonly_fields = (
+        "status",
+        "orders_count",
+        "download",
+        "error",
+        "created_by",
+        "created_at",
+        "finished_at",
+    )
+    exclude = ("order_ids", "file")
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Заказов")
+    def orders_count(self, obj):
+        return len(obj.order_ids)
+
+    @admin.display(description="Файл")
+    def download(self, obj):
+        if obj.status != "done" or not obj.file:
+            return "-"
+        url = reverse("admin:Delivery_orderpdfexport_download", args=[obj.pk])
+        return format_html('<a href="{}">Скачать PDF</a>', url)
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="Delivery_orderpdfexport_download",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def download_view(self, request, pk):
+        """Отдаёт файл выгрузки из закрытого хранилища сотрудникам с правом просмотра."""
+        export = get_object_or_404(OrderPdfExport, pk=pk)
+        if not self.has_view_permission(request, export):
+            raise PermissionDenied
+        if export.status != "done" or not export.file:
+            raise Http404("Файл выгрузки ещё не готов.")
+        return FileResponse(
+            export.file.open("rb"),
+            as_attachment=True,
+            filename=f"orders_{export.pk}.pdf",
+            content_type="application/pdf",
+        )
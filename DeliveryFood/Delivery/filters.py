@@ -0,0 +1,23 @@
+from rest_framework import filters
+
+from .services.search import filter_by_search
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter, который ищет по полнотекстовому индексу вместо icontains
+    по search_fields. Вид документов задаётся атрибутом search_index_kind
+    представления. Без явной сортировки (?ordering=) результаты идут по
+    релевантности.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        keep_order = any(
+            issubclass(backend, filters.OrderingFilter)
+            and request.query_params.get(backend.ordering_param)
+            for backend in view.filter_backends
+        )
+        return filter_by_search(queryset, view.search_index_kind, " ".join(terms), keep_order)
@@ -0,0 +1,47 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from Delivery.services.images import available_variants, generate_many, iter_image_names
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит уменьшенные копии (WebP и JPEG) для уже загруженных изображений "
+        "ресторанов, блюд и заказов в пуле процессов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Число процессов (по умолчанию по числу ядер)"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Сколько изображений держать в обработке одновременно",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Перестроить и уже готовые копии"
+        )
+
+    def handle(self, *args, **options):
+        names = iter_image_names()
+        if not options["force"]:
+            names = (name for name in names if not available_variants(name))
+
+        processed = 0
+        errors = 0
+        while True:
+            batch = list(islice(names, options["batch_size"]))
+            if not batch:
+                break
+            done, failed = generate_many(batch, workers=options["workers"])
+            processed += len(done)
+            errors += len(failed)
+            for name, error in failed.items():
+                self.stderr.write(f"{name}: {error}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Обработано изображений: {processed}, ошибок: {errors}")
+        )
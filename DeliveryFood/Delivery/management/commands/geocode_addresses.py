@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from simple_history.utils import bulk_update_with_history
+
+from Delivery.models import Restaurant, User
+from Delivery.services import geo
+
+
+class Command(BaseCommand):
+    help = "Заполняет координаты ресторанов и пользователей по адресам через геокодер"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Пересчитать и уже заполненные координаты"
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Размер пачки")
+
+    def geocode_model(self, model, force, batch_size):
+        objects = model.objects.exclude(address__isnull=True).exclude(address="")
+        if not force:
+            objects = objects.filter(latitude__isnull=True)
+
+        changed = []
+        updated = 0
+        for instance in objects.order_by("pk").iterator(chunk_size=batch_size):
+            if force:
+                instance.latitude = instance.longitude = None
+            if geo.fill_coordinates(instance):
+                changed.append(instance)
+            if len(changed) >= batch_size:
+                updated += self.save_batch(model, changed)
+                changed = []
+        return updated + self.save_batch(model, changed)
+
+    def save_batch(self, model, instances):
+        # Массовое обновление минует сигналы; у пользователей ведётся история
+        if model is User:
+            bulk_update_with_history(instances, User, ["latitude", "longitude"])
+        else:
+            model.objects.bulk_update(instances, ["latitude", "longitude"])
+        return len(instances)
+
+    def handle(self, *args, **options):
+        restaurants = self.geocode_model(Restaurant, options["force"], options["batch_size"])
+        users = self.geocode_model(User, options["force"], options["batch_size"])
+        if restaurants:
+            geo.invalidate()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Координаты заполнены: ресторанов {restaurants}, пользователей {users}"
+            )
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Delivery.models import Restaurant
+from Delivery.services.menu_import import MenuImportError, import_menu, iter_file_rows
+
+
+class Command(BaseCommand):
+    help = "Импортирует меню ресторана из файла CSV или XLSX"
+
+    def add_arguments(self, parser):
+        parser.add_argument("restaurant_id", type=int, help="ID ресторана")
+        parser.add_argument("path", help="Путь к файлу .csv или .xlsx")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Количество блюд в одной пачке вставки/обновления",
+        )
+
+    def handle(self, *args, **options):
+        if not Restaurant.objects.filter(pk=options["restaurant_id"]).exists():
+            raise CommandError(f"Ресторан {options['restaurant_id']} не найден")
+
+        with open(options["path"], "rb") as fileobj:
+            try:
+                result = import_menu(
+                    options["restaurant_id"],
+                    iter_file_rows(fileobj, options["path"]),
+                    batch_size=options["batch_size"],
+                )
+            except MenuImportError as exc:
+                raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stdout.write(f"Строка {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Добавлено: {result.created}, обновлено: {result.updated}, "
+                f"без изменений: {result.unchanged}, ошибок: {len(result.errors)}"
+            )
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Delivery.services.menu_stats import find_mismatches, rebuild_all_stats
+
+
+class Command(BaseCommand):
+    help = "Пересобирает сводки меню ресторанов и сверяет их с живым агрегатом по блюдам и заказам"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только сверить сводки, не пересобирая их",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            count = rebuild_all_stats()
+            self.stdout.write(f"Пересобрано сводок: {count}")
+
+        mismatches = find_mismatches()
+        for restaurant_id, field, saved, actual in mismatches:
+            self.stdout.write(
+                f"Ресторан {restaurant_id}: {field} в сводке {saved}, по факту {actual}"
+            )
+        if mismatches:
+            raise CommandError(f"Расхождений в сводках: {len(mismatches)}")
+        self.stdout.write(self.style.SUCCESS("Сводки совпадают с блюдами и заказами"))
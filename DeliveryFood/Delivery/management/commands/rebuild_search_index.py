@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from Delivery.services.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс ресторанов, блюд и типов кухни"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--if-empty",
+            action="store_true",
+            help="Строить индекс, только если он пуст (например, при первом запуске)",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Размер пачки")
+
+    def handle(self, *args, **options):
+        if options["if_empty"] and get_backend().count():
+            self.stdout.write("Индекс уже заполнен")
+            return
+        total = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано документов: {total}"))
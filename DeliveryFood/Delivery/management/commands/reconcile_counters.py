@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Delivery.services.counters import find_mismatches, repair
+
+KIND_LABELS = {
+    "site": "Счётчик",
+    "restaurant": "Заказы ресторана",
+    "dish": "Заказы блюда",
+    "courier": "Доставки курьера",
+    "courier-user": "Активность курьера",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет счётчики главной страницы (рестораны, блюда, заказы, заказы "
+        "ресторанов и блюд) и статистики курьеров с таблицами и исправляет расхождения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только сверить счётчики, не исправляя их",
+        )
+
+    def handle(self, *args, **options):
+        mismatches = find_mismatches()
+        for kind, key, saved, actual in mismatches:
+            self.stdout.write(f"{KIND_LABELS[kind]} {key}: сохранено {saved}, по факту {actual}")
+
+        if options["check"]:
+            if mismatches:
+                raise CommandError(f"Расхождений в счётчиках: {len(mismatches)}")
+        elif mismatches:
+            self.stdout.write(f"Исправлено счётчиков: {repair(mismatches)}")
+            return
+        self.stdout.write(self.style.SUCCESS("Счётчики совпадают с таблицами"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from Delivery.services.dish_popularity import rebuild_buckets, refresh_windows
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает скользящие окна рейтинга популярных блюд "
+        "(то же, что периодическая задача Celery)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересобрать почасовые корзины заново по позициям заказов",
+        )
+
+    def handle(self, *args, **options):
+        result = rebuild_buckets() if options["full"] else refresh_windows()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обновлено блюд: {result.updated_dishes}, "
+                f"удалено устаревших корзин: {result.pruned_buckets}"
+            )
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from Delivery.services.cuisine_popularity import (
+    rebuild_cuisine_popularity,
+    rollup_cuisine_popularity,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сдвигает окна популярности кухонь по почасовым корзинам "
+        "(то же, что периодическая задача Celery)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересобрать почасовые корзины заново по заказам за самое длинное окно",
+        )
+
+    def handle(self, *args, **options):
+        rollup = rebuild_cuisine_popularity if options["full"] else rollup_cuisine_popularity
+        result = rollup()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обновлено связей ресторанов и кухонь: {result.updated_links}, "
+                f"удалено устаревших корзин: {result.pruned_buckets}"
+            )
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from Delivery.services.overdue import sweep_overdue_orders
+
+
+class Command(BaseCommand):
+    help = "Обновляет флаг просроченных заказов (то же, что периодическая задача Celery)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=None, help="Размер пачки")
+
+    def handle(self, *args, **options):
+        marked, cleared = sweep_overdue_orders(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Помечено просроченных: {marked}, снят флаг: {cleared}")
+        )
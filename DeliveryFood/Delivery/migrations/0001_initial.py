@@ -0,0 +1,332 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:14
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import simple_history.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Courier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vehicle_type', models.CharField(choices=[('bike', 'Велосипед'), ('car', 'Машина'), ('scooter', 'Скутер')], max_length=20, verbose_name='Тип транспорта')),
+                ('documents', models.FileField(blank=True, null=True, upload_to='documents/')),
+            ],
+            options={
+                'verbose_name': 'Курьер',
+                'verbose_name_plural': 'Курьеры',
+            },
+        ),
+        migrations.CreateModel(
+            name='MenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Название блюда')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Описание блюда')),
+                ('is_available', models.BooleanField(default=True, verbose_name='Доступно ли блюдо')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='menu_images/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])], verbose_name='Изображение блюда')),
+            ],
+            options={
+                'verbose_name': 'Блюдо',
+                'verbose_name_plural': 'Блюда',
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link_dogovor', models.URLField(blank=True, null=True, verbose_name='Ссылка на договор')),
+                ('order_date', models.DateTimeField(auto_now_add=True, verbose_name='Дата заказа')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Общая стоимость')),
+                ('status', models.CharField(choices=[('new', 'Новый'), ('preparing', 'Готовится'), ('delivering', 'Доставляется'), ('completed', 'Завершён')], default='new', max_length=20, verbose_name='Статус заказа')),
+                ('additional_notes', models.TextField(blank=True, null=True, verbose_name='Дополнительные примечания')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='order_images/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])], verbose_name='Изображение к заказу')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Заказ',
+                'verbose_name_plural': 'Заказы',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Restaurant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Название ресторана')),
+                ('address', models.TextField(verbose_name='Адрес ресторана')),
+                ('phone', models.CharField(max_length=18, verbose_name='Телефон ресторана')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='restaurant_images/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])], verbose_name='Фотография ресторана')),
+            ],
+            options={
+                'verbose_name': 'Ресторан',
+                'verbose_name_plural': 'Рестораны',
+            },
+        ),
+        migrations.CreateModel(
+            name='TypeCuisine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Название типа кухни')),
+            ],
+            options={
+                'verbose_name': 'Тип кухни',
+                'verbose_name_plural': 'Типы кухонь',
+            },
+        ),
+        migrations.CreateModel(
+            name='Delivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_time', models.DateTimeField(blank=True, null=True, verbose_name='Время доставки')),
+                ('delivery_status', models.CharField(choices=[('in_progress', 'В процессе'), ('delivered', 'Доставлено')], default='in_progress', max_length=20, verbose_name='Статус доставки')),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='Delivery.courier', verbose_name='Курьер')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='delivery', to='Delivery.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Доставка',
+                'verbose_name_plural': 'Доставки',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderMenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Количество')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='Delivery.menuitem', verbose_name='Блюдо')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='Delivery.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Позиция в заказе',
+                'verbose_name_plural': 'Позиции в заказе',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='Delivery.restaurant', verbose_name='Ресторан'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_items', to='Delivery.restaurant', verbose_name='Ресторан'),
+        ),
+        migrations.CreateModel(
+            name='RestaurantCuisine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('popularity', models.PositiveIntegerField(default=0, verbose_name='Популярность блюда')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='restaurant_cuisines', to='Delivery.restaurant', verbose_name='Ресторан')),
+                ('cuisine_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='restaurant_cuisines', to='Delivery.typecuisine', verbose_name='Тип кухни')),
+            ],
+            options={
+                'verbose_name': 'Связь ресторана и кухни',
+                'verbose_name_plural': 'Связи ресторанов и кухонь',
+                'unique_together': {('restaurant', 'cuisine_type')},
+            },
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='cuisine_types',
+            field=models.ManyToManyField(related_name='restaurants', through='Delivery.RestaurantCuisine', to='Delivery.typecuisine', verbose_name='Типы кухни'),
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('phone', models.CharField(max_length=18, verbose_name='Номер телефона')),
+                ('address', models.TextField(blank=True, null=True, verbose_name='Адрес пользователя')),
+                ('role', models.CharField(choices=[('client', 'Клиент'), ('courier', 'Курьер'), ('admin', 'Администратор'), ('restaurant_service', 'Сервис ресторана')], max_length=20, verbose_name='Роль пользователя')),
+                ('groups', models.ManyToManyField(blank=True, related_name='delivery_user_set', to='auth.group', verbose_name='Группы пользователя')),
+                ('user_permissions', models.ManyToManyField(blank=True, related_name='delivery_user_permissions_set', to='auth.permission', verbose_name='Права пользователя')),
+            ],
+            options={
+                'verbose_name': 'Пользователь',
+                'verbose_name_plural': 'Пользователи',
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.CreateModel(
+            name='HistoricalUser',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(db_index=True, error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('phone', models.CharField(max_length=18, verbose_name='Номер телефона')),
+                ('address', models.TextField(blank=True, null=True, verbose_name='Адрес пользователя')),
+                ('role', models.CharField(choices=[('client', 'Клиент'), ('courier', 'Курьер'), ('admin', 'Администратор'), ('restaurant_service', 'Сервис ресторана')], max_length=20, verbose_name='Роль пользователя')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Пользователь',
+                'verbose_name_plural': 'historical Пользователи',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalOrderMenuItem',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Количество')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('menu_item', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Delivery.menuitem', verbose_name='Блюдо')),
+                ('order', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Delivery.order', verbose_name='Заказ')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Позиция в заказе',
+                'verbose_name_plural': 'historical Позиции в заказе',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalOrder',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('link_dogovor', models.URLField(blank=True, null=True, verbose_name='Ссылка на договор')),
+                ('order_date', models.DateTimeField(blank=True, editable=False, verbose_name='Дата заказа')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Общая стоимость')),
+                ('status', models.CharField(choices=[('new', 'Новый'), ('preparing', 'Готовится'), ('delivering', 'Доставляется'), ('completed', 'Завершён')], default='new', max_length=20, verbose_name='Статус заказа')),
+                ('additional_notes', models.TextField(blank=True, null=True, verbose_name='Дополнительные примечания')),
+                ('image', models.TextField(blank=True, max_length=100, null=True, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])], verbose_name='Изображение к заказу')),
+                ('created_at', models.DateTimeField(blank=True, editable=False, verbose_name='Дата создания')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('restaurant', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Delivery.restaurant', verbose_name='Ресторан')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'historical Заказ',
+                'verbose_name_plural': 'historical Заказы',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalMenuItem',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Название блюда')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Описание блюда')),
+                ('is_available', models.BooleanField(default=True, verbose_name='Доступно ли блюдо')),
+                ('image', models.TextField(blank=True, max_length=100, null=True, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])], verbose_name='Изображение блюда')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('restaurant', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Delivery.restaurant', verbose_name='Ресторан')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Блюдо',
+                'verbose_name_plural': 'historical Блюда',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalDelivery',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('delivery_time', models.DateTimeField(blank=True, null=True, verbose_name='Время доставки')),
+                ('delivery_status', models.CharField(choices=[('in_progress', 'В процессе'), ('delivered', 'Доставлено')], default='in_progress', max_length=20, verbose_name='Статус доставки')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('courier', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Delivery.courier', verbose_name='Курьер')),
+                ('order', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Delivery.order', verbose_name='Заказ')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Доставка',
+                'verbose_name_plural': 'historical Доставки',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalCourier',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('vehicle_type', models.CharField(choices=[('bike', 'Велосипед'), ('car', 'Машина'), ('scooter', 'Скутер')], max_length=20, verbose_name='Тип транспорта')),
+                ('documents', models.TextField(blank=True, max_length=100, null=True)),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'historical Курьер',
+                'verbose_name_plural': 'historical Курьеры',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.AddField(
+            model_name='courier',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='courier_profile', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalordermenuitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Цена блюда на момент добавления позиции в заказ', max_digits=10, null=True, verbose_name='Цена за единицу'),
+        ),
+        migrations.AddField(
+            model_name='ordermenuitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Цена блюда на момент добавления позиции в заказ', max_digits=10, null=True, verbose_name='Цена за единицу'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.db import migrations, transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def backfill_unit_price(apps, schema_editor):
+    """
+    Заполняет цену позиций текущей ценой блюда пачками по первичному ключу.
+    Исторические записи позиций удалённых блюд получают цену 0: следующая
+    миграция делает поле обязательным.
+    """
+    MenuItem = apps.get_model('Delivery', 'MenuItem')
+    menu_price = MenuItem.objects.filter(pk=OuterRef('menu_item_id')).values('price')[:1]
+
+    for model_name, pk_name in (('OrderMenuItem', 'id'), ('HistoricalOrderMenuItem', 'history_id')):
+        model = apps.get_model('Delivery', model_name)
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(unit_price__isnull=True, **{f'{pk_name}__gt': last_pk})
+                .order_by(pk_name)
+                .values_list(pk_name, flat=True)[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.filter(**{f'{pk_name}__in': batch}).update(
+                    unit_price=Coalesce(
+                        Subquery(menu_price),
+                        Value(Decimal('0')),
+                        output_field=DecimalField(max_digits=10, decimal_places=2),
+                    )
+                )
+            last_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('Delivery', '0002_ordermenuitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_unit_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0003_backfill_ordermenuitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicalordermenuitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Цена блюда на момент добавления позиции в заказ', max_digits=10, verbose_name='Цена за единицу'),
+        ),
+        migrations.AlterField(
+            model_name='ordermenuitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Цена блюда на момент добавления позиции в заказ', max_digits=10, verbose_name='Цена за единицу'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0004_alter_ordermenuitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalorder',
+            name='is_overdue',
+            field=models.BooleanField(db_index=True, default=False, help_text='Выставляется фоновой задачей для незавершённых заказов старше порога', verbose_name='Просрочен'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='is_overdue',
+            field=models.BooleanField(db_index=True, default=False, help_text='Выставляется фоновой задачей для незавершённых заказов старше порога', verbose_name='Просрочен'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0005_order_is_overdue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicalorder',
+            name='is_overdue',
+            field=models.BooleanField(default=False, help_text='Выставляется фоновой задачей для незавершённых заказов старше порога', verbose_name='Просрочен'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='is_overdue',
+            field=models.BooleanField(default=False, help_text='Выставляется фоновой задачей для незавершённых заказов старше порога', verbose_name='Просрочен'),
+        ),
+        migrations.AddIndex(
+            model_name='courier',
+            index=models.Index(fields=['vehicle_type'], name='courier_vehicle_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['delivery_status'], name='delivery_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['restaurant', 'is_available'], name='menuitem_rest_avail_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_date', 'id'], name='order_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['is_overdue', 'status', 'order_date'], name='order_overdue_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['new', 'preparing', 'delivering'])), fields=['-created_at'], name='order_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordermenuitem',
+            index=models.Index(fields=['menu_item', 'order'], name='orderitem_menu_order_idx'),
+        ),
+    ]
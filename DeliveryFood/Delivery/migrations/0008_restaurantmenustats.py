@@ -0,0 +1,50 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def fill_menu_stats(apps, schema_editor):
+    """Заполняет сводки по текущим блюдам одним агрегирующим запросом."""
+    MenuItem = apps.get_model('Delivery', 'MenuItem')
+    RestaurantMenuStats = apps.get_model('Delivery', 'RestaurantMenuStats')
+    rows = (
+        MenuItem.objects.order_by()
+        .values('restaurant_id')
+        .annotate(
+            item_count=Count('id'),
+            available_count=Count('id', filter=Q(is_available=True)),
+            price_sum=Sum('price'),
+            min_price=Min('price'),
+            max_price=Max('price'),
+        )
+    )
+    RestaurantMenuStats.objects.bulk_create(RestaurantMenuStats(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0007_orderpdfexport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantMenuStats',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='menu_stats', serialize=False, to='Delivery.restaurant', verbose_name='Ресторан')),
+                ('item_count', models.PositiveIntegerField(default=0, verbose_name='Количество блюд')),
+                ('available_count', models.PositiveIntegerField(default=0, verbose_name='Доступно блюд')),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма цен')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Минимальная цена')),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Максимальная цена')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Сводка меню ресторана',
+                'verbose_name_plural': 'Сводки меню ресторанов',
+            },
+        ),
+        migrations.RunPython(fill_menu_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+SQLITE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS delivery_search_fts USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS delivery_search_trigram USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, text, tokenize = 'trigram')",
+]
+SQLITE_REVERSE_SQL = [
+    "DROP TABLE IF EXISTS delivery_search_fts",
+    "DROP TABLE IF EXISTS delivery_search_trigram",
+]
+
+POSTGRES_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE TABLE IF NOT EXISTS delivery_search_document (
+        kind varchar(20) NOT NULL,
+        object_id bigint NOT NULL,
+        title text NOT NULL DEFAULT '',
+        body text NOT NULL DEFAULT '',
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian', title), 'A') ||
+            setweight(to_tsvector('russian', body), 'B')
+        ) STORED,
+        PRIMARY KEY (kind, object_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS delivery_search_document_idx "
+    "ON delivery_search_document USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS delivery_search_trigram_idx "
+    "ON delivery_search_document USING GIN (lower(title || ' ' || body) gin_trgm_ops)",
+]
+POSTGRES_REVERSE_SQL = ["DROP TABLE IF EXISTS delivery_search_document"]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_tables(apps, schema_editor):
+    """Таблицы поискового индекса создаются под СУБД подключения."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_SQL)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_SQL)
+
+
+def drop_search_tables(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE_SQL)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0008_restaurantmenustats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantOrderVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Час')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Заказано блюд')),
+            ],
+            options={
+                'verbose_name': 'Объём заказов ресторана за час',
+                'verbose_name_plural': 'Объёмы заказов ресторанов по часам',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Сводка')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Последний обработанный id')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Отметка фоновой сводки',
+                'verbose_name_plural': 'Отметки фоновых сводок',
+            },
+        ),
+        migrations.AddField(
+            model_name='restaurantcuisine',
+            name='popularity_24h',
+            field=models.PositiveIntegerField(default=0, verbose_name='Популярность за 24 часа'),
+        ),
+        migrations.AddField(
+            model_name='restaurantcuisine',
+            name='popularity_30d',
+            field=models.PositiveIntegerField(default=0, verbose_name='Популярность за 30 дней'),
+        ),
+        migrations.AlterField(
+            model_name='restaurantcuisine',
+            name='popularity',
+            field=models.PositiveIntegerField(default=0, verbose_name='Популярность за 7 дней'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantcuisine',
+            index=models.Index(fields=['cuisine_type', '-popularity_24h'], name='rcuisine_pop_24h_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantcuisine',
+            index=models.Index(fields=['cuisine_type', '-popularity'], name='rcuisine_pop_7d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantcuisine',
+            index=models.Index(fields=['cuisine_type', '-popularity_30d'], name='rcuisine_pop_30d_idx'),
+        ),
+        migrations.AddField(
+            model_name='restaurantordervolume',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_volumes', to='Delivery.restaurant', verbose_name='Ресторан'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantordervolume',
+            index=models.Index(fields=['hour'], name='order_volume_hour_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='restaurantordervolume',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'hour'), name='order_volume_unique_hour'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:49
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счётчики главной по текущим данным: по одному запросу на счётчик."""
+    Restaurant = apps.get_model('Delivery', 'Restaurant')
+    MenuItem = apps.get_model('Delivery', 'MenuItem')
+    Order = apps.get_model('Delivery', 'Order')
+    OrderMenuItem = apps.get_model('Delivery', 'OrderMenuItem')
+    RestaurantMenuStats = apps.get_model('Delivery', 'RestaurantMenuStats')
+    SiteCounter = apps.get_model('Delivery', 'SiteCounter')
+
+    SiteCounter.objects.bulk_create([
+        SiteCounter(name='restaurants', value=Restaurant.objects.count()),
+        SiteCounter(name='dishes', value=MenuItem.objects.count()),
+        SiteCounter(name='orders', value=Order.objects.count()),
+    ])
+
+    def count_of(queryset, field):
+        return Coalesce(
+            Subquery(
+                queryset.filter(**{field: OuterRef('pk')})
+                .order_by()
+                .values(field)
+                .annotate(n=Count('pk'))
+                .values('n')
+            ),
+            Value(0),
+        )
+
+    MenuItem.objects.update(order_count=count_of(OrderMenuItem.objects, 'menu_item_id'))
+    RestaurantMenuStats.objects.update(order_count=count_of(Order.objects, 'restaurant_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0011_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Счётчик')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Счётчик сайта',
+                'verbose_name_plural': 'Счётчики сайта',
+            },
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Количество позиций заказов с этим блюдом; поддерживается сигналами', verbose_name='Вхождений в заказы'),
+        ),
+        migrations.AddField(
+            model_name='restaurantmenustats',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество заказов'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-order_count'], name='menuitem_avail_orders_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantmenustats',
+            index=models.Index(fields=['-order_count', '-available_count'], name='menustats_orders_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
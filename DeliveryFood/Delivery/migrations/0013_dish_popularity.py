@@ -0,0 +1,131 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:53
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+WINDOWS = {
+    'order_count_24h': timedelta(hours=24),
+    'order_count_7d': timedelta(days=7),
+    'order_count_30d': timedelta(days=30),
+}
+
+
+def fill_dish_popularity(apps, schema_editor):
+    """Почасовые корзины за последние 30 дней и окна рейтинга блюд по ним."""
+    OrderMenuItem = apps.get_model('Delivery', 'OrderMenuItem')
+    DishOrderVolume = apps.get_model('Delivery', 'DishOrderVolume')
+    MenuItem = apps.get_model('Delivery', 'MenuItem')
+
+    current_hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+    starts = {
+        field: current_hour - duration + timedelta(hours=1) for field, duration in WINDOWS.items()
+    }
+    rows = (
+        OrderMenuItem.objects.filter(order__created_at__gte=min(starts.values()))
+        .order_by()
+        .values('menu_item_id', hour=TruncHour('order__created_at'))
+        .annotate(lines=Count('pk'))
+    )
+    DishOrderVolume.objects.bulk_create(
+        (DishOrderVolume(**row) for row in rows), batch_size=500
+    )
+
+    def lines_since(start):
+        return Coalesce(
+            Subquery(
+                DishOrderVolume.objects.filter(menu_item_id=OuterRef('pk'), hour__gte=start)
+                .order_by()
+                .values('menu_item_id')
+                .annotate(total=Sum('lines'))
+                .values('total')
+            ),
+            Value(0),
+        )
+
+    MenuItem.objects.filter(pk__in=DishOrderVolume.objects.values('menu_item_id')).update(
+        **{field: lines_since(start) for field, start in starts.items()}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0012_home_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DishOrderVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Час')),
+                ('lines', models.PositiveIntegerField(default=0, verbose_name='Позиций заказов')),
+            ],
+            options={
+                'verbose_name': 'Объём заказов блюда за час',
+                'verbose_name_plural': 'Объёмы заказов блюд по часам',
+            },
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='order_count_24h',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Вхождений в заказы за 24 часа'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='order_count_30d',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Вхождений в заказы за 30 дней'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='order_count_7d',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Вхождений в заказы за 7 дней'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-order_count_24h'], name='menuitem_top_24h_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-order_count_7d'], name='menuitem_top_7d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-order_count_30d'], name='menuitem_top_30d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['restaurant', '-order_count'], name='menuitem_rest_top_all_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['restaurant', '-order_count_24h'], name='menuitem_rest_top_24h_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['restaurant', '-order_count_7d'], name='menuitem_rest_top_7d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['restaurant', '-order_count_30d'], name='menuitem_rest_top_30d_idx'),
+        ),
+        migrations.AddField(
+            model_name='dishordervolume',
+            name='menu_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_volumes', to='Delivery.menuitem', verbose_name='Блюдо'),
+        ),
+        migrations.AddIndex(
+            model_name='dishordervolume',
+            index=models.Index(fields=['hour'], name='dish_volume_hour_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dishordervolume',
+            constraint=models.UniqueConstraint(fields=('menu_item', 'hour'), name='dish_volume_unique_hour'),
+        ),
+        migrations.RunPython(fill_dish_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:02
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0013_dish_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courier',
+            name='is_on_shift',
+            field=models.BooleanField(default=False, help_text='Курьер на смене получает заказы от автоматического назначения', verbose_name='На смене'),
+        ),
+        migrations.AddField(
+            model_name='courier',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)], verbose_name='Широта'),
+        ),
+        migrations.AddField(
+            model_name='courier',
+            name='location_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время последнего положения'),
+        ),
+        migrations.AddField(
+            model_name='courier',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)], verbose_name='Долгота'),
+        ),
+        migrations.AddField(
+            model_name='historicalcourier',
+            name='is_on_shift',
+            field=models.BooleanField(default=False, help_text='Курьер на смене получает заказы от автоматического назначения', verbose_name='На смене'),
+        ),
+        migrations.AddIndex(
+            model_name='courier',
+            index=models.Index(condition=models.Q(('is_on_shift', True)), fields=['id'], name='courier_on_shift_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(condition=models.Q(('delivery_status', 'in_progress')), fields=['courier'], name='delivery_courier_active_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0014_courier_dispatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourierLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(verbose_name='Время отметки')),
+                ('latitude', models.FloatField(verbose_name='Широта')),
+                ('longitude', models.FloatField(verbose_name='Долгота')),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='track', to='Delivery.courier', verbose_name='Курьер')),
+            ],
+            options={
+                'verbose_name': 'Точка трека курьера',
+                'verbose_name_plural': 'Треки курьеров',
+                'indexes': [models.Index(fields=['courier', 'recorded_at'], name='courier_track_idx'), models.Index(fields=['recorded_at'], name='courier_track_time_idx')],
+            },
+        ),
+    ]
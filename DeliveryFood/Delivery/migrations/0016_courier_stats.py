@@ -0,0 +1,51 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:09
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_courier_stats(apps, schema_editor):
+    """Заполняет активность и число доставок в процессе по текущим данным."""
+    Courier = apps.get_model('Delivery', 'Courier')
+    Delivery = apps.get_model('Delivery', 'Delivery')
+    User = apps.get_model('Delivery', 'User')
+
+    Courier.objects.update(
+        user_is_active=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('is_active')),
+        active_deliveries=Coalesce(
+            Subquery(
+                Delivery.objects.filter(courier_id=OuterRef('pk'), delivery_status='in_progress')
+                .order_by()
+                .values('courier_id')
+                .annotate(n=Count('pk'))
+                .values('n')
+            ),
+            Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0015_courier_locations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courier',
+            name='active_deliveries',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Доставок в процессе'),
+        ),
+        migrations.AddField(
+            model_name='courier',
+            name='user_is_active',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Пользователь активен'),
+        ),
+        migrations.AddIndex(
+            model_name='courier',
+            index=models.Index(condition=models.Q(('user_is_active', True)), fields=['vehicle_type', 'active_deliveries'], name='courier_active_stats_idx'),
+        ),
+        migrations.RunPython(fill_courier_stats, migrations.RunPython.noop),
+    ]
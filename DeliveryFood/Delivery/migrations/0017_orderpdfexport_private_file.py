@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:31
+
+import Delivery.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0016_courier_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderpdfexport',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=Delivery.models.private_storage, upload_to='exports/pdf/', verbose_name='Файл PDF'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:38
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+def rebuild_restaurant_volumes(apps, schema_editor):
+    """
+    Корзины дальше ведут сигналы; позиции, не досчитанные по старой отметке,
+    учитываются пересборкой корзин за последние 30 дней.
+    """
+    OrderMenuItem = apps.get_model('Delivery', 'OrderMenuItem')
+    RestaurantOrderVolume = apps.get_model('Delivery', 'RestaurantOrderVolume')
+
+    current_hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+    rows = (
+        OrderMenuItem.objects.filter(
+            order__created_at__gte=current_hour - timedelta(days=30) + timedelta(hours=1)
+        )
+        .order_by()
+        .values(restaurant_id=F('order__restaurant_id'), hour=TruncHour('order__created_at'))
+        .annotate(quantity=Sum('quantity'))
+    )
+    RestaurantOrderVolume.objects.all().delete()
+    RestaurantOrderVolume.objects.bulk_create(
+        (RestaurantOrderVolume(**row) for row in rows), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Delivery', '0017_orderpdfexport_private_file'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='RollupWatermark',
+        ),
+        migrations.RunPython(rebuild_restaurant_volumes, migrations.RunPython.noop),
+    ]
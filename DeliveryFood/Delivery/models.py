@@ -1,13 +1,66 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.core.validators import FileExtensionValidator
-from django.db import models
+from django.core.files.storage import FileSystemStorage
+from django.core.validators import FileExtensionValidator, MaxValueValidator, MinValueValidator
+from django.db import models, transaction
 from django.db.models import Q, Manager
 from django.urls import reverse
 from rest_framework.exceptions import ValidationError
 from simple_history.models import HistoricalRecords
 
 
-class User(AbstractUser):
+class AddressCoordinatesMixin:
+    """Запоминает адрес и координаты, с которыми объект был загружен из базы или сохранён."""
+
+    saved_address = None
+    saved_point = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_address = instance.__dict__.get("address")
+        instance.saved_point = (
+            instance.__dict__.get("latitude"),
+            instance.__dict__.get("longitude"),
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "address" in update_fields:
+            # Координаты нового адреса заполняются при сохранении (сигнал pre_save)
+            kwargs["update_fields"] = {*update_fields, "latitude", "longitude"}
+        super().save(*args, **kwargs)
+        self.saved_address = self.address
+        self.saved_point = (self.latitude, self.longitude)
+
+    @property
+    def address_moved(self):
+        """Адрес изменился, а координаты остались прежними (их нужно пересчитать)."""
+        return (
+            self.saved_point is not None
+            and self.address != self.saved_address
+            and (self.latitude, self.longitude) == self.saved_point
+        )
+
+
+class SavedNameMixin:
+    """Запоминает название, с которым объект был загружен из базы или сохранён."""
+
+    saved_name = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_name = instance.__dict__.get("name")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.saved_name = self.name
+
+
+class User(AddressCoordinatesMixin, AbstractUser):
     ROLES = [
         ("client", "Клиент"),
         ("courier", "Курьер"),
@@ -17,6 +70,19 @@ class User(AbstractUser):
     history = HistoricalRecords()
     phone = models.CharField(max_length=18, verbose_name="Номер телефона")
     address = models.TextField(blank=True, null=True, verbose_name="Адрес пользователя")
+    # Координаты адреса; если не заданы, заполняются геокодером при сохранении
+    latitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        verbose_name="Широта",
+    )
+    longitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        verbose_name="Долгота",
+    )
     role = models.CharField(
         max_length=20, choices=ROLES, verbose_name="Роль пользователя"
     )
@@ -71,8 +137,16 @@ class RestaurantCuisine(models.Model):
         related_name='restaurant_cuisines',
         verbose_name="Тип кухни"
     )
+    # Популярность — количество заказанных блюд ресторана за скользящее окно;
+    # пересчитывается по корзинам фоновой задачей rollup_cuisine_popularity
     popularity = models.PositiveIntegerField(
-        default=0, verbose_name="Популярность блюда"
+        default=0, verbose_name="Популярность за 7 дней"
+    )
+    popularity_24h = models.PositiveIntegerField(
+        default=0, verbose_name="Популярность за 24 часа"
+    )
+    popularity_30d = models.PositiveIntegerField(
+        default=0, verbose_name="Популярность за 30 дней"
     )
     def __str__(self):
         return f"{self.restaurant.name} - {self.cuisine_type.name}"
@@ -80,8 +154,14 @@ class RestaurantCuisine(models.Model):
         verbose_name = "Связь ресторана и кухни"
         verbose_name_plural = "Связи ресторанов и кухонь"
         unique_together = ('restaurant', 'cuisine_type')
-
-class TypeCuisine(models.Model):
+        indexes = [
+            # by-cuisine-type: рестораны кухни по убыванию популярности за окно
+            models.Index(fields=['cuisine_type', '-popularity_24h'], name='rcuisine_pop_24h_idx'),
+            models.Index(fields=['cuisine_type', '-popularity'], name='rcuisine_pop_7d_idx'),
+            models.Index(fields=['cuisine_type', '-popularity_30d'], name='rcuisine_pop_30d_idx'),
+        ]
+
+class TypeCuisine(SavedNameMixin, models.Model):
     name = models.CharField(max_length=50, verbose_name="Название типа кухни")
 
     def __str__(self):
@@ -92,9 +172,22 @@ class TypeCuisine(models.Model):
         verbose_name_plural = "Типы кухонь"
 
 
-class Restaurant(models.Model):
+class Restaurant(AddressCoordinatesMixin, SavedNameMixin, models.Model):
     name = models.CharField(max_length=255, verbose_name="Название ресторана")
     address = models.TextField(verbose_name="Адрес ресторана")
+    # Координаты адреса; если не заданы, заполняются геокодером при сохранении
+    latitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        verbose_name="Широта",
+    )
+    longitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        verbose_name="Долгота",
+    )
     phone = models.CharField(max_length=18, verbose_name="Телефон ресторана")
     cuisine_types = models.ManyToManyField(
         TypeCuisine, related_name="restaurants", verbose_name="Типы кухни",
@@ -108,6 +201,11 @@ class Restaurant(models.Model):
         validators=[FileExtensionValidator(allowed_extensions=["jpg", "jpeg", "png"])],
     )
 
+    def save(self, *args, **kwargs):
+        # Ресторан и счётчики главной страницы (сигналы) пишутся в одной транзакции
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -115,8 +213,10 @@ class Restaurant(models.Model):
         verbose_name = "Ресторан"
         verbose_name_plural = "Рестораны"
 
-class MenuItem(models.Model):
-    history = HistoricalRecords()
+class MenuItem(SavedNameMixin, models.Model):
+    # Счётчики вхождений в заказы меняются F()-выражениями и в историю не пишутся
+    ORDER_COUNT_FIELDS = ("order_count", "order_count_24h", "order_count_7d", "order_count_30d")
+    history = HistoricalRecords(excluded_fields=list(ORDER_COUNT_FIELDS))
     name = models.CharField(max_length=255, verbose_name="Название блюда")
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Цена")
     description = models.TextField(blank=True, null=True, verbose_name="Описание блюда")
@@ -127,6 +227,21 @@ class MenuItem(models.Model):
         verbose_name="Ресторан",
     )
     is_available = models.BooleanField(default=True, verbose_name="Доступно ли блюдо")
+    order_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Вхождений в заказы",
+        help_text="Количество позиций заказов с этим блюдом; поддерживается сигналами",
+    )
+    order_count_24h = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Вхождений в заказы за 24 часа"
+    )
+    order_count_7d = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Вхождений в заказы за 7 дней"
+    )
+    order_count_30d = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Вхождений в заказы за 30 дней"
+    )
     image = models.ImageField(
         upload_to="menu_images/",
         blank=True,
@@ -135,12 +250,222 @@ class MenuItem(models.Model):
         validators=[FileExtensionValidator(allowed_extensions=["jpg", "jpeg", "png"])],
     )
 
+    # Цена, доступность и ресторан, с которыми блюдо было загружено из базы
+    saved_price = None
+    saved_is_available = None
+    saved_restaurant_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_price = instance.__dict__.get("price")
+        instance.saved_is_available = instance.__dict__.get("is_available")
+        instance.saved_restaurant_id = instance.__dict__.get("restaurant_id")
+        return instance
+
+    @property
+    def price_changed(self):
+        """Изменилась ли цена относительно сохранённой в базе."""
+        return self.saved_price is None or self.saved_price != self.price
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет блюдо, не затирая счётчики заказов у существующей записи:
+        они сдвигаются позициями заказов через F()-выражения.
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.ORDER_COUNT_FIELDS
+            ]
+        # Блюдо, сводка меню и счётчики (сигналы) пишутся в одной транзакции
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+        self.saved_price = self.price
+        self.saved_is_available = self.is_available
+        self.saved_restaurant_id = self.restaurant_id
+
     def __str__(self):
         return f"Блюдо {self.name} из ресторана {self.restaurant.name}"
 
     class Meta:
         verbose_name = "Блюдо"
         verbose_name_plural = "Блюда"
+        indexes = [
+            # Меню ресторана: restaurant_detail, by-restaurant, names-and-prices
+            models.Index(fields=["restaurant", "is_available"], name="menuitem_rest_avail_idx"),
+            # Популярные блюда: доступные по убыванию счётчика за окно (частичные индексы),
+            # по всем ресторанам и внутри ресторана
+            models.Index(
+                fields=["-order_count"],
+                condition=models.Q(is_available=True),
+                name="menuitem_avail_orders_idx",
+            ),
+            models.Index(
+                fields=["-order_count_24h"],
+                condition=models.Q(is_available=True),
+                name="menuitem_top_24h_idx",
+            ),
+            models.Index(
+                fields=["-order_count_7d"],
+                condition=models.Q(is_available=True),
+                name="menuitem_top_7d_idx",
+            ),
+            models.Index(
+                fields=["-order_count_30d"],
+                condition=models.Q(is_available=True),
+                name="menuitem_top_30d_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "-order_count"],
+                condition=models.Q(is_available=True),
+                name="menuitem_rest_top_all_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "-order_count_24h"],
+                condition=models.Q(is_available=True),
+                name="menuitem_rest_top_24h_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "-order_count_7d"],
+                condition=models.Q(is_available=True),
+                name="menuitem_rest_top_7d_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "-order_count_30d"],
+                condition=models.Q(is_available=True),
+                name="menuitem_rest_top_30d_idx",
+            ),
+        ]
+
+
+class RestaurantMenuStats(models.Model):
+    """
+    Сводка по меню и заказам ресторана. Поддерживается приращениями из
+    сигналов MenuItem и Order; полностью пересобирается командой
+    rebuild_menu_stats, счётчик заказов сверяется командой reconcile_counters.
+    """
+
+    restaurant = models.OneToOneField(
+        Restaurant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="menu_stats",
+        verbose_name="Ресторан",
+    )
+    item_count = models.PositiveIntegerField(default=0, verbose_name="Количество блюд")
+    available_count = models.PositiveIntegerField(default=0, verbose_name="Доступно блюд")
+    price_sum = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Сумма цен"
+    )
+    min_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Минимальная цена"
+    )
+    max_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Максимальная цена"
+    )
+    order_count = models.PositiveIntegerField(default=0, verbose_name="Количество заказов")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    def __str__(self):
+        return f"Сводка меню ресторана {self.restaurant_id}"
+
+    class Meta:
+        verbose_name = "Сводка меню ресторана"
+        verbose_name_plural = "Сводки меню ресторанов"
+        indexes = [
+            # Топ ресторанов на главной: по заказам, затем по доступным блюдам
+            models.Index(
+                fields=["-order_count", "-available_count"], name="menustats_orders_idx"
+            ),
+        ]
+
+
+class RestaurantOrderVolume(models.Model):
+    """
+    Количество заказанных блюд ресторана за час (по времени создания заказа).
+    Сдвигается при создании, изменении и удалении позиций; из корзин
+    считаются окна популярности кухонь, корзины старше самого длинного окна
+    удаляются.
+    """
+
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name="order_volumes",
+        verbose_name="Ресторан",
+    )
+    hour = models.DateTimeField(verbose_name="Час")
+    quantity = models.PositiveIntegerField(default=0, verbose_name="Заказано блюд")
+
+    def __str__(self):
+        return f"Ресторан {self.restaurant_id}, {self.hour}: {self.quantity}"
+
+    class Meta:
+        verbose_name = "Объём заказов ресторана за час"
+        verbose_name_plural = "Объёмы заказов ресторанов по часам"
+        constraints = [
+            models.UniqueConstraint(fields=["restaurant", "hour"], name="order_volume_unique_hour"),
+        ]
+        indexes = [
+            # Сумма по окнам и удаление старых корзин
+            models.Index(fields=["hour"], name="order_volume_hour_idx"),
+        ]
+
+
+class DishOrderVolume(models.Model):
+    """
+    Количество позиций заказов с блюдом за час (по времени создания заказа).
+    Сдвигается при создании и удалении позиций; из корзин пересчитываются
+    скользящие окна популярности блюд, корзины старше самого длинного окна
+    удаляются.
+    """
+
+    menu_item = models.ForeignKey(
+        MenuItem,
+        on_delete=models.CASCADE,
+        related_name="order_volumes",
+        verbose_name="Блюдо",
+    )
+    hour = models.DateTimeField(verbose_name="Час")
+    lines = models.PositiveIntegerField(default=0, verbose_name="Позиций заказов")
+
+    def __str__(self):
+        return f"Блюдо {self.menu_item_id}, {self.hour}: {self.lines}"
+
+    class Meta:
+        verbose_name = "Объём заказов блюда за час"
+        verbose_name_plural = "Объёмы заказов блюд по часам"
+        constraints = [
+            models.UniqueConstraint(fields=["menu_item", "hour"], name="dish_volume_unique_hour"),
+        ]
+        indexes = [
+            # Сдвиг корзин одного часа, суммы по окнам и удаление старых корзин
+            models.Index(fields=["hour"], name="dish_volume_hour_idx"),
+        ]
+
+
+class SiteCounter(models.Model):
+    """
+    Общий счётчик для главной страницы (рестораны, блюда, заказы).
+    Сдвигается F()-выражениями в той же транзакции, что и изменение
+    данных; расхождения исправляет команда reconcile_counters.
+    """
+
+    RESTAURANTS = "restaurants"
+    DISHES = "dishes"
+    ORDERS = "orders"
+
+    name = models.CharField(max_length=50, primary_key=True, verbose_name="Счётчик")
+    value = models.BigIntegerField(default=0, verbose_name="Значение")
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    class Meta:
+        verbose_name = "Счётчик сайта"
+        verbose_name_plural = "Счётчики сайта"
 
 
 class Order(models.Model):
@@ -151,6 +476,15 @@ class Order(models.Model):
         ("delivering", "Доставляется"),
         ("completed", "Завершён"),
     ]
+    # Статусы, в которых стоимость заказа ещё следует за ценами меню
+    OPEN_STATUSES = ("new", "preparing", "delivering")
+    # Разрешённые переходы: заказ движется только вперёд, шаги можно пропускать
+    STATUS_TRANSITIONS = {
+        "new": ("preparing", "delivering", "completed"),
+        "preparing": ("delivering", "completed"),
+        "delivering": ("completed",),
+        "completed": (),
+    }
 
     user = models.ForeignKey(
         User,
@@ -186,15 +520,40 @@ class Order(models.Model):
         validators=[FileExtensionValidator(allowed_extensions=["jpg", "jpeg", "png"])],
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    is_overdue = models.BooleanField(
+        default=False,
+        verbose_name="Просрочен",
+        help_text="Выставляется фоновой задачей для незавершённых заказов старше порога",
+    )
+
+    @classmethod
+    def statuses_allowed_before(cls, status):
+        """Статусы, из которых разрешён переход в status."""
+        return [
+            source for source, targets in cls.STATUS_TRANSITIONS.items() if status in targets
+        ]
 
     def update_total_price(self):
-        self.total_price = sum(item.price for item in self.order_items.all())
+        """Полный пересчёт стоимости заказа по позициям (запасной путь)."""
+        from .services.pricing import recalculate_order_total
+
+        return recalculate_order_total(self)
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-        if not is_new:
-            self.update_total_price()
+        """
+        Сохраняет заказ, не затирая total_price у существующей записи:
+        стоимость поддерживается позициями заказа через F()-выражения.
+        """
+        if self.status not in self.OPEN_STATUSES:
+            self.is_overdue = False
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "total_price"
+            ]
+        # Заказ и счётчики заказов (сигналы) пишутся в одной транзакции
+        with transaction.atomic(using=kwargs.get("using")):
             super().save(*args, **kwargs)
 
     def __str__(self):
@@ -204,6 +563,26 @@ class Order(models.Model):
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
         ordering = ["-created_at"]
+        indexes = [
+            # Сортировка по умолчанию и курсор (created_at, id)
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            # Сортировка OrderViewSet и курсор (order_date, id)
+            models.Index(fields=["order_date", "id"], name="order_date_id_idx"),
+            # by-user
+            models.Index(fields=["user", "created_at"], name="order_user_created_idx"),
+            # status/<status>, текущие заказы на главной
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+            # Фоновая задача и ready-or-past-due: is_overdue = ? AND status IN (...) AND order_date < ?
+            models.Index(
+                fields=["is_overdue", "status", "order_date"], name="order_overdue_status_idx"
+            ),
+            # Текущие заказы (главная, current-orders): частичный индекс по открытым
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(status__in=["new", "preparing", "delivering"]),
+                name="order_open_created_idx",
+            ),
+        ]
 
 class OrderMenuItem(models.Model):
     history = HistoricalRecords()
@@ -221,11 +600,48 @@ class OrderMenuItem(models.Model):
         verbose_name="Блюдо",
     )
     quantity = models.PositiveIntegerField(verbose_name="Количество", default=1)
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        verbose_name="Цена за единицу",
+        help_text="Цена блюда на момент добавления позиции в заказ",
+    )
+
+    # Состояние позиции, уже учтённое в Order.total_price
+    saved_order_id = None
+    saved_menu_item_id = None
+    saved_quantity = None
+    saved_unit_price = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_saved_state()
+        return instance
+
+    def remember_saved_state(self):
+        """Запоминает заказ, блюдо, количество и цену, учтённые в его стоимости."""
+        self.saved_order_id = self.__dict__.get("order_id")
+        self.saved_menu_item_id = self.__dict__.get("menu_item_id")
+        self.saved_quantity = self.__dict__.get("quantity")
+        self.saved_unit_price = self.__dict__.get("unit_price")
+
+    def save(self, *args, **kwargs):
+        # Цена фиксируется при создании позиции и при замене блюда
+        if self.unit_price is None or (
+            self.saved_menu_item_id is not None and self.saved_menu_item_id != self.menu_item_id
+        ):
+            self.unit_price = self.menu_item.price
+        # Позиция и изменение стоимости заказа пишутся в одной транзакции
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+        self.remember_saved_state()
 
     @property
     def price(self):
-        """Вычисляет стоимость позиции на основе цены блюда."""
-        return self.menu_item.price * self.quantity
+        """Вычисляет стоимость позиции по зафиксированной цене блюда."""
+        return self.unit_price * self.quantity
 
     def __str__(self):
         return f"{self.quantity}x {self.menu_item.name} для заказа {self.order.id}"
@@ -233,6 +649,10 @@ class OrderMenuItem(models.Model):
     class Meta:
         verbose_name = "Позиция в заказе"
         verbose_name_plural = "Позиции в заказе"
+        indexes = [
+            # Пересчёт заказов по блюду: menu_item = X AND order_id > Y ORDER BY order_id
+            models.Index(fields=["menu_item", "order"], name="orderitem_menu_order_idx"),
+        ]
 
 class CourierQuerySet(models.QuerySet):
     def by_vehicle_type(self, vehicle_type):
@@ -275,7 +695,11 @@ class CourierManager(models.Manager):
 
 
 class Courier(models.Model):
-    history = HistoricalRecords()
+    # Текущее положение обновляется часто и в историю не пишется
+    LOCATION_FIELDS = ("latitude", "longitude", "location_updated_at")
+    # Денормализованные поля статистики курьеров: ведутся сигналами, в историю не пишутся
+    STATS_FIELDS = ("user_is_active", "active_deliveries")
+    history = HistoricalRecords(excluded_fields=[*LOCATION_FIELDS, *STATS_FIELDS])
     VEHICLE_CHOICES = [
         ("bike", "Велосипед"),
         ("car", "Машина"),
@@ -293,6 +717,49 @@ class Courier(models.Model):
     )
 
     documents = models.FileField(upload_to='documents/', blank=True, null=True)
+    is_on_shift = models.BooleanField(
+        default=False,
+        verbose_name="На смене",
+        help_text="Курьер на смене получает заказы от автоматического назначения",
+    )
+    latitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        verbose_name="Широта",
+    )
+    longitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        verbose_name="Долгота",
+    )
+    location_updated_at = models.DateTimeField(
+        blank=True, null=True, verbose_name="Время последнего положения"
+    )
+    # Копия User.is_active и число доставок в процессе: по ним статистика
+    # курьеров считается одним запросом без соединений
+    user_is_active = models.BooleanField(
+        default=True, editable=False, verbose_name="Пользователь активен"
+    )
+    active_deliveries = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Доставок в процессе"
+    )
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет курьера, не затирая счётчик доставок у существующей записи:
+        его сдвигают доставки через F()-выражения. Активность копируется у
+        пользователя.
+        """
+        self.user_is_active = self.user.is_active
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "active_deliveries"
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Курьер {self.user.get_full_name()}"
@@ -300,10 +767,49 @@ class Courier(models.Model):
     class Meta:
         verbose_name = "Курьер"
         verbose_name_plural = "Курьеры"
+        indexes = [
+            models.Index(fields=["vehicle_type"], name="courier_vehicle_type_idx"),
+            # Курьеры на смене для назначения заказов
+            models.Index(
+                fields=["id"], condition=Q(is_on_shift=True), name="courier_on_shift_idx"
+            ),
+            # Статистика активных курьеров: покрывающий индекс для группировки
+            models.Index(
+                fields=["vehicle_type", "active_deliveries"],
+                condition=Q(user_is_active=True),
+                name="courier_active_stats_idx",
+            ),
+        ]
 
     objects = CourierManager()
 
 
+class CourierLocation(models.Model):
+    """
+    Точка трека курьера. Отметки GPS копятся в буфере процесса и пишутся
+    сюда пачками, прореженными до одной точки за COURIER_TRACK_SAMPLE_SECONDS.
+    """
+
+    courier = models.ForeignKey(
+        Courier, on_delete=models.CASCADE, related_name="track", verbose_name="Курьер"
+    )
+    recorded_at = models.DateTimeField(verbose_name="Время отметки")
+    latitude = models.FloatField(verbose_name="Широта")
+    longitude = models.FloatField(verbose_name="Долгота")
+
+    def __str__(self):
+        return f"Курьер {self.courier_id}, {self.recorded_at}: {self.latitude}, {self.longitude}"
+
+    class Meta:
+        verbose_name = "Точка трека курьера"
+        verbose_name_plural = "Треки курьеров"
+        indexes = [
+            models.Index(fields=["courier", "recorded_at"], name="courier_track_idx"),
+            # Удаление устаревших точек
+            models.Index(fields=["recorded_at"], name="courier_track_time_idx"),
+        ]
+
+
 class Delivery(models.Model):
     history = HistoricalRecords()
     STATUS_CHOICES = [
@@ -330,6 +836,26 @@ class Delivery(models.Model):
         verbose_name="Статус доставки",
     )
 
+    # Курьер и статус, уже учтённые в Courier.active_deliveries
+    saved_courier_id = None
+    saved_delivery_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_saved_state()
+        return instance
+
+    def remember_saved_state(self):
+        self.saved_courier_id = self.__dict__.get("courier_id")
+        self.saved_delivery_status = self.__dict__.get("delivery_status")
+
+    def save(self, *args, **kwargs):
+        # Доставка и счётчик доставок курьера (сигналы) пишутся в одной транзакции
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+        self.remember_saved_state()
+
     def get_absolute_url(self):
         """Возвращает абсолютный URL для просмотра деталей доставки."""
         return reverse("delivery_detail", kwargs={"pk": self.pk})
@@ -339,4 +865,60 @@ class Delivery(models.Model):
 
     class Meta:
         verbose_name = "Доставка"
-        verbose_name_plural = "Доставки"
\ No newline at end of file
+        verbose_name_plural = "Доставки"
+        indexes = [
+            models.Index(fields=["delivery_status"], name="delivery_status_idx"),
+            # Занятые курьеры: доставки в процессе по курьеру
+            models.Index(
+                fields=["courier"],
+                condition=Q(delivery_status="in_progress"),
+                name="delivery_courier_active_idx",
+            ),
+        ]
+
+
+def private_storage():
+    """Хранилище закрытых файлов вне MEDIA_ROOT: веб-сервер их не раздаёт."""
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+
+class OrderPdfExport(models.Model):
+    """Фоновая выгрузка выбранных в админке заказов в PDF."""
+
+    STATUS_CHOICES = [
+        ("pending", "В очереди"),
+        ("running", "Формируется"),
+        ("done", "Готово"),
+        ("failed", "Ошибка"),
+    ]
+
+    order_ids = models.JSONField(default=list, verbose_name="ID заказов")
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="Статус"
+    )
+    file = models.FileField(
+        upload_to="exports/pdf/",
+        storage=private_storage,
+        blank=True,
+        null=True,
+        verbose_name="Файл PDF",
+    )
+    error = models.TextField(blank=True, default="", verbose_name="Ошибка")
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="pdf_exports",
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершено")
+
+    def __str__(self):
+        return f"PDF-выгрузка #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "PDF-выгрузка заказов"
+        verbose_name_plural = "PDF-выгрузки заказов"
+        ordering = ["-created_at"]
@@ -0,0 +1,236 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = namedtuple("Cursor", ["values", "reverse"])
+
+
+def _to_json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _model_field(model, field_name):
+    """
+    Поле модели по пути сортировки, в том числе через связи «к одному».
+    Связь «ко многим» не даёт одного значения для курсора и не принимается.
+    """
+    field = None
+    for part in field_name.split("__"):
+        if model is None:
+            raise FieldDoesNotExist(field_name)
+        field = model._meta.pk if part == "pk" else model._meta.get_field(part)
+        if field.many_to_many or field.one_to_many:
+            raise FieldDoesNotExist(field_name)
+        model = field.related_model
+    return field
+
+
+def _resolve(obj, field_name):
+    """Достаёт значение поля, в том числе через связи ('restaurant__name')."""
+    for part in field_name.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (keyset) с непрозрачным курсором.
+
+    Позиция страницы задаётся значениями полей сортировки последней строки
+    плюс первичный ключ, поэтому запрос не выполняет ни COUNT(*), ни OFFSET,
+    и время ответа не растёт с глубиной страницы. Сортировка берётся из
+    queryset (в том числе выставленная OrderingFilter) или из Meta.ordering.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+    unsupported_ordering_message = (
+        "Курсор не поддерживает эту сортировку: используйте постраничную выдачу."
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request)
+        reverse = cursor.reverse if cursor else False
+
+        queryset = queryset.order_by(
+            *[("-" if descending != reverse else "") + field for field, descending in self.ordering]
+        )
+        if cursor:
+            queryset = queryset.filter(self.keyset_filter(cursor.values, reverse))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else cursor is not None
+        self.has_previous = has_more if reverse else cursor is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def get_ordering(self, queryset):
+        """
+        Список (поле, по убыванию) с первичным ключом в конце для уникальности.
+        Сортировка по выражению или аннотации не даёт значений для курсора и
+        отклоняется.
+        """
+        model = queryset.model
+        terms = list(queryset.query.order_by) or list(model._meta.ordering)
+        ordering, self.ordering_fields = [], []
+        for term in terms:
+            field = term.lstrip("-") if isinstance(term, str) else None
+            try:
+                model_field = _model_field(model, field) if field and field != "?" else None
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is None:
+                raise ValidationError({self.cursor_query_param: self.unsupported_ordering_message})
+            ordering.append(("pk" if field == "id" else field, term.startswith("-")))
+            self.ordering_fields.append(model_field)
+
+        if not any(field == "pk" for field, _ in ordering):
+            ordering.append(("pk", ordering[0][1] if ordering else False))
+            self.ordering_fields.append(model._meta.pk)
+        return ordering
+
+    def keyset_filter(self, values, reverse):
+        """
+        Условие «строго после курсора» для составного ключа:
+        (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ...
+        """
+        conditions = []
+        for index, (field, descending) in enumerate(self.ordering):
+            lookup = "lt" if descending != reverse else "gt"
+            equal = {name: value for (name, _), value in zip(self.ordering[:index], values)}
+            conditions.append(Q(**equal) & Q(**{f"{field}__{lookup}": values[index]}))
+        return reduce(or_, conditions)
+
+    def decode_cursor(self, request):
+        """Курсор из запроса; значения приводятся к типам полей сортировки."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            values = list(payload["v"])
+            if len(values) != len(self.ordering_fields):
+                raise ValueError(encoded)
+            values = [field.to_python(value) for field, value in zip(self.ordering_fields, values)]
+            if any(value is None for value in values):
+                raise ValueError(encoded)
+            return Cursor(values=values, reverse=bool(payload.get("r")))
+        except (
+            TypeError,
+            ValueError,
+            KeyError,
+            binascii.Error,
+            UnicodeEncodeError,
+            DjangoValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        values = [_to_json_value(_resolve(obj, field)) for field, _ in self.ordering]
+        payload = {"v": values}
+        if reverse:
+            payload["r"] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Кастомная пагинация для стандартного набора результатов.
+
+    По умолчанию постраничная (page/page_size). Если в запросе передан
+    параметр cursor (можно пустой — для первой страницы), используется
+    KeysetPagination без COUNT(*) и OFFSET.
+    """
+
+    page_size = 10  # Количество элементов на странице по умолчанию
+    page_size_query_param = (
+        "page_size"  # Параметр для задания размера страницы через запрос
+    )
+    max_page_size = 100  # Максимальное количество элементов на странице
+    cursor_query_param = "cursor"
+
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.page_size
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -3,6 +3,28 @@
 from import_export import resources
 from .models import Order, User, MenuItem
 
+# Подписи значений, общие для ресурсов import-export и потоковой выгрузки
+ORDER_STATUS_LABELS = {
+    "new": "Новый",
+    "preparing": "Готовится",
+    "delivering": "Доставляется",
+    "completed": "Завершен",
+}
+UNKNOWN_STATUS_LABEL = "Неизвестный статус"
+UNKNOWN_ROLE_LABEL = "Неизвестная роль"
+
+
+def order_status_label(status):
+    return ORDER_STATUS_LABELS.get(status, UNKNOWN_STATUS_LABEL)
+
+
+def user_role_label(role):
+    return dict(User.ROLES).get(role, UNKNOWN_ROLE_LABEL)
+
+
+def availability_label(is_available):
+    return "Доступно" if is_available else "Не доступно"
+
 
 class CompletedOrderResource(resources.ModelResource):
     class Meta:
@@ -25,13 +47,7 @@ class CompletedOrderResource(resources.ModelResource):
         )
 
     def dehydrate_status(self, order):
-        status_mapping = {
-            "new": "Новый",
-            "preparing": "Готовится",
-            "delivering": "Доставляется",
-            "completed": "Завершен",
-        }
-        return status_mapping.get(order.status, "Неизвестный статус")
+        return order_status_label(order.status)
 
     def dehydrate_user(self, order):
         return f"{order.user.first_name} {order.user.last_name} ({order.user.username})"
@@ -43,8 +59,7 @@ class UserResource(resources.ModelResource):
         fields = ("username", "first_name", "last_name", "email", "role")
 
     def dehydrate_role(self, user):
-        role_mapping = dict(User.ROLES)
-        return role_mapping.get(user.role, "Неизвестная роль")
+        return user_role_label(user.role)
 
 
 class MenuItemResource(resources.ModelResource):
@@ -54,4 +69,4 @@ class MenuItemResource(resources.ModelResource):
         export_order = ("id", "name", "price", "is_available", "restaurant__name")
 
     def dehydrate_is_available(self, menu_item):
-        return "Доступно" if menu_item.is_available else "Не доступно"
+        return availability_label(menu_item.is_available)
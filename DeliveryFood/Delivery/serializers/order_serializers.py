@@ -6,14 +6,8 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = "__all__"
-
-    # Валидация на общую стоимость
-    def validate_total_price(self, value):
-        if value < 0:
-            raise serializers.ValidationError(
-                "Общая стоимость не может быть отрицательной."
-            )
-        return value
+        # Стоимость ведётся по позициям заказа и не принимается от клиента
+        read_only_fields = ("total_price",)
 
     # Валидация на статус
     def validate_status(self, value):
@@ -27,7 +21,8 @@ class OrderSerializer(serializers.ModelSerializer):
     # Дополнительная валидация
     def validate(self, data):
         # Если статус "completed", проверим, что заказ имеет допустимую цену
-        if data.get("status") == "completed" and data.get("total_price", 0) <= 0:
+        total_price = self.instance.total_price if self.instance else 0
+        if data.get("status") == "completed" and total_price <= 0:
             raise serializers.ValidationError(
                 "Для статуса 'completed' общая стоимость должна быть положительной."
             )
@@ -50,6 +45,7 @@ class OrderMenuItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderMenuItem
         fields = "__all__"
+        read_only_fields = ("unit_price",)
 
     def validate_quantity(self, value):
         if value <= 0:
@@ -62,3 +58,45 @@ class OrderMenuItemSerializer(serializers.ModelSerializer):
                 "Ресторан блюда должен совпадать с рестораном заказа."
             )
         return data
+
+
+class BulkOrderItemSerializer(serializers.Serializer):
+    menu_item = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class BulkOrderSerializer(serializers.Serializer):
+    """
+    Заказ с позициями для пакетной загрузки.
+    Связанные объекты проверяются по заранее загруженному справочнику
+    из context["lookup"], без запросов на каждый заказ.
+    """
+
+    user = serializers.IntegerField()
+    restaurant = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, default="new")
+    additional_notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    link_dogovor = serializers.URLField(required=False, allow_blank=True, allow_null=True)
+    items = BulkOrderItemSerializer(many=True, allow_empty=False)
+
+    def validate(self, data):
+        lookup = self.context["lookup"]
+        errors = {}
+        if data["user"] not in lookup.user_ids:
+            errors["user"] = "Пользователь не найден."
+        if data["restaurant"] not in lookup.restaurant_ids:
+            errors["restaurant"] = "Ресторан не найден."
+
+        item_errors = {}
+        for index, item in enumerate(data["items"]):
+            menu_item = lookup.menu_items.get(item["menu_item"])
+            if menu_item is None:
+                item_errors[index] = "Блюдо не найдено."
+            elif menu_item.restaurant_id != data["restaurant"]:
+                item_errors[index] = "Ресторан блюда должен совпадать с рестораном заказа."
+        if item_errors:
+            errors["items"] = item_errors
+
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
@@ -48,3 +48,42 @@ class MenuItemSerializer(serializers.ModelSerializer):
                 "Поле 'Доступно ли блюдо' должно быть булевым значением."
             )
         return value
+
+
+class MenuCardItemSerializer(MenuItemSerializer):
+    """Блюдо в меню ресторана без счётчиков заказов: меню отдаётся из кэша."""
+
+    class Meta:
+        model = MenuItem
+        exclude = MenuItem.ORDER_COUNT_FIELDS
+
+
+class AvailabilityField(serializers.BooleanField):
+    """Доступность блюда; принимает и подписи из выгрузки («Доступно» / «Не доступно»)."""
+
+    TRUE_VALUES = serializers.BooleanField.TRUE_VALUES | {"доступно", "да", "Доступно", "Да"}
+    FALSE_VALUES = serializers.BooleanField.FALSE_VALUES | {
+        "не доступно",
+        "нет",
+        "Не доступно",
+        "Нет",
+    }
+
+
+class MenuImportRowSerializer(serializers.Serializer):
+    """Строка файла импорта меню."""
+
+    name = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    is_available = AvailabilityField(required=False)
+
+    def validate_name(self, value):
+        if not value.strip():
+            raise serializers.ValidationError("Название блюда не может быть пустым.")
+        return value.strip()
+
+    def validate_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Цена блюда должна быть больше нуля.")
+        return value
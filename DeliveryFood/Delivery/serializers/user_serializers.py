@@ -39,6 +39,8 @@ class UserSerializer(serializers.ModelSerializer):
             "last_name",
             "phone",
             "address",
+            "latitude",
+            "longitude",
             "role",
         )
         extra_kwargs = {"password": {"write_only": True}}
@@ -0,0 +1,178 @@
+"""
+Префиксный индекс для подсказок при наборе (GET /api/autocomplete/).
+
+Индекс живёт в памяти процесса: отсортированные массивы ключей по каждому
+виду объектов, поиск — bisect по префиксу без обращения к базе. Изменения
+моделей применяются сигналами после фиксации транзакции, если изменились
+название или доступность; другие процессы узнают о них по общей версии в
+кэше, которую сверяют не чаще раза в AUTOCOMPLETE_REFRESH_SECONDS, и тогда
+перестраивают индекс целиком в фоне (см. versioned_index).
+"""
+
+import re
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from ..models import MenuItem, Restaurant, TypeCuisine
+from .versioned_index import VersionedIndex
+
+RESTAURANTS = "restaurants"
+DISHES = "dishes"
+CUISINES = "cuisines"
+KIND_BY_MODEL = {Restaurant: RESTAURANTS, MenuItem: DISHES, TypeCuisine: CUISINES}
+
+VERSION_KEY = "autocomplete:version"
+WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text):
+    return (text or "").lower().replace("ё", "е").strip()
+
+
+def index_keys(label):
+    """
+    Ключи объекта: название целиком (совпадение с начала названия ранжируется
+    выше) и каждое следующее слово названия.
+    """
+    name = normalize(label)
+    words = WORD_RE.findall(name)
+    return [(0, name)] + [(1, word) for word in words[1:]]
+
+
+class PrefixIndex:
+    """Отсортированные массивы (ключ, id) по видам объектов и подписи объектов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # kind -> {приоритет ключа: отсортированный список (ключ, id)}
+        self.entries = {kind: {0: [], 1: []} for kind in KIND_BY_MODEL.values()}
+        self.labels = {kind: {} for kind in KIND_BY_MODEL.values()}
+
+    def _add(self, kind, object_id, label):
+        self.labels[kind][object_id] = label
+        for priority, key in index_keys(label):
+            insort(self.entries[kind][priority], (key, object_id))
+
+    def _remove(self, kind, object_id):
+        label = self.labels[kind].pop(object_id, None)
+        if label is None:
+            return
+        for priority, key in index_keys(label):
+            array = self.entries[kind][priority]
+            position = bisect_left(array, (key, object_id))
+            if position < len(array) and array[position] == (key, object_id):
+                del array[position]
+
+    def put(self, kind, object_id, label):
+        with self.lock:
+            self._remove(kind, object_id)
+            if label:
+                self._add(kind, object_id, label)
+
+    def remove(self, kind, object_id):
+        with self.lock:
+            self._remove(kind, object_id)
+
+    def load(self, kind, rows):
+        """Массовая загрузка: сортировка один раз вместо вставок по одному."""
+        labels = dict(rows)
+        arrays = {0: [], 1: []}
+        for object_id, label in labels.items():
+            for priority, key in index_keys(label):
+                arrays[priority].append((key, object_id))
+        for array in arrays.values():
+            array.sort()
+        with self.lock:
+            self.labels[kind] = labels
+            self.entries[kind] = arrays
+
+    def lookup(self, kind, prefix, limit):
+        """До limit объектов вида kind, у которых название или слово начинается с prefix."""
+        found = []
+        seen = set()
+        with self.lock:
+            for priority in (0, 1):
+                array = self.entries[kind][priority]
+                position = bisect_left(array, (prefix,))
+                while position < len(array) and len(found) < limit:
+                    key, object_id = array[position]
+                    if not key.startswith(prefix):
+                        break
+                    if object_id not in seen:
+                        seen.add(object_id)
+                        found.append({"id": object_id, "name": self.labels[kind][object_id]})
+                    position += 1
+        return found
+
+
+def build_index():
+    """Строит индекс из базы: по одному запросу values_list на вид объектов."""
+    index = PrefixIndex()
+    index.load(RESTAURANTS, Restaurant.objects.values_list("pk", "name"))
+    index.load(DISHES, MenuItem.objects.filter(is_available=True).values_list("pk", "name"))
+    index.load(CUISINES, TypeCuisine.objects.values_list("pk", "name"))
+    return index
+
+
+_index = VersionedIndex(
+    "autocomplete",
+    VERSION_KEY,
+    build_index,
+    cache_alias_setting="AUTOCOMPLETE_CACHE_ALIAS",
+    refresh_setting="AUTOCOMPLETE_REFRESH_SECONDS",
+)
+
+
+def get_index():
+    """Индекс текущего процесса (см. VersionedIndex.get)."""
+    return _index.get()
+
+
+def autocomplete(query, limit=None):
+    limit = limit or getattr(settings, "AUTOCOMPLETE_LIMIT", 5)
+    prefix = normalize(query)
+    if not prefix:
+        return {kind: [] for kind in KIND_BY_MODEL.values()}
+    index = get_index()
+    return {kind: index.lookup(kind, prefix, limit) for kind in KIND_BY_MODEL.values()}
+
+
+def indexed_fields_changed(instance, created, update_fields=None):
+    """
+    Изменились ли поля, попадающие в индекс: название и доступность блюда.
+    Если сохранённое состояние неизвестно, считается, что изменились.
+    """
+    if created:
+        return True
+    if update_fields is not None and not {"name", "is_available"} & set(update_fields):
+        return False
+    if instance.saved_name is None or instance.saved_name != instance.name:
+        return True
+    saved_is_available = getattr(instance, "saved_is_available", True)
+    return saved_is_available is None or saved_is_available != getattr(
+        instance, "is_available", True
+    )
+
+
+def apply_change(instance, deleted=False):
+    """
+    Применяет изменение объекта к индексу этого процесса и сдвигает общую
+    версию, чтобы остальные процессы перестроили свои индексы.
+    """
+    kind = KIND_BY_MODEL[type(instance)]
+    visible = not deleted and getattr(instance, "is_available", True)
+
+    def change(index):
+        if visible:
+            index.put(kind, instance.pk, instance.name)
+        else:
+            index.remove(kind, instance.pk)
+
+    _index.apply(change)
+
+
+def invalidate():
+    """Сбрасывает индексы всех процессов после массовых изменений в обход сигналов."""
+    _index.invalidate()
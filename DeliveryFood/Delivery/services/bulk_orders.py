@@ -0,0 +1,102 @@
+from collections import namedtuple
+
+from django.db import transaction
+from simple_history.utils import bulk_create_with_history
+
+from ..models import MenuItem, Order, OrderMenuItem, Restaurant, User
+from ..serializers.order_serializers import BulkOrderSerializer
+from . import fragment_cache
+from .counters import count_new_orders
+
+MenuItemInfo = namedtuple("MenuItemInfo", ["restaurant_id", "price"])
+BulkLookup = namedtuple("BulkLookup", ["user_ids", "restaurant_ids", "menu_items"])
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_lookup(payloads):
+    """Загружает пользователей, рестораны и блюда всех заказов тремя запросами."""
+    user_ids, restaurant_ids, menu_item_ids = set(), set(), set()
+    for payload in payloads:
+        if not isinstance(payload, dict):
+            continue
+        user_ids.add(_as_int(payload.get("user")))
+        restaurant_ids.add(_as_int(payload.get("restaurant")))
+        items = payload.get("items")
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict):
+                menu_item_ids.add(_as_int(item.get("menu_item")))
+
+    return BulkLookup(
+        user_ids=set(User.objects.filter(pk__in=user_ids - {None}).values_list("pk", flat=True)),
+        restaurant_ids=set(
+            Restaurant.objects.filter(pk__in=restaurant_ids - {None}).values_list("pk", flat=True)
+        ),
+        menu_items={
+            pk: MenuItemInfo(restaurant_id, price)
+            for pk, restaurant_id, price in MenuItem.objects.filter(
+                pk__in=menu_item_ids - {None}
+            ).values_list("pk", "restaurant_id", "price")
+        },
+    )
+
+
+def ingest_orders(payloads, user=None):
+    """
+    Создаёт пачку заказов с позициями в одной транзакции.
+    Невалидные заказы пропускаются и попадают в результат с ошибками,
+    стоимость каждого заказа считается один раз до вставки.
+    """
+    lookup = build_lookup(payloads)
+    results = [None] * len(payloads)
+    orders, order_items = [], []
+
+    for index, payload in enumerate(payloads):
+        serializer = BulkOrderSerializer(data=payload, context={"lookup": lookup})
+        if not serializer.is_valid():
+            results[index] = {"index": index, "status": "error", "errors": serializer.errors}
+            continue
+
+        data = serializer.validated_data
+        items = [
+            OrderMenuItem(
+                menu_item_id=item["menu_item"],
+                quantity=item["quantity"],
+                unit_price=lookup.menu_items[item["menu_item"]].price,
+            )
+            for item in data["items"]
+        ]
+        order = Order(
+            user_id=data["user"],
+            restaurant_id=data["restaurant"],
+            status=data["status"],
+            additional_notes=data.get("additional_notes"),
+            link_dogovor=data.get("link_dogovor"),
+            total_price=sum(item.unit_price * item.quantity for item in items),
+        )
+        orders.append((index, order, items))
+
+    with transaction.atomic():
+        bulk_create_with_history([order for _, order, _ in orders], Order, default_user=user)
+        for _, order, items in orders:
+            for item in items:
+                item.order_id = order.pk
+                order_items.append(item)
+        bulk_create_with_history(order_items, OrderMenuItem, default_user=user)
+        # bulk_create не вызывает сигналы: счётчики главной сдвигаются здесь
+        count_new_orders([order for _, order, _ in orders], order_items)
+        fragment_cache.bump_on_commit(fragment_cache.ORDERS, fragment_cache.ORDER_ITEMS)
+
+    for index, order, _ in orders:
+        results[index] = {
+            "index": index,
+            "status": "created",
+            "id": order.pk,
+            "total_price": order.total_price,
+        }
+    return results
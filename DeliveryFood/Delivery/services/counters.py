@@ -0,0 +1,240 @@
+"""
+Денормализованные счётчики главной страницы.
+
+Общие количества ресторанов, блюд и заказов хранятся строками SiteCounter,
+число заказов ресторана — в RestaurantMenuStats.order_count, число позиций
+заказов с блюдом — в MenuItem.order_count (вместе со скользящими окнами
+его ведёт dish_popularity; корзины объёма заказов ресторанов —
+cuisine_popularity). Сигналы и массовые операции
+сдвигают их F()-выражениями в своей транзакции, поэтому главная читает
+готовые значения по первичному ключу вместо COUNT(*) и соединений.
+Расхождения (правки в обход ORM, перенос заказа между ресторанами)
+находит и исправляет команда reconcile_counters; она же сверяет
+денормализованные поля статистики курьеров (courier_stats).
+"""
+
+from collections import Counter, namedtuple
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import (
+    Courier,
+    Delivery,
+    MenuItem,
+    Order,
+    OrderMenuItem,
+    Restaurant,
+    RestaurantMenuStats,
+    SiteCounter,
+    User,
+)
+from . import courier_stats, cuisine_popularity, dish_popularity, fragment_cache
+from .menu_stats import rebuild_restaurant_stats
+
+SITE_COUNTERS = {
+    SiteCounter.RESTAURANTS: Restaurant,
+    SiteCounter.DISHES: MenuItem,
+    SiteCounter.ORDERS: Order,
+}
+
+# Расхождение: (что, id или имя счётчика, сохранено, по факту)
+Mismatch = namedtuple("Mismatch", ["kind", "key", "saved", "actual"])
+
+
+def live_site_counters():
+    return {name: model.objects.count() for name, model in SITE_COUNTERS.items()}
+
+
+def shift_site_counter(name, delta):
+    """Сдвигает общий счётчик; при отсутствии строки создаёт её по факту."""
+    if not delta:
+        return
+    updated = SiteCounter.objects.filter(name=name).update(value=F("value") + delta)
+    if not updated:
+        # Изменение уже записано в таблицу, поэтому живой подсчёт его учитывает
+        SiteCounter.objects.get_or_create(
+            name=name, defaults={"value": SITE_COUNTERS[name].objects.count()}
+        )
+
+
+def site_counters():
+    """Значения общих счётчиков одним запросом по первичному ключу."""
+    values = dict(
+        SiteCounter.objects.filter(name__in=SITE_COUNTERS).values_list("name", "value")
+    )
+    for name in SITE_COUNTERS.keys() - values.keys():
+        counter, _ = SiteCounter.objects.get_or_create(
+            name=name, defaults={"value": SITE_COUNTERS[name].objects.count()}
+        )
+        values[name] = counter.value
+    return values
+
+
+def _group_by_delta(deltas):
+    """{id: сдвиг} -> {сдвиг: [id]}: один UPDATE на каждое значение сдвига."""
+    groups = {}
+    for key, delta in deltas.items():
+        if delta:
+            groups.setdefault(delta, []).append(key)
+    return groups
+
+
+def shift_restaurant_orders(deltas):
+    """Сдвигает число заказов ресторанов: deltas = {restaurant_id: изменение}."""
+    for delta, restaurant_ids in _group_by_delta(deltas).items():
+        updated = RestaurantMenuStats.objects.filter(restaurant_id__in=restaurant_ids).update(
+            order_count=F("order_count") + delta, updated_at=timezone.now()
+        )
+        if updated < len(restaurant_ids) and delta > 0:
+            # Сводки ещё нет — создаём по факту (заказ уже записан)
+            existing = set(
+                RestaurantMenuStats.objects.filter(restaurant_id__in=restaurant_ids)
+                .values_list("restaurant_id", flat=True)
+            )
+            for restaurant_id in set(restaurant_ids) - existing:
+                rebuild_restaurant_stats(restaurant_id)
+
+
+def count_new_orders(orders, order_items):
+    """Учитывает пачку заказов и позиций, созданных bulk_create в обход сигналов."""
+    shift_site_counter(SiteCounter.ORDERS, len(orders))
+    shift_restaurant_orders(Counter(order.restaurant_id for order in orders))
+    orders_by_id = {order.pk: order for order in orders}
+    dish_popularity.record_lines(
+        (item.menu_item_id, orders_by_id[item.order_id].created_at, 1) for item in order_items
+    )
+    cuisine_popularity.record_quantities(
+        (
+            orders_by_id[item.order_id].restaurant_id,
+            orders_by_id[item.order_id].created_at,
+            item.quantity,
+        )
+        for item in order_items
+    )
+
+
+def live_dish_orders():
+    """Число позиций заказов по блюдам: {menu_item_id: n} (только ненулевые)."""
+    return dict(
+        OrderMenuItem.objects.order_by()
+        .values("menu_item_id")
+        .annotate(n=Count("pk"))
+        .values_list("menu_item_id", "n")
+    )
+
+
+def live_restaurant_orders():
+    return dict(
+        Order.objects.order_by()
+        .values("restaurant_id")
+        .annotate(n=Count("pk"))
+        .values_list("restaurant_id", "n")
+    )
+
+
+def live_courier_deliveries():
+    """Число доставок в процессе по курьерам: {courier_id: n} (только ненулевые)."""
+    return dict(
+        Delivery.objects.filter(delivery_status=courier_stats.IN_PROGRESS)
+        .order_by()
+        .values("courier_id")
+        .annotate(n=Count("pk"))
+        .values_list("courier_id", "n")
+    )
+
+
+def find_mismatches():
+    """Сравнивает все счётчики с живыми агрегатами. Возвращает список Mismatch."""
+    mismatches = []
+
+    stored_site = dict(SiteCounter.objects.values_list("name", "value"))
+    for name, actual in live_site_counters().items():
+        if stored_site.get(name) != actual:
+            mismatches.append(Mismatch("site", name, stored_site.get(name), actual))
+
+    live = live_restaurant_orders()
+    for restaurant_id, saved in RestaurantMenuStats.objects.values_list(
+        "restaurant_id", "order_count"
+    ):
+        actual = live.pop(restaurant_id, 0)
+        if saved != actual:
+            mismatches.append(Mismatch("restaurant", restaurant_id, saved, actual))
+    # Заказы ресторанов без сводки
+    for restaurant_id, actual in live.items():
+        mismatches.append(Mismatch("restaurant", restaurant_id, None, actual))
+
+    live = live_dish_orders()
+    for menu_item_id, saved in MenuItem.objects.filter(order_count__gt=0).values_list(
+        "pk", "order_count"
+    ):
+        actual = live.pop(menu_item_id, 0)
+        if saved != actual:
+            mismatches.append(Mismatch("dish", menu_item_id, saved, actual))
+    for menu_item_id, actual in live.items():
+        if actual:
+            mismatches.append(Mismatch("dish", menu_item_id, 0, actual))
+
+    live = live_courier_deliveries()
+    for courier_id, saved in Courier.objects.values_list("pk", "active_deliveries"):
+        actual = live.get(courier_id, 0)
+        if saved != actual:
+            mismatches.append(Mismatch("courier", courier_id, saved, actual))
+    for courier_id, saved, actual in Courier.objects.exclude(
+        user_is_active=F("user__is_active")
+    ).values_list("pk", "user_is_active", "user__is_active"):
+        mismatches.append(Mismatch("courier-user", courier_id, saved, actual))
+
+    return sorted(mismatches, key=lambda mismatch: (mismatch.kind, mismatch.key))
+
+
+def _dish_count_subquery():
+    return Coalesce(
+        Subquery(
+            OrderMenuItem.objects.filter(menu_item_id=OuterRef("pk"))
+            .order_by()
+            .values("menu_item_id")
+            .annotate(n=Count("pk"))
+            .values("n")
+        ),
+        Value(0),
+    )
+
+
+def repair(mismatches):
+    """
+    Пересчитывает счётчики из списка расхождений по таблицам в момент
+    исправления (а не по снимку сверки).
+    """
+    by_kind = {}
+    for mismatch in mismatches:
+        by_kind.setdefault(mismatch.kind, []).append(mismatch)
+
+    with transaction.atomic():
+        for mismatch in by_kind.get("site", []):
+            SiteCounter.objects.update_or_create(
+                name=mismatch.key,
+                defaults={"value": SITE_COUNTERS[mismatch.key].objects.count()},
+            )
+        for mismatch in by_kind.get("restaurant", []):
+            rebuild_restaurant_stats(mismatch.key)
+        dish_ids = [mismatch.key for mismatch in by_kind.get("dish", [])]
+        if dish_ids:
+            MenuItem.objects.filter(pk__in=dish_ids).update(order_count=_dish_count_subquery())
+        courier_ids = [mismatch.key for mismatch in by_kind.get("courier", [])]
+        if courier_ids:
+            courier_stats.recount_active_deliveries(courier_ids)
+        courier_ids = [mismatch.key for mismatch in by_kind.get("courier-user", [])]
+        if courier_ids:
+            Courier.objects.filter(pk__in=courier_ids).update(
+                user_is_active=Subquery(
+                    User.objects.filter(pk=OuterRef("user_id")).values("is_active")
+                )
+            )
+        if mismatches:
+            fragment_cache.bump_on_commit(
+                fragment_cache.RESTAURANTS, fragment_cache.DISHES, fragment_cache.ORDERS
+            )
+    return len(mismatches)
@@ -0,0 +1,291 @@
+"""
+Приём отметок GPS от курьеров.
+
+Отметки не пишутся в базу по одной: запрос только проверяет их и кладёт в
+кольцевые буферы процесса (не больше COURIER_LOCATION_BUFFER_SIZE последних
+отметок на курьера; при отставании записи старые вытесняются). Ещё не
+записанная отметка отдаётся как последнее положение, только если она новее
+положения в базе (его могли обновить другие процессы).
+
+Раз в COURIER_LOCATION_FLUSH_SECONDS фоновый поток процесса забирает
+накопленное, прореживает трек до одной точки за COURIER_TRACK_SAMPLE_SECONDS
+и записывает пачкой: точки — bulk_create в CourierLocation, последнее
+положение — одним UPDATE полей положения Courier (они не ведут историю) с
+условием location_updated_at < новой отметки, чтобы запоздавшая пачка не
+затёрла более свежее положение.
+Поток запускается при первой отметке и дописывает остаток при выходе.
+Устаревшие точки удаляет периодическая задача.
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, DateTimeField, FloatField, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Courier, CourierLocation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 120
+DEFAULT_FLUSH_SECONDS = 5
+DEFAULT_SAMPLE_SECONDS = 15
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_BATCH_SIZE = 1000
+# Отметки из будущего (часы телефона спешат) не принимаются
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+Ping = namedtuple("Ping", ["courier_id", "latitude", "longitude", "recorded_at"])
+FlushResult = namedtuple("FlushResult", ["couriers", "points", "dropped"])
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def parse_pings(payloads, now=None):
+    """
+    Проверяет отметки {courier, latitude, longitude, recorded_at?} без
+    обращения к базе. Возвращает принятые Ping и ошибки по номерам отметок.
+    Без recorded_at время отметки — время приёма.
+    """
+    now = now or timezone.now()
+    latest_allowed = now + MAX_CLOCK_SKEW
+    pings, errors = [], []
+    for index, payload in enumerate(payloads):
+        try:
+            courier_id = int(payload["courier"])
+            latitude = float(payload["latitude"])
+            longitude = float(payload["longitude"])
+            recorded_at = payload.get("recorded_at")
+            recorded_at = parse_datetime(recorded_at) if recorded_at else now
+        except (KeyError, TypeError, ValueError, AttributeError):
+            errors.append({"index": index, "error": "Нужны courier, latitude и longitude."})
+            continue
+        if recorded_at is None:
+            errors.append({"index": index, "error": "Неверный формат recorded_at."})
+            continue
+        if timezone.is_naive(recorded_at):
+            recorded_at = timezone.make_aware(recorded_at)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            errors.append({"index": index, "error": "Координаты вне допустимого диапазона."})
+        elif recorded_at > latest_allowed:
+            errors.append({"index": index, "error": "Время отметки в будущем."})
+        else:
+            pings.append(Ping(courier_id, latitude, longitude, recorded_at))
+    return pings, errors
+
+
+class LocationBuffer:
+    """
+    Кольцевые буферы отметок по курьерам: pending — ещё не записанные,
+    latest — последнее известное положение.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.latest = {}
+
+    def add(self, pings):
+        with self.lock:
+            for ping in pings:
+                track = self.pending.get(ping.courier_id)
+                if track is None:
+                    track = self.pending[ping.courier_id] = deque(maxlen=self.size)
+                track.append(ping)
+                latest = self.latest.get(ping.courier_id)
+                if latest is None or ping.recorded_at >= latest.recorded_at:
+                    self.latest[ping.courier_id] = ping
+
+    def take(self):
+        """Забирает накопленные отметки: {courier_id: deque}."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        return pending
+
+    def forget(self, courier_ids):
+        with self.lock:
+            for courier_id in courier_ids:
+                self.latest.pop(courier_id, None)
+
+    def settle(self, written):
+        """
+        Убирает из latest отметки, уже записанные в базу: {courier_id: время}.
+        Более новые отметки, пришедшие во время записи, остаются.
+        """
+        with self.lock:
+            for courier_id, recorded_at in written.items():
+                latest = self.latest.get(courier_id)
+                if latest is not None and latest.recorded_at <= recorded_at:
+                    del self.latest[courier_id]
+
+
+def update_positions(pings):
+    """
+    Переносит отметки в положение курьеров одним UPDATE ... CASE. Строка
+    обновляется, только если отметка новее записанной: пачки разных
+    процессов могут прийти в базу не по порядку.
+    """
+    if not pings:
+        return 0
+
+    def by_courier(attribute, output_field):
+        return Case(
+            *[When(pk=ping.courier_id, then=Value(getattr(ping, attribute))) for ping in pings],
+            output_field=output_field,
+        )
+
+    recorded_at = by_courier("recorded_at", DateTimeField())
+    return (
+        Courier.objects.filter(pk__in=[ping.courier_id for ping in pings])
+        .filter(Q(location_updated_at__isnull=True) | Q(location_updated_at__lt=recorded_at))
+        .update(
+            latitude=by_courier("latitude", FloatField()),
+            longitude=by_courier("longitude", FloatField()),
+            location_updated_at=recorded_at,
+        )
+    )
+
+
+def downsample(track, last_kept=None, sample_seconds=DEFAULT_SAMPLE_SECONDS):
+    """
+    Точки трека по времени, не чаще одной за sample_seconds; отсчёт идёт от
+    last_kept — последней точки, записанной предыдущими пачками.
+    """
+    step = timedelta(seconds=sample_seconds)
+    kept = []
+    for ping in sorted(track, key=lambda ping: ping.recorded_at):
+        if last_kept is None or ping.recorded_at - last_kept >= step:
+            kept.append(ping)
+            last_kept = ping.recorded_at
+    return kept
+
+
+class LocationFlusher:
+    """Записывает содержимое буфера пачками; работает в фоновом потоке процесса."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.last_kept = {}
+        self.thread = None
+        self.started_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def flush(self):
+        with self.flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        pending = self.buffer.take()
+        if not pending:
+            return FlushResult(0, 0, 0)
+
+        existing = set(
+            Courier.objects.filter(pk__in=pending.keys()).values_list("pk", flat=True)
+        )
+        unknown = pending.keys() - existing
+        self.buffer.forget(unknown)
+        dropped = sum(len(pending.pop(courier_id)) for courier_id in unknown)
+
+        sample_seconds = _setting("COURIER_TRACK_SAMPLE_SECONDS", DEFAULT_SAMPLE_SECONDS)
+        points, couriers = [], []
+        for courier_id, track in pending.items():
+            kept = downsample(track, self.last_kept.get(courier_id), sample_seconds)
+            if kept:
+                self.last_kept[courier_id] = kept[-1].recorded_at
+            points.extend(
+                CourierLocation(
+                    courier_id=courier_id,
+                    latitude=ping.latitude,
+                    longitude=ping.longitude,
+                    recorded_at=ping.recorded_at,
+                )
+                for ping in kept
+            )
+            # Положение курьера — самая свежая отметка, даже если в трек она не попала
+            couriers.append(max(track, key=lambda ping: ping.recorded_at))
+
+        batch_size = _setting("COURIER_LOCATION_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        CourierLocation.objects.bulk_create(points, batch_size=batch_size)
+        for start in range(0, len(couriers), batch_size):
+            update_positions(couriers[start:start + batch_size])
+        self.buffer.settle({ping.courier_id: ping.recorded_at for ping in couriers})
+        return FlushResult(len(couriers), len(points), dropped)
+
+    def run(self):
+        interval = _setting("COURIER_LOCATION_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS)
+        while not self.wakeup.wait(interval):
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                # Поток не должен умирать из-за одной неудачной пачки: отметки
+                # этой пачки потеряны, следующие запишутся как обычно
+                logger.exception("Не удалось записать положения курьеров")
+            finally:
+                close_old_connections()
+
+    def ensure_started(self):
+        if self.thread is not None:
+            return
+        with self.started_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="courier-location-flusher", daemon=True
+                )
+                self.thread.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        """Останавливает поток и дописывает остаток буфера."""
+        self.wakeup.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Не удалось записать положения курьеров")
+
+
+_buffer = LocationBuffer(_setting("COURIER_LOCATION_BUFFER_SIZE", DEFAULT_BUFFER_SIZE))
+_flusher = LocationFlusher(_buffer)
+
+
+def ingest(pings):
+    """Кладёт отметки в буфер процесса; запись в базу — забота фонового потока."""
+    _buffer.add(pings)
+    _flusher.ensure_started()
+
+
+def flush():
+    """Немедленная запись буфера этого процесса (для команд и тестов)."""
+    return _flusher.flush()
+
+
+def latest_position(courier):
+    """
+    Последнее положение курьера (Ping): ещё не записанная отметка из буфера
+    этого процесса, если она новее положения в базе, иначе положение из базы.
+    """
+    stored = Ping(courier.pk, courier.latitude, courier.longitude, courier.location_updated_at)
+    ping = _buffer.latest.get(courier.pk)
+    if ping is None or (stored.recorded_at is not None and stored.recorded_at >= ping.recorded_at):
+        return stored
+    return ping
+
+
+def prune_tracks(now=None):
+    """Удаляет точки треков старше COURIER_TRACK_RETENTION_DAYS."""
+    now = now or timezone.now()
+    days = _setting("COURIER_TRACK_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+    deleted, _ = CourierLocation.objects.filter(
+        recorded_at__lt=now - timedelta(days=days)
+    ).delete()
+    return deleted
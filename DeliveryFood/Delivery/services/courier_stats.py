@@ -0,0 +1,78 @@
+"""
+Статистика курьеров для дашбордов.
+
+Активность пользователя (User.is_active) и число доставок в процессе
+денормализованы в Courier.user_is_active и Courier.active_deliveries.
+Сигналы сохранения и удаления доставок сдвигают счётчик F()-выражениями,
+сохранение пользователя переносит активность в профиль курьера, массовые
+операции пересчитывают затронутых курьеров. Поэтому статистика по типам
+транспорта — один сгруппированный запрос по частичному покрывающему
+индексу без соединений с User и Delivery. Расхождения находит и исправляет
+команда reconcile_counters.
+"""
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from ..models import Courier, Delivery
+
+IN_PROGRESS = "in_progress"
+
+
+def shift_active_deliveries(deltas):
+    """Сдвигает число доставок в процессе: deltas = {courier_id: изменение}."""
+    groups = {}
+    for courier_id, delta in deltas.items():
+        if delta:
+            groups.setdefault(delta, []).append(courier_id)
+    for delta, courier_ids in groups.items():
+        Courier.objects.filter(pk__in=courier_ids).update(
+            active_deliveries=Greatest(F("active_deliveries") + delta, Value(0))
+        )
+
+
+def active_deliveries_subquery():
+    return Coalesce(
+        Subquery(
+            Delivery.objects.filter(courier_id=OuterRef("pk"), delivery_status=IN_PROGRESS)
+            .order_by()
+            .values("courier_id")
+            .annotate(n=Count("pk"))
+            .values("n")
+        ),
+        Value(0),
+    )
+
+
+def recount_active_deliveries(courier_ids):
+    """Пересчитывает счётчик доставок курьеров по таблице (после массовых изменений)."""
+    return Courier.objects.filter(pk__in=courier_ids).update(
+        active_deliveries=active_deliveries_subquery()
+    )
+
+
+def vehicle_stats_rows():
+    """Один сгруппированный запрос: активные и занятые курьеры по типам транспорта."""
+    return (
+        Courier.objects.filter(user_is_active=True)
+        .order_by()
+        .values("vehicle_type")
+        .annotate(active=Count("pk"), busy=Count("pk", filter=Q(active_deliveries__gt=0)))
+    )
+
+
+def vehicle_stats():
+    """
+    Активные курьеры по типам транспорта, из них занятые (есть доставка в
+    процессе) и свободные: {тип: {"active", "busy", "free"}}.
+    """
+    stats = {
+        vehicle: {"active": 0, "busy": 0, "free": 0} for vehicle, _ in Courier.VEHICLE_CHOICES
+    }
+    for row in vehicle_stats_rows():
+        stats[row["vehicle_type"]] = {
+            "active": row["active"],
+            "busy": row["busy"],
+            "free": row["active"] - row["busy"],
+        }
+    return stats
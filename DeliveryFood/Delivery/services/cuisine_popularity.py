@@ -0,0 +1,189 @@
+"""
+Популярность кухонь ресторанов по объёму заказов.
+
+Заказанное количество блюд складывается в почасовые корзины
+RestaurantOrderVolume по ресторану и часу создания заказа. Создание,
+изменение количества, перенос и удаление позиций сразу сдвигают корзины
+(сигналы и массовые операции, как корзины блюд в dish_popularity). Окна
+24 часа / 7 дней / 30 дней считаются суммой корзин периодической задачей,
+поэтому история заказов заново не сканируется, а окна сдвигаются и без
+новых заказов. Перенос заказа в другой ресторан корзины не двигает — их
+пересобирает rebuild_cuisine_popularity.
+"""
+
+from collections import Counter, namedtuple
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+
+from ..models import Order, OrderMenuItem, RestaurantCuisine, RestaurantOrderVolume
+
+REBUILD_BATCH_SIZE = 500
+
+# Окно -> (поле RestaurantCuisine, длительность)
+WINDOWS = {
+    "24h": ("popularity_24h", timedelta(hours=24)),
+    "7d": ("popularity", timedelta(days=7)),
+    "30d": ("popularity_30d", timedelta(days=30)),
+}
+DEFAULT_WINDOW = "7d"
+LONGEST_WINDOW = max(duration for _, duration in WINDOWS.values())
+
+RefreshResult = namedtuple("RefreshResult", ["updated_links", "pruned_buckets"])
+
+
+def hour_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(now, duration):
+    """Первая почасовая корзина окна: текущий час входит в окно."""
+    return hour_start(now) - duration + timedelta(hours=1)
+
+
+def shift_buckets(model, owner_field, value_field, volumes):
+    """
+    Сдвигает поле value_field почасовых корзин model: volumes =
+    {(id владельца, час): сдвиг}. Недостающие корзины создаются пустыми с
+    ignore_conflicts, поэтому параллельные заказы одного часа не сталкиваются
+    на уникальном ключе; значение не уходит ниже нуля.
+    """
+    model.objects.bulk_create(
+        [
+            model(**{owner_field: owner_id, "hour": hour})
+            for (owner_id, hour), delta in volumes.items()
+            if delta > 0
+        ],
+        ignore_conflicts=True,
+    )
+    groups = {}
+    for (owner_id, hour), delta in volumes.items():
+        if delta:
+            groups.setdefault((hour, delta), []).append(owner_id)
+    for (hour, delta), owner_ids in groups.items():
+        model.objects.filter(hour=hour, **{f"{owner_field}__in": owner_ids}).update(
+            **{value_field: Greatest(F(value_field) + delta, Value(0))}
+        )
+
+
+def record_quantities(lines, now=None):
+    """
+    Сдвигает корзины ресторанов: lines — последовательность (restaurant_id,
+    время создания заказа, сдвиг количества). Часы старше самого длинного
+    окна пропускаются.
+    """
+    oldest_hour = window_start(now or timezone.now(), LONGEST_WINDOW)
+    volumes = Counter()
+    for restaurant_id, created_at, delta in lines:
+        hour = hour_start(created_at)
+        if hour >= oldest_hour:
+            volumes[(restaurant_id, hour)] += delta
+    shift_buckets(RestaurantOrderVolume, "restaurant_id", "quantity", volumes)
+
+
+def record_order_quantities(deltas, now=None):
+    """Сдвигает корзины ресторанов заказов: deltas = {order_id: сдвиг количества}."""
+    deltas = {order_id: delta for order_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    orders = Order.objects.filter(pk__in=deltas).values_list("pk", "restaurant_id", "created_at")
+    record_quantities(
+        (
+            (restaurant_id, created_at, deltas[order_id])
+            for order_id, restaurant_id, created_at in orders
+        ),
+        now,
+    )
+
+
+def quantity_deltas_on_save(item, created):
+    """
+    Изменения заказанного количества после сохранения позиции: {order_id:
+    сдвиг}. При переносе позиции в другой заказ прежнее количество
+    вычитается из старого заказа. Пусто, если прежнее состояние неизвестно.
+    """
+    if created:
+        return {item.order_id: item.quantity}
+    if item.saved_quantity is None:
+        return {}
+    if item.saved_order_id != item.order_id:
+        return {item.saved_order_id: -item.saved_quantity, item.order_id: item.quantity}
+    return {item.order_id: item.quantity - item.saved_quantity}
+
+
+def quantity_deltas_on_delete(item):
+    """Изменение заказанного количества после удаления позиции: {order_id: сдвиг}."""
+    if item.saved_quantity is None:
+        return {item.order_id: -item.quantity}
+    return {item.saved_order_id: -item.saved_quantity}
+
+
+def window_totals(now=None):
+    """Количество заказанных блюд по ресторанам за каждое окно: {restaurant_id: {поле: n}}."""
+    now = now or timezone.now()
+    sums = {
+        field: Sum("quantity", filter=Q(hour__gte=window_start(now, duration)))
+        for field, duration in WINDOWS.values()
+    }
+    rows = (
+        RestaurantOrderVolume.objects.filter(hour__gte=window_start(now, LONGEST_WINDOW))
+        .order_by()
+        .values("restaurant_id")
+        .annotate(**sums)
+    )
+    return {
+        row.pop("restaurant_id"): {field: value or 0 for field, value in row.items()}
+        for row in rows
+    }
+
+
+def refresh_popularity(now=None):
+    """
+    Переносит суммы окон во все связи ресторанов с кухнями (обновляются только
+    изменившиеся) и удаляет корзины, вышедшие из самого длинного окна.
+    """
+    now = now or timezone.now()
+    totals = window_totals(now)
+    fields = [field for field, _ in WINDOWS.values()]
+    empty = dict.fromkeys(fields, 0)
+
+    changed = []
+    for link in RestaurantCuisine.objects.only("pk", "restaurant_id", *fields):
+        values = totals.get(link.restaurant_id, empty)
+        if any(getattr(link, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(link, field, value)
+            changed.append(link)
+
+    with transaction.atomic():
+        RestaurantCuisine.objects.bulk_update(changed, fields, batch_size=500)
+        pruned, _ = RestaurantOrderVolume.objects.filter(
+            hour__lt=window_start(now, LONGEST_WINDOW)
+        ).delete()
+    return RefreshResult(len(changed), pruned)
+
+
+def rollup_cuisine_popularity(now=None):
+    """Сдвигает окна популярности кухонь по корзинам."""
+    return refresh_popularity(now)
+
+
+def rebuild_cuisine_popularity(now=None):
+    """Пересобирает корзины с нуля по позициям заказов за самое длинное окно."""
+    now = now or timezone.now()
+    rows = (
+        OrderMenuItem.objects.filter(order__created_at__gte=window_start(now, LONGEST_WINDOW))
+        .order_by()
+        .values(restaurant_id=F("order__restaurant_id"), hour=TruncHour("order__created_at"))
+        .annotate(quantity=Sum("quantity"))
+    )
+    with transaction.atomic():
+        RestaurantOrderVolume.objects.all().delete()
+        RestaurantOrderVolume.objects.bulk_create(
+            (RestaurantOrderVolume(**row) for row in rows.iterator()),
+            batch_size=REBUILD_BATCH_SIZE,
+        )
+    return refresh_popularity(now)
@@ -0,0 +1,178 @@
+"""
+Рейтинг популярных блюд по числу позиций заказов.
+
+Счётчики хранятся в самих блюдах: order_count — за всё время,
+order_count_24h / _7d / _30d — за скользящие окна, и читаются частичными
+индексами по доступным блюдам (по всем ресторанам и внутри ресторана),
+поэтому первые N строк рейтинга — это N строк индекса, а не GROUP BY по
+истории заказов.
+
+Создание и удаление позиций сразу сдвигает счётчики и почасовую корзину
+DishOrderVolume блюда. Выход старых часов из окон учитывает периодическая
+задача: она пересчитывает окна по корзинам и удаляет корзины старше
+самого длинного окна.
+"""
+
+from collections import Counter, namedtuple
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+
+from ..models import DishOrderVolume, MenuItem, OrderMenuItem
+from .cuisine_popularity import hour_start, shift_buckets, window_start
+
+# Окно -> (поле MenuItem, длительность; None — за всё время)
+WINDOWS = {
+    "all": ("order_count", None),
+    "24h": ("order_count_24h", timedelta(hours=24)),
+    "7d": ("order_count_7d", timedelta(days=7)),
+    "30d": ("order_count_30d", timedelta(days=30)),
+}
+DEFAULT_WINDOW = "all"
+ROLLING_WINDOWS = {field: duration for field, duration in WINDOWS.values() if duration}
+LONGEST_WINDOW = max(ROLLING_WINDOWS.values())
+REFRESH_CHUNK_SIZE = 500
+
+RefreshResult = namedtuple("RefreshResult", ["updated_dishes", "pruned_buckets"])
+
+
+def top_dishes(window=DEFAULT_WINDOW, restaurant_id=None):
+    """Доступные блюда по убыванию числа позиций заказов за окно."""
+    dishes = MenuItem.objects.filter(is_available=True)
+    if restaurant_id is not None:
+        dishes = dishes.filter(restaurant_id=restaurant_id)
+    return dishes.order_by("-" + WINDOWS[window][0])
+
+
+def _shift(field, delta):
+    # Счётчик не уходит ниже нуля, даже если позиция была учтена не полностью
+    return Greatest(F(field) + delta, Value(0))
+
+
+def _shift_dishes(shifts):
+    """{menu_item_id: {поле: сдвиг}} -> по одному UPDATE на каждый набор сдвигов."""
+    groups = {}
+    for menu_item_id, fields in shifts.items():
+        key = tuple(sorted((field, delta) for field, delta in fields.items() if delta))
+        if key:
+            groups.setdefault(key, []).append(menu_item_id)
+    for key, menu_item_ids in groups.items():
+        MenuItem.objects.filter(pk__in=menu_item_ids).update(
+            **{field: _shift(field, delta) for field, delta in key}
+        )
+
+
+def record_lines(lines, now=None):
+    """
+    Учитывает созданные (+1) и удалённые (-1) позиции заказов:
+    lines — последовательность (menu_item_id, время создания заказа, сдвиг).
+    Время может быть None (заказ уже удалён): тогда сдвигается только
+    счётчик за всё время.
+    """
+    now = now or timezone.now()
+    starts = {field: window_start(now, duration) for field, duration in ROLLING_WINDOWS.items()}
+    oldest_hour = window_start(now, LONGEST_WINDOW)
+
+    shifts, volumes = {}, Counter()
+    for menu_item_id, created_at, delta in lines:
+        fields = shifts.setdefault(menu_item_id, Counter())
+        fields["order_count"] += delta
+        if created_at is None:
+            continue
+        hour = hour_start(created_at)
+        if hour < oldest_hour:
+            continue
+        volumes[(menu_item_id, hour)] += delta
+        for field, start in starts.items():
+            if hour >= start:
+                fields[field] += delta
+
+    _shift_dishes(shifts)
+    shift_buckets(DishOrderVolume, "menu_item_id", "lines", volumes)
+
+
+def window_totals(menu_item_ids, now):
+    """Позиции заказов за каждое скользящее окно: {menu_item_id: {поле: n}}."""
+    sums = {
+        field: Sum("lines", filter=Q(hour__gte=window_start(now, duration)))
+        for field, duration in ROLLING_WINDOWS.items()
+    }
+    rows = (
+        DishOrderVolume.objects.filter(
+            menu_item_id__in=menu_item_ids, hour__gte=window_start(now, LONGEST_WINDOW)
+        )
+        .order_by()
+        .values("menu_item_id")
+        .annotate(**sums)
+    )
+    return {
+        row.pop("menu_item_id"): {field: value or 0 for field, value in row.items()}
+        for row in rows
+    }
+
+
+def refresh_windows(now=None):
+    """
+    Пересчитывает скользящие окна по корзинам для блюд, у которых есть
+    корзины или ненулевые окна (обновляются только изменившиеся), и удаляет
+    корзины, вышедшие из самого длинного окна.
+    """
+    now = now or timezone.now()
+    fields = list(ROLLING_WINDOWS)
+    empty = dict.fromkeys(fields, 0)
+    dish_ids = set(
+        DishOrderVolume.objects.filter(hour__gte=window_start(now, LONGEST_WINDOW))
+        .values_list("menu_item_id", flat=True)
+        .distinct()
+    )
+    dish_ids.update(
+        MenuItem.objects.filter(
+            Q(order_count_24h__gt=0) | Q(order_count_7d__gt=0) | Q(order_count_30d__gt=0)
+        ).values_list("pk", flat=True)
+    )
+
+    updated = 0
+    dish_ids = sorted(dish_ids)
+    for start in range(0, len(dish_ids), REFRESH_CHUNK_SIZE):
+        chunk = dish_ids[start:start + REFRESH_CHUNK_SIZE]
+        # Корзины и счётчики читаются в одной транзакции с записью,
+        # чтобы не затереть сдвиги от заказов, пришедших между ними
+        with transaction.atomic():
+            dishes = list(
+                MenuItem.objects.select_for_update().filter(pk__in=chunk).only("pk", *fields)
+            )
+            totals = window_totals(chunk, now)
+            changed = []
+            for dish in dishes:
+                values = totals.get(dish.pk, empty)
+                if any(getattr(dish, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(dish, field, value)
+                    changed.append(dish)
+            MenuItem.objects.bulk_update(changed, fields)
+        updated += len(changed)
+
+    pruned, _ = DishOrderVolume.objects.filter(
+        hour__lt=window_start(now, LONGEST_WINDOW)
+    ).delete()
+    return RefreshResult(updated, pruned)
+
+
+def rebuild_buckets(now=None):
+    """Пересобирает почасовые корзины с нуля по позициям заказов за самое длинное окно."""
+    now = now or timezone.now()
+    rows = (
+        OrderMenuItem.objects.filter(order__created_at__gte=window_start(now, LONGEST_WINDOW))
+        .order_by()
+        .values("menu_item_id", hour=TruncHour("order__created_at"))
+        .annotate(lines=Count("pk"))
+    )
+    with transaction.atomic():
+        DishOrderVolume.objects.all().delete()
+        DishOrderVolume.objects.bulk_create(
+            (DishOrderVolume(**row) for row in rows.iterator()), batch_size=REFRESH_CHUNK_SIZE
+        )
+    return refresh_windows(now)
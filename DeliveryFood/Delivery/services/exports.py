@@ -0,0 +1,267 @@
+import csv
+import itertools
+import json
+import re
+import zipfile
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from ..resources import availability_label, order_status_label
+
+DEFAULT_CHUNK_SIZE = 2000
+
+ExportColumn = namedtuple("ExportColumn", ["field", "formatter"])
+ExportSpec = namedtuple("ExportSpec", ["filename", "columns"])
+
+# Колонки совпадают с CompletedOrderResource и MenuItemResource
+ORDER_EXPORT = ExportSpec(
+    filename="orders",
+    columns=[
+        ExportColumn("id", None),
+        ExportColumn("user__username", None),
+        ExportColumn("restaurant__name", None),
+        ExportColumn("order_date", None),
+        ExportColumn("total_price", None),
+        ExportColumn("status", order_status_label),
+    ],
+)
+MENU_ITEM_EXPORT = ExportSpec(
+    filename="menu_items",
+    columns=[
+        ExportColumn("id", None),
+        ExportColumn("name", None),
+        ExportColumn("price", None),
+        ExportColumn("is_available", availability_label),
+        ExportColumn("restaurant__name", None),
+    ],
+)
+
+EXPORT_FORMATS = ("csv", "ndjson", "xlsx")
+
+
+def _plain(value):
+    """Приводит значение к виду, пригодному для CSV/JSON/XLSX."""
+    if isinstance(value, datetime):
+        # В книге XLSX даты хранятся без часового пояса, в местном времени
+        if timezone.is_aware(value):
+            return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def iter_rows(spec, queryset, chunk_size=None):
+    """
+    Отдаёт строки выгрузки по одной: values_list() без создания моделей и
+    iterator(), который читает базу пачками (серверный курсор на Postgres).
+    """
+    chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    fields = [column.field for column in spec.columns]
+    formatters = [column.formatter for column in spec.columns]
+    for values in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        yield [
+            formatter(value) if formatter else _plain(value)
+            for formatter, value in zip(formatters, values)
+        ]
+
+
+class _Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(spec, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column.field for column in spec.columns])
+    for row in rows:
+        yield writer.writerow(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        )
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+def _ndjson_lines(spec, rows):
+    fields = [column.field for column in spec.columns]
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False, default=_json_default) + "\n"
+
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+XLSX_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+XLSX_RELATIONSHIPS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XLSX_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+# Стили ячеек: 0 — обычная, 1 — дата и время, 2 — дата
+XLSX_DATETIME_STYLE = 1
+XLSX_DATE_STYLE = 2
+XLSX_EPOCH = datetime(1899, 12, 30)
+# Сжатые данные отдаются клиенту кусками не меньше этого размера
+XLSX_CHUNK_BYTES = 64 * 1024
+# Символы, недопустимые в XML 1.0
+XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_parts(sheet_name):
+    """Служебные части книги с одним листом; сам лист пишется построчно."""
+    return [
+        (
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" '
+            'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            "</Types>",
+        ),
+        (
+            "_rels/.rels",
+            f'<Relationships xmlns="{XLSX_RELATIONSHIPS}">'
+            f'<Relationship Id="rId1" Type="{XLSX_DOCUMENT}/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>',
+        ),
+        (
+            "xl/workbook.xml",
+            f'<workbook xmlns="{XLSX_MAIN}" xmlns:r="{XLSX_DOCUMENT}"><sheets>'
+            f'<sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/>'
+            "</sheets></workbook>",
+        ),
+        (
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="{XLSX_RELATIONSHIPS}">'
+            f'<Relationship Id="rId1" Type="{XLSX_DOCUMENT}/worksheet" '
+            'Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{XLSX_DOCUMENT}/styles" Target="styles.xml"/>'
+            "</Relationships>",
+        ),
+        (
+            "xl/styles.xml",
+            f'<styleSheet xmlns="{XLSX_MAIN}">'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/>'
+            "</border></borders>"
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+            "</cellStyleXfs>"
+            '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" '
+            'applyNumberFormat="1"/>'
+            '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" '
+            'applyNumberFormat="1"/></cellXfs>'
+            "</styleSheet>",
+        ),
+    ]
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, datetime):
+        # Даты в книге — число дней от эпохи Excel
+        serial = (value.replace(tzinfo=None) - XLSX_EPOCH).total_seconds() / 86400
+        return f'<c s="{XLSX_DATETIME_STYLE}"><v>{serial}</v></c>'
+    if isinstance(value, date):
+        serial = (value - XLSX_EPOCH.date()).days
+        return f'<c s="{XLSX_DATE_STYLE}"><v>{serial}</v></c>'
+    text = escape(XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return ("<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>").encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    Приёмник для ZipFile без tell/seek: zipfile пишет в него в потоковом
+    режиме (с дескрипторами данных), а записанное забирается кусками.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        if data:
+            self.parts.append(bytes(data))
+            self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts, self.size = [], 0
+        return data
+
+
+def _xlsx_chunks(spec, rows):
+    """
+    Собирает книгу XLSX на лету: лист со строковыми значениями прямо в
+    ячейках (без таблицы общих строк) сжимается по мере чтения строк, и
+    готовые куски архива сразу уходят клиенту. Ни книга, ни лист не
+    держатся в памяти или во временном файле.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _xlsx_parts(spec.filename):
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(f'<worksheet xmlns="{XLSX_MAIN}"><sheetData>'.encode("utf-8"))
+            sheet.write(_xlsx_row([column.field for column in spec.columns]))
+            for row in rows:
+                sheet.write(_xlsx_row(row))
+                if sink.size >= XLSX_CHUNK_BYTES:
+                    yield sink.take()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.take()
+
+
+def export_response(spec, queryset, file_format):
+    """
+    Потоковый ответ с выгрузкой queryset в указанном формате. Первая строка
+    читается до создания ответа: ошибка запроса вернётся обычной ошибкой,
+    а не оборвёт уже начатую передачу файла.
+    """
+    rows = iter_rows(spec, queryset.order_by("pk"))
+    first = next(rows, None)
+    rows = itertools.chain([first], rows) if first is not None else iter(())
+
+    if file_format == "xlsx":
+        response = StreamingHttpResponse(_xlsx_chunks(spec, rows), content_type=XLSX_CONTENT_TYPE)
+        extension = "xlsx"
+    elif file_format == "ndjson":
+        response = StreamingHttpResponse(
+            _ndjson_lines(spec, rows), content_type="application/x-ndjson; charset=utf-8"
+        )
+        extension = "ndjson"
+    else:
+        response = StreamingHttpResponse(
+            _csv_lines(spec, rows), content_type="text/csv; charset=utf-8"
+        )
+        extension = "csv"
+    response["Content-Disposition"] = f'attachment; filename="{spec.filename}.{extension}"'
+    return response
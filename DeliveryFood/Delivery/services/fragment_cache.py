@@ -0,0 +1,138 @@
+"""
+Кэш фрагментов шаблонов с версиями данных.
+
+Фрагмент кэшируется под ключом из имени и версий областей, от которых он
+зависит: общих для модели («restaurants», «dishes», «orders»,
+«order-items») и отдельных объектов («restaurant:5», «menuitem:12»).
+Сигналы сохранения и удаления, а также массовые операции сдвигают версии
+после фиксации транзакции, и следующий запрос видит новый ключ.
+
+Промах не устраивает набег на базу: фрагмент перестраивает один процесс,
+взявший блокировку, а остальные на это время получают последний
+построенный вариант (stale-while-revalidate). Ждать приходится только при
+самом первом построении, когда прежнего варианта ещё нет.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from ..models import MenuItem, Order, OrderMenuItem, Restaurant, TypeCuisine
+
+VERSION_KEY = "fragment:version:{scope}"
+FRAGMENT_KEY = "fragment:{name}:{versions}"
+LATEST_KEY = "fragment:{name}:latest"
+LOCK_KEY = "fragment:{name}:lock"
+
+RESTAURANTS = "restaurants"
+DISHES = "dishes"
+ORDERS = "orders"
+ORDER_ITEMS = "order-items"
+CUISINES = "cuisines"
+SCOPE_BY_MODEL = {
+    Restaurant: RESTAURANTS,
+    MenuItem: DISHES,
+    Order: ORDERS,
+    OrderMenuItem: ORDER_ITEMS,
+    TypeCuisine: CUISINES,
+}
+
+DEFAULT_TIMEOUT = 60 * 60
+DEFAULT_LOCK_SECONDS = 10
+
+
+def _cache():
+    return caches[getattr(settings, "FRAGMENT_CACHE_ALIAS", "default")]
+
+
+def object_scope(instance):
+    """Область одного объекта: «restaurant:5»."""
+    return f"{instance._meta.model_name}:{instance.pk}"
+
+
+def as_scope(value):
+    """Строка остаётся областью как есть, объект модели превращается в свою область."""
+    return value if isinstance(value, str) else object_scope(value)
+
+
+def get_versions(scopes):
+    """
+    Версии областей одним обращением к кэшу. Вытесненная версия заводится
+    заново от текущего времени, чтобы не совпасть со старыми ключами.
+    """
+    cache = _cache()
+    keys = {scope: VERSION_KEY.format(scope=scope) for scope in scopes}
+    found = cache.get_many(keys.values())
+    versions = []
+    for scope, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+def bump(*scopes):
+    cache = _cache()
+    for scope in scopes:
+        key = VERSION_KEY.format(scope=scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_on_commit(*scopes):
+    """
+    Версии меняются после фиксации транзакции: иначе параллельный запрос
+    успел бы положить под новой версией ещё старые данные.
+    """
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def bump_for_instance(instance):
+    """Сдвигает версии модели и самого объекта (из сигналов сохранения и удаления)."""
+    bump_on_commit(SCOPE_BY_MODEL[type(instance)], object_scope(instance))
+
+
+def bump_objects_on_commit(model, pks):
+    """То же для объектов, изменённых массово в обход сигналов."""
+    model_name = model._meta.model_name
+    bump_on_commit(SCOPE_BY_MODEL[model], *(f"{model_name}:{pk}" for pk in pks))
+
+
+def get_or_build(name, scopes, build, timeout=None):
+    """
+    Значение фрагмента name для текущих версий областей scopes; при
+    промахе строится функцией build. Если фрагмент уже строит другой
+    процесс, возвращается последний построенный вариант.
+    """
+    cache = _cache()
+    scopes = [as_scope(scope) for scope in scopes]
+    # Области объектов входят в имя: у каждой карточки свой последний вариант
+    name = f"{name}:{','.join(scopes)}"
+    versions = ".".join(str(version) for version in get_versions(scopes))
+    key = FRAGMENT_KEY.format(name=name, versions=versions)
+    latest_key = LATEST_KEY.format(name=name)
+
+    found = cache.get_many([key, latest_key])
+    if key in found:
+        return found[key]
+
+    lock_key = LOCK_KEY.format(name=name)
+    lock_seconds = getattr(settings, "FRAGMENT_CACHE_LOCK_SECONDS", DEFAULT_LOCK_SECONDS)
+    locked = cache.add(lock_key, 1, timeout=lock_seconds)
+    if not locked and latest_key in found:
+        return found[latest_key]
+
+    try:
+        value = build()
+        timeout = timeout or getattr(settings, "FRAGMENT_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+        cache.set_many({key: value, latest_key: value}, timeout=timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
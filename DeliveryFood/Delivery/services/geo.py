@@ -0,0 +1,224 @@
+"""
+Координаты адресов и поиск ресторанов рядом с точкой.
+
+Адрес переводится в координаты геокодером из настройки GEOCODER (путь к
+функции address -> (широта, долгота) или None). По умолчанию это
+stub_geocoder: он не ходит в сеть и детерминированно раскладывает адреса
+по прямоугольнику GEOCODER_STUB_BBOX, чего достаточно для локальной работы.
+
+Поиск по радиусу идёт по сетке в памяти процесса: рестораны разложены по
+ячейкам GEO_GRID_CELL_DEGREES градусов, запрос проверяет только ячейки,
+попадающие в описанный вокруг круга прямоугольник. Как и индекс подсказок,
+сетка узнаёт об изменениях в других процессах по общей версии в кэше
+(versioned_index); версия сдвигается, только если изменились координаты.
+"""
+
+import hashlib
+import heapq
+import math
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ..models import Restaurant
+from .versioned_index import VersionedIndex
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+VERSION_KEY = "geo:version"
+DEFAULT_CELL_DEGREES = 0.01
+# Москва и ближайшее Подмосковье: (мин. широта, мин. долгота, макс. широта, макс. долгота)
+DEFAULT_STUB_BBOX = (55.55, 37.35, 55.92, 37.85)
+
+Nearby = namedtuple("Nearby", ["restaurant_id", "distance_km"])
+
+
+def stub_geocoder(address):
+    """Псевдокоординаты адреса внутри GEOCODER_STUB_BBOX (одинаковые для одного адреса)."""
+    normalized = " ".join((address or "").lower().split())
+    if not normalized:
+        return None
+    digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+    south, west, north, east = getattr(settings, "GEOCODER_STUB_BBOX", DEFAULT_STUB_BBOX)
+    lat_share = int.from_bytes(digest[:4], "big") / 2**32
+    lon_share = int.from_bytes(digest[4:8], "big") / 2**32
+    return (
+        round(south + (north - south) * lat_share, 6),
+        round(west + (east - west) * lon_share, 6),
+    )
+
+
+def geocode(address):
+    """Координаты адреса от настроенного геокодера или None."""
+    if not address:
+        return None
+    geocoder = import_string(getattr(settings, "GEOCODER", "Delivery.services.geo.stub_geocoder"))
+    return geocoder(address)
+
+
+def fill_coordinates(instance):
+    """
+    Заполняет широту и долготу по адресу, если они не заданы явно или адрес
+    сменился без новых координат.
+    """
+    if instance.address_moved:
+        instance.latitude = instance.longitude = None
+    if instance.latitude is not None and instance.longitude is not None:
+        return False
+    point = geocode(instance.address)
+    if point is None:
+        return False
+    instance.latitude, instance.longitude = point
+    return True
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Расстояние по дуге большого круга (формула гаверсинусов)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Ячейки сетки (i, j) -> {id ресторана: (широта, долгота)}."""
+
+    def __init__(self, cell_degrees):
+        self.cell_degrees = cell_degrees
+        self.lock = threading.Lock()
+        self.cells = {}
+        self.points = {}
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _add(self, object_id, lat, lon):
+        self.points[object_id] = (lat, lon)
+        self.cells.setdefault(self._cell(lat, lon), {})[object_id] = (lat, lon)
+
+    def _remove(self, object_id):
+        point = self.points.pop(object_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        bucket = self.cells.get(cell, {})
+        bucket.pop(object_id, None)
+        if not bucket:
+            self.cells.pop(cell, None)
+
+    def put(self, object_id, lat, lon):
+        with self.lock:
+            self._remove(object_id)
+            if lat is not None and lon is not None:
+                self._add(object_id, lat, lon)
+
+    def remove(self, object_id):
+        with self.lock:
+            self._remove(object_id)
+
+    def load(self, rows):
+        with self.lock:
+            self.cells, self.points = {}, {}
+            for object_id, lat, lon in rows:
+                self._add(object_id, lat, lon)
+
+    def _candidate_cells(self, lat, lon, radius_km):
+        """Ячейки, пересекающие прямоугольник вокруг круга радиуса radius_km."""
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        i_min, j_min = self._cell(lat - dlat, lon - dlon)
+        i_max, j_max = self._cell(lat + dlat, lon + dlon)
+        if (i_max - i_min + 1) * (j_max - j_min + 1) > len(self.cells):
+            # Прямоугольник больше занятой части сетки: дешевле пройти по ячейкам
+            return [
+                bucket
+                for (i, j), bucket in self.cells.items()
+                if i_min <= i <= i_max and j_min <= j <= j_max
+            ]
+        return [
+            self.cells[(i, j)]
+            for i in range(i_min, i_max + 1)
+            for j in range(j_min, j_max + 1)
+            if (i, j) in self.cells
+        ]
+
+    def nearby(self, lat, lon, radius_km, limit):
+        """
+        До limit ближайших ресторанов в радиусе, по возрастанию расстояния.
+        Кандидаты отбираются по равнопромежуточной проекции (на масштабе
+        города её погрешность пренебрежимо мала) без тригонометрии в цикле;
+        точное расстояние считается только для попавших в ответ.
+        """
+        lon_scale = math.cos(math.radians(lat))
+        max_degrees_sq = (radius_km / KM_PER_DEGREE) ** 2
+        with self.lock:
+            found = []
+            for bucket in self._candidate_cells(lat, lon, radius_km):
+                for object_id, (point_lat, point_lon) in bucket.items():
+                    dy = point_lat - lat
+                    dx = (point_lon - lon) * lon_scale
+                    degrees_sq = dx * dx + dy * dy
+                    if degrees_sq <= max_degrees_sq:
+                        found.append((degrees_sq, object_id, point_lat, point_lon))
+        return [
+            Nearby(object_id, distance_km(lat, lon, point_lat, point_lon))
+            for _, object_id, point_lat, point_lon in heapq.nsmallest(limit, found)
+        ]
+
+
+def build_index():
+    """Строит сетку из базы одним запросом values_list."""
+    index = GridIndex(getattr(settings, "GEO_GRID_CELL_DEGREES", DEFAULT_CELL_DEGREES))
+    index.load(
+        Restaurant.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        .values_list("pk", "latitude", "longitude")
+        .iterator()
+    )
+    return index
+
+
+_index = VersionedIndex(
+    "geo",
+    VERSION_KEY,
+    build_index,
+    cache_alias_setting="GEO_CACHE_ALIAS",
+    refresh_setting="GEO_INDEX_REFRESH_SECONDS",
+)
+
+
+def get_index():
+    """Сетка текущего процесса (см. VersionedIndex.get)."""
+    return _index.get()
+
+
+def nearby_restaurants(lat, lon, radius_km, limit):
+    return get_index().nearby(lat, lon, radius_km, limit)
+
+
+def coordinates_changed(restaurant, created):
+    """Изменились ли координаты ресторана относительно сохранённых в базе."""
+    point = (restaurant.latitude, restaurant.longitude)
+    if created:
+        return None not in point
+    return restaurant.saved_point is None or point != restaurant.saved_point
+
+
+def apply_change(restaurant, deleted=False):
+    """Переносит изменение ресторана в сетку этого процесса и сдвигает общую версию."""
+
+    def change(index):
+        if deleted:
+            index.remove(restaurant.pk)
+        else:
+            index.put(restaurant.pk, restaurant.latitude, restaurant.longitude)
+
+    _index.apply(change)
+
+
+def invalidate():
+    """Сбрасывает сетки всех процессов после массового изменения координат."""
+    _index.invalidate()
@@ -0,0 +1,171 @@
+"""
+Уменьшенные копии изображений ресторанов, блюд и заказов.
+
+Для оригинала «menu_images/borsch.jpg» копии лежат рядом с остальными
+медиафайлами под предсказуемыми именами «derivatives/menu_images/borsch_w320.webp»
+и «..._w320.jpg», поэтому шаблону не нужно хранить их в базе: список готовых
+ширин кэшируется по имени оригинала. Копии строятся фоновой задачей после
+загрузки и командой generate_image_derivatives для уже загруженных файлов.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from ..models import MenuItem, Order, Restaurant
+
+DERIVATIVES_DIR = "derivatives"
+DEFAULT_WIDTHS = (320, 640, 1280)
+DEFAULT_QUALITY = 80
+# Формат -> (расширение, MIME-тип); WebP отдаётся браузерам, которые его понимают
+FORMATS = {"WEBP": ("webp", "image/webp"), "JPEG": ("jpg", "image/jpeg")}
+CACHE_KEY = "image-variants:{name}"
+ORIENTATION_TAG = 0x0112
+MODELS_WITH_IMAGES = (Restaurant, MenuItem, Order)
+
+
+def variant_widths():
+    return tuple(getattr(settings, "IMAGE_VARIANT_WIDTHS", DEFAULT_WIDTHS))
+
+
+def variant_name(name, width, image_format):
+    stem, _ = os.path.splitext(name)
+    extension = FORMATS[image_format][0]
+    return f"{DERIVATIVES_DIR}/{stem}_w{width}.{extension}"
+
+
+def _cache():
+    return caches[getattr(settings, "IMAGE_VARIANTS_CACHE_ALIAS", "default")]
+
+
+def _to_rgb(image):
+    """JPEG не хранит прозрачность: прозрачные области заливаются белым."""
+    if image.mode == "RGBA":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def render_variants(data, widths, quality=DEFAULT_QUALITY):
+    """
+    Строит копии изображения data (байты) для ширин меньше исходной.
+    Выполняется в дочернем процессе, поэтому работает только с байтами и не
+    обращается к базе и хранилищу. Возвращает список (ширина, формат, байты).
+    """
+    image = Image.open(io.BytesIO(data))
+    # Снимки с телефонов повёрнуты тегом EXIF: ширина после поворота — это высота
+    rotated = image.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8)
+    width, height = (image.height, image.width) if rotated else image.size
+    widths = sorted(target for target in widths if target < width)
+    if not widths:
+        return []
+
+    # JPEG декодируется сразу в уменьшенном масштабе (степень двойки не меньше нужной)
+    draft_size = (widths[-1], height * widths[-1] // width)
+    image.draft("RGB", draft_size[::-1] if rotated else draft_size)
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+    image = image.convert("RGBA") if has_alpha else image.convert("RGB")
+
+    variants = []
+    for target in reversed(widths):
+        image = image.resize(
+            (target, max(1, round(image.height * target / image.width))), Image.LANCZOS
+        )
+        for image_format in FORMATS:
+            frame = image if image_format == "WEBP" else _to_rgb(image)
+            output = io.BytesIO()
+            frame.save(output, image_format, quality=quality, optimize=True)
+            variants.append((target, image_format, output.getvalue()))
+    return variants
+
+
+def _save_variants(name, variants):
+    """Записывает копии в хранилище, заменяя старые, и кэширует список ширин."""
+    widths = []
+    for width, image_format, content in variants:
+        path = variant_name(name, width, image_format)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        default_storage.save(path, ContentFile(content))
+        if width not in widths:
+            widths.append(width)
+    widths.sort()
+    _cache().set(CACHE_KEY.format(name=name), widths, timeout=None)
+    return widths
+
+
+def _read(name):
+    with default_storage.open(name, "rb") as fileobj:
+        return fileobj.read()
+
+
+def generate_derivatives(name):
+    """Строит копии одного изображения в текущем процессе (фоновая задача)."""
+    quality = getattr(settings, "IMAGE_VARIANT_QUALITY", DEFAULT_QUALITY)
+    return _save_variants(name, render_variants(_read(name), variant_widths(), quality))
+
+
+def generate_many(names, workers=None):
+    """
+    Строит копии для списка изображений, распределяя декодирование и сжатие
+    по пулу процессов. Чтение и запись файлов остаются в текущем процессе.
+    Возвращает {имя: список ширин} и {имя: текст ошибки}.
+    """
+    quality = getattr(settings, "IMAGE_VARIANT_QUALITY", DEFAULT_QUALITY)
+    widths = variant_widths()
+    done, failed = {}, {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for name in names:
+            try:
+                futures[name] = pool.submit(render_variants, _read(name), widths, quality)
+            except OSError as exc:
+                failed[name] = str(exc)
+        for name, future in futures.items():
+            try:
+                done[name] = _save_variants(name, future.result())
+            except Exception as exc:
+                failed[name] = str(exc)
+    return done, failed
+
+
+def cached_variants(name):
+    """Готовые ширины из кэша или None, если изображение ещё не обрабатывалось."""
+    return _cache().get(CACHE_KEY.format(name=name))
+
+
+def available_variants(name):
+    """Готовые ширины копий; при промахе кэша проверяется хранилище."""
+    widths = cached_variants(name)
+    if widths is None:
+        widths = [
+            width
+            for width in variant_widths()
+            if default_storage.exists(variant_name(name, width, "JPEG"))
+        ]
+        _cache().set(CACHE_KEY.format(name=name), widths, timeout=None)
+    return widths
+
+
+def schedule_derivatives(name):
+    """Ставит построение копий в очередь Celery после фиксации транзакции."""
+    from ..tasks import generate_image_derivatives_task
+
+    transaction.on_commit(lambda: generate_image_derivatives_task.delay(name))
+
+
+def iter_image_names():
+    """Имена всех загруженных изображений ресторанов, блюд и заказов."""
+    for model in MODELS_WITH_IMAGES:
+        names = model.objects.exclude(image="").exclude(image__isnull=True)
+        yield from names.order_by("pk").values_list("image", flat=True).iterator()
@@ -0,0 +1,82 @@
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import MenuItem
+from . import autocomplete, fragment_cache
+from .menu_cache import bump_menu_version_on_commit
+from .menu_stats import shift_available_counts
+
+DEFAULT_CHUNK_SIZE = 500
+
+AvailabilityResult = namedtuple(
+    "AvailabilityResult", ["updated_ids", "skipped_ids", "restaurant_ids"]
+)
+
+
+def _apply_availability(items, is_available, user):
+    """
+    Переключает доступность пачки блюд одним UPDATE и пишет историю пачкой.
+    Сигналы не срабатывают, поэтому сводка меню и версии фрагментов
+    сдвигаются здесь же.
+    """
+    ids = [item.pk for item in items]
+    MenuItem.objects.filter(pk__in=ids).update(is_available=is_available)
+    for item in items:
+        item.is_available = is_available
+    MenuItem.history.bulk_history_create(items, update=True, default_user=user)
+    fragment_cache.bump_objects_on_commit(MenuItem, ids)
+
+    delta = 1 if is_available else -1
+    shift_available_counts(
+        {
+            restaurant_id: delta * count
+            for restaurant_id, count in Counter(item.restaurant_id for item in items).items()
+        }
+    )
+    return ids
+
+
+def set_availability(queryset, is_available, chunk_size=None, user=None):
+    """
+    Переключает is_available у блюд из queryset, которые ещё не в нужном
+    состоянии. Блюда выбираются по возрастанию pk пачками, каждая в короткой
+    транзакции. Кэши меню затронутых ресторанов и индекс подсказок
+    сбрасываются один раз в конце.
+    """
+    chunk_size = chunk_size or getattr(
+        settings, "MENU_AVAILABILITY_CHUNK_SIZE", DEFAULT_CHUNK_SIZE
+    )
+    scope = queryset.exclude(is_available=is_available).order_by("pk")
+    updated_ids = []
+    restaurant_ids = set()
+    last_pk = 0
+
+    while True:
+        with transaction.atomic():
+            items = list(scope.select_for_update().filter(pk__gt=last_pk)[:chunk_size])
+            if not items:
+                break
+            updated_ids.extend(_apply_availability(items, is_available, user))
+            restaurant_ids.update(item.restaurant_id for item in items)
+        last_pk = items[-1].pk
+
+    if updated_ids:
+        for restaurant_id in restaurant_ids:
+            bump_menu_version_on_commit(restaurant_id)
+        transaction.on_commit(autocomplete.invalidate)
+    return AvailabilityResult(updated_ids, [], sorted(restaurant_ids))
+
+
+def set_availability_for_ids(menu_item_ids, is_available, chunk_size=None, user=None):
+    """
+    Переключает доступность блюд по списку id. Блюда, которых нет или которые
+    уже в нужном состоянии, попадают в skipped_ids.
+    """
+    menu_item_ids = sorted(set(menu_item_ids))
+    result = set_availability(
+        MenuItem.objects.filter(pk__in=menu_item_ids), is_available, chunk_size, user
+    )
+    updated = set(result.updated_ids)
+    return result._replace(skipped_ids=[pk for pk in menu_item_ids if pk not in updated])
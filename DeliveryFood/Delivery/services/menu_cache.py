@@ -0,0 +1,101 @@
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from ..models import MenuItem, TypeCuisine
+
+VERSION_KEY = "menu:version:{restaurant_id}"
+MENU_KEY = "menu:{restaurant_id}:v{version}"
+HITS_KEY = "menu:stats:hits"
+MISSES_KEY = "menu:stats:misses"
+
+# Меню ресторана: все блюда (в порядке id) и типы кухни
+MenuSnapshot = namedtuple("MenuSnapshot", ["items", "cuisines"])
+
+
+def get_menu_cache():
+    return caches[getattr(settings, "MENU_CACHE_ALIAS", "default")]
+
+
+def _incr(cache, key):
+    """cache.incr, создающий отсутствующий счётчик."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_menu_version(restaurant_id):
+    """
+    Текущая версия меню ресторана. Если счётчик вытеснен из кэша, он
+    заводится заново от текущего времени, чтобы не совпасть со старыми ключами.
+    """
+    cache = get_menu_cache()
+    key = VERSION_KEY.format(restaurant_id=restaurant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_menu_version(restaurant_id):
+    """Делает закэшированное меню ресторана недействительным."""
+    cache = get_menu_cache()
+    key = VERSION_KEY.format(restaurant_id=restaurant_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_menu_version_on_commit(restaurant_id):
+    """
+    Версия меняется после фиксации транзакции: иначе параллельный запрос
+    успел бы положить в кэш под новой версией ещё старые данные.
+    """
+    transaction.on_commit(lambda: bump_menu_version(restaurant_id))
+
+
+def load_menu(restaurant_id):
+    # Счётчики заказов меняются с каждым заказом и в кэше бы устарели:
+    # они не загружаются, обращение к ним читает свежее значение из базы
+    items = list(
+        MenuItem.objects.filter(restaurant_id=restaurant_id)
+        .defer(*MenuItem.ORDER_COUNT_FIELDS)
+        .order_by("id")
+    )
+    cuisines = list(TypeCuisine.objects.filter(restaurants__id=restaurant_id).order_by("id"))
+    return MenuSnapshot(items=items, cuisines=cuisines)
+
+
+def get_menu(restaurant_id):
+    """Меню ресторана из кэша; при промахе читается из базы и кладётся в кэш."""
+    cache = get_menu_cache()
+    key = MENU_KEY.format(restaurant_id=restaurant_id, version=get_menu_version(restaurant_id))
+    menu = cache.get(key)
+    if menu is not None:
+        _incr(cache, HITS_KEY)
+        return menu
+
+    _incr(cache, MISSES_KEY)
+    menu = load_menu(restaurant_id)
+    cache.set(key, menu, timeout=getattr(settings, "MENU_CACHE_TIMEOUT", 3600))
+    return menu
+
+
+def menu_cache_stats():
+    cache = get_menu_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,215 @@
+import csv
+import io
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from openpyxl import load_workbook
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from ..models import MenuItem, SiteCounter
+from ..serializers.restaurant_serializers import MenuImportRowSerializer
+from . import autocomplete, fragment_cache, search
+from .counters import shift_site_counter
+from .menu_cache import bump_menu_version_on_commit
+from .menu_stats import rebuild_restaurant_stats
+from .repricing import schedule_repricing
+
+DEFAULT_BATCH_SIZE = 500
+
+# Заголовки колонок: английские (как в выгрузке) и русские
+HEADER_ALIASES = {
+    "name": "name",
+    "название": "name",
+    "price": "price",
+    "цена": "price",
+    "description": "description",
+    "описание": "description",
+    "is_available": "is_available",
+    "доступно": "is_available",
+}
+UPDATE_FIELDS = ["price", "description", "is_available"]
+
+ImportResult = namedtuple("ImportResult", ["created", "updated", "unchanged", "errors"])
+
+
+class MenuImportError(Exception):
+    """Файл целиком не подходит для импорта (формат, заголовки)."""
+
+
+def _normalize_header(header):
+    return HEADER_ALIASES.get(str(header or "").strip().lower())
+
+
+def _rows_from_table(rows):
+    """Превращает последовательность строк с заголовком в (номер строки, словарь)."""
+    rows = iter(rows)
+    try:
+        headers = [_normalize_header(header) for header in next(rows)]
+    except StopIteration:
+        raise MenuImportError("Файл пуст.")
+    if "name" not in headers or "price" not in headers:
+        raise MenuImportError("В файле должны быть колонки name и price.")
+
+    for number, values in enumerate(rows, start=2):
+        if not any(value not in (None, "") for value in values):
+            continue
+        yield number, {
+            header: value
+            for header, value in zip(headers, values)
+            if header and value not in (None, "")
+        }
+
+
+def iter_csv_rows(fileobj):
+    """Читает CSV построчно, не загружая файл в память."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return _rows_from_table(csv.reader(text, dialect))
+
+
+def iter_xlsx_rows(fileobj):
+    """Читает первый лист XLSX в режиме read_only (строки по одной)."""
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as exc:
+        raise MenuImportError(f"Не удалось прочитать XLSX: {exc}")
+    return _rows_from_table(workbook.active.iter_rows(values_only=True))
+
+
+def iter_file_rows(fileobj, filename):
+    if filename.lower().endswith(".xlsx"):
+        return iter_xlsx_rows(fileobj)
+    if filename.lower().endswith(".csv"):
+        return iter_csv_rows(fileobj)
+    raise MenuImportError("Поддерживаются файлы .csv и .xlsx.")
+
+
+def _name_key(name):
+    return " ".join(name.lower().replace("ё", "е").split())
+
+
+def _differs(item, values):
+    # Пустое описание в базе бывает и NULL, и пустой строкой
+    return any(
+        (getattr(item, field) or "") != value if field == "description"
+        else getattr(item, field) != value
+        for field, value in values.items()
+    )
+
+
+class MenuImporter:
+    """
+    Импорт меню ресторана: строки файла сверяются с текущим меню по названию,
+    новые блюда вставляются bulk_create, изменённые — bulk_update, пачками по
+    batch_size с записью истории пачкой. Сигналы при этом не срабатывают:
+    поисковый индекс, счётчик блюд и версии фрагментов обновляются вместе
+    с каждой пачкой, а кэш меню, сводка, подсказки и пересчёт заказов —
+    один раз в конце.
+    """
+
+    def __init__(self, restaurant_id, batch_size=None, user=None):
+        self.restaurant_id = restaurant_id
+        self.batch_size = batch_size or getattr(
+            settings, "MENU_IMPORT_BATCH_SIZE", DEFAULT_BATCH_SIZE
+        )
+        self.user = user
+        self.existing = {
+            _name_key(item.name): item
+            for item in MenuItem.objects.filter(restaurant_id=restaurant_id)
+        }
+        self.seen = {}
+        self.to_create, self.to_update = [], []
+        self.created, self.updated, self.unchanged = [], [], 0
+        self.repriced_ids = []
+        self.errors = []
+
+    def add_row(self, number, row):
+        serializer = MenuImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            self.errors.append({"row": number, "errors": serializer.errors})
+            return
+
+        data = serializer.validated_data
+        key = _name_key(data["name"])
+        if key in self.seen:
+            self.errors.append(
+                {"row": number, "errors": {"name": [f"Повтор строки {self.seen[key]}."]}}
+            )
+            return
+        self.seen[key] = number
+
+        # Колонки, которых нет в файле, у существующих блюд не меняются
+        values = {"price": data["price"]}
+        if "description" in data:
+            values["description"] = data["description"] or ""
+        if "is_available" in data:
+            values["is_available"] = data["is_available"]
+
+        item = self.existing.get(key)
+        if item is None:
+            self.to_create.append(
+                MenuItem(
+                    restaurant_id=self.restaurant_id,
+                    name=data["name"],
+                    **{"description": "", "is_available": True, **values},
+                )
+            )
+        elif _differs(item, values):
+            if item.price != values["price"]:
+                self.repriced_ids.append(item.pk)
+            for field, value in values.items():
+                setattr(item, field, value)
+            self.to_update.append(item)
+        else:
+            self.unchanged += 1
+
+        if len(self.to_create) + len(self.to_update) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic():
+            if self.to_create:
+                bulk_create_with_history(
+                    self.to_create, MenuItem, batch_size=self.batch_size, default_user=self.user
+                )
+                shift_site_counter(SiteCounter.DISHES, len(self.to_create))
+            if self.to_update:
+                bulk_update_with_history(
+                    self.to_update,
+                    MenuItem,
+                    UPDATE_FIELDS,
+                    batch_size=self.batch_size,
+                    default_user=self.user,
+                )
+            search.index_instances(self.to_create + self.to_update)
+            fragment_cache.bump_objects_on_commit(
+                MenuItem, [item.pk for item in self.to_create + self.to_update]
+            )
+        self.created.extend(self.to_create)
+        self.updated.extend(self.to_update)
+        self.to_create, self.to_update = [], []
+
+    def finish(self):
+        self.flush()
+        changed = self.created + self.updated
+        if changed:
+            with transaction.atomic():
+                bump_menu_version_on_commit(self.restaurant_id)
+                rebuild_restaurant_stats(self.restaurant_id)
+                schedule_repricing(*self.repriced_ids)
+                transaction.on_commit(autocomplete.invalidate)
+        return ImportResult(len(self.created), len(self.updated), self.unchanged, self.errors)
+
+
+def import_menu(restaurant_id, rows, batch_size=None, user=None):
+    """Импортирует строки (номер, словарь) в меню ресторана."""
+    importer = MenuImporter(restaurant_id, batch_size=batch_size, user=user)
+    for number, row in rows:
+        importer.add_row(number, row)
+    return importer.finish()
@@ -0,0 +1,188 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, Value, When
+from django.utils import timezone
+
+from ..models import MenuItem, Order, RestaurantMenuStats
+
+ZERO = Decimal("0.00")
+PRICE_FIELD = MenuItem._meta.get_field("price")
+
+# Состояние блюда, влияющее на сводку
+ItemState = namedtuple("ItemState", ["price", "is_available"])
+
+STATS_FIELDS = (
+    "item_count", "available_count", "price_sum", "min_price", "max_price", "order_count"
+)
+EMPTY_STATS = {
+    "item_count": 0,
+    "available_count": 0,
+    "price_sum": ZERO,
+    "min_price": None,
+    "max_price": None,
+    "order_count": 0,
+}
+
+
+def live_stats(restaurant_ids=None):
+    """
+    Сводка, посчитанная заново по таблицам блюд и заказов:
+    {restaurant_id: {поле: значение}}. Блюда и заказы агрегируются
+    отдельными запросами — их соединение размножило бы строки.
+    """
+    items = MenuItem.objects.all()
+    orders = Order.objects.all()
+    if restaurant_ids is not None:
+        items = items.filter(restaurant_id__in=restaurant_ids)
+        orders = orders.filter(restaurant_id__in=restaurant_ids)
+    rows = (
+        items.order_by()
+        .values("restaurant_id")
+        .annotate(
+            item_count=Count("id"),
+            available_count=Count("id", filter=Q(is_available=True)),
+            price_sum=Sum("price"),
+            min_price=Min("price"),
+            max_price=Max("price"),
+        )
+    )
+    stats = {row.pop("restaurant_id"): {**EMPTY_STATS, **row} for row in rows}
+    order_counts = (
+        orders.order_by().values("restaurant_id").annotate(n=Count("id")).values_list(
+            "restaurant_id", "n"
+        )
+    )
+    for restaurant_id, order_count in order_counts:
+        stats.setdefault(restaurant_id, dict(EMPTY_STATS))["order_count"] = order_count
+    return stats
+
+
+def rebuild_restaurant_stats(restaurant_id):
+    """Пересчитывает сводку одного ресторана по его блюдам и заказам (индексы по restaurant)."""
+    values = live_stats([restaurant_id]).get(restaurant_id) or EMPTY_STATS
+    RestaurantMenuStats.objects.update_or_create(restaurant_id=restaurant_id, defaults=values)
+
+
+def rebuild_all_stats():
+    """Пересобирает таблицу сводок целиком одним агрегирующим запросом."""
+    stats = live_stats()
+    with transaction.atomic():
+        RestaurantMenuStats.objects.all().delete()
+        RestaurantMenuStats.objects.bulk_create(
+            RestaurantMenuStats(restaurant_id=restaurant_id, **values)
+            for restaurant_id, values in stats.items()
+        )
+    return len(stats)
+
+
+def find_mismatches():
+    """
+    Сравнивает сводки с живым агрегатом. Возвращает список
+    (restaurant_id, поле, в сводке, по факту).
+    """
+    live = live_stats()
+    stored = {
+        row.pop("restaurant_id"): row
+        for row in RestaurantMenuStats.objects.values("restaurant_id", *STATS_FIELDS)
+    }
+    mismatches = []
+    for restaurant_id in sorted(live.keys() | stored.keys()):
+        actual = live.get(restaurant_id, EMPTY_STATS)
+        saved = stored.get(restaurant_id, EMPTY_STATS)
+        for field in STATS_FIELDS:
+            if saved.get(field) != actual.get(field):
+                mismatches.append((restaurant_id, field, saved.get(field), actual.get(field)))
+    return mismatches
+
+
+def average_price(price_sum, item_count):
+    """Средняя цена блюда по сумме цен и количеству (None, если блюд нет)."""
+    if not item_count:
+        return None
+    return (price_sum / item_count).quantize(Decimal("0.01"))
+
+
+def _stats_row(restaurant_id):
+    return RestaurantMenuStats.objects.filter(restaurant_id=restaurant_id)
+
+
+def _normalize_price(state):
+    """Цена из кода может быть int или float (create(price=100)): приводится к Decimal поля."""
+    if state is None:
+        return None
+    return state._replace(price=PRICE_FIELD.to_python(state.price))
+
+
+def apply_item_change(restaurant_id, old, new):
+    """
+    Переносит в сводку ресторана изменение одного блюда: old и new —
+    ItemState до и после (None для создания и удаления). Счётчики и сумма
+    сдвигаются F()-выражениями; минимум и максимум пересчитываются по блюдам
+    ресторана только если ушла цена, которая была на границе.
+    """
+    old, new = _normalize_price(old), _normalize_price(new)
+    if old == new:
+        return
+
+    count_delta = int(new is not None) - int(old is not None)
+    available_delta = int(bool(new and new.is_available)) - int(bool(old and old.is_available))
+    price_delta = (new.price if new else ZERO) - (old.price if old else ZERO)
+    values = {
+        "item_count": F("item_count") + count_delta,
+        "available_count": F("available_count") + available_delta,
+        "price_sum": F("price_sum") + price_delta,
+        "updated_at": timezone.now(),
+    }
+    price_changed = old is None or new is None or old.price != new.price
+    boundary_left = (
+        old is not None
+        and price_changed
+        and _stats_row(restaurant_id)
+        .filter(Q(min_price=old.price) | Q(max_price=old.price))
+        .exists()
+    )
+    if new is not None and price_changed and not boundary_left:
+        price = Value(new.price, output_field=PRICE_FIELD)
+        values["min_price"] = Case(
+            When(Q(min_price__isnull=True) | Q(min_price__gt=new.price), then=price),
+            default=F("min_price"),
+        )
+        values["max_price"] = Case(
+            When(Q(max_price__isnull=True) | Q(max_price__lt=new.price), then=price),
+            default=F("max_price"),
+        )
+
+    updated = _stats_row(restaurant_id).update(**values)
+    if not updated:
+        # Сводки ещё нет: при сохранении блюда создаём её по факту
+        if new is not None:
+            rebuild_restaurant_stats(restaurant_id)
+        return
+
+    if boundary_left:
+        bounds = MenuItem.objects.filter(restaurant_id=restaurant_id).aggregate(
+            min_price=Min("price"), max_price=Max("price")
+        )
+        _stats_row(restaurant_id).update(**bounds)
+
+
+def shift_available_counts(deltas):
+    """
+    Сдвигает число доступных блюд после массового переключения доступности:
+    deltas = {restaurant_id: изменение}. Цены при этом не меняются.
+    """
+    for restaurant_id, delta in deltas.items():
+        updated = _stats_row(restaurant_id).update(
+            available_count=F("available_count") + delta, updated_at=timezone.now()
+        )
+        if not updated:
+            rebuild_restaurant_stats(restaurant_id)
+
+
+def saved_item_state(item):
+    """Состояние блюда на момент загрузки из базы или None, если оно неизвестно."""
+    if item.saved_price is None:
+        return None
+    return ItemState(item.saved_price, item.saved_is_available)
@@ -0,0 +1,75 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from simple_history.utils import bulk_update_with_history
+
+from ..models import Order
+from . import fragment_cache
+
+DEFAULT_CHUNK_SIZE = 500
+
+TransitionResult = namedtuple("TransitionResult", ["updated_ids", "skipped_ids"])
+
+
+def _chunk_size(chunk_size):
+    return chunk_size or getattr(settings, "ORDER_STATUS_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+
+def _apply_status(orders, status, user):
+    """Меняет статус пачки заказов одним UPDATE и пишет историю пачкой."""
+    fields = ["status"]
+    for order in orders:
+        order.status = status
+    if status not in Order.OPEN_STATUSES:
+        fields.append("is_overdue")
+        for order in orders:
+            order.is_overdue = False
+    bulk_update_with_history(orders, Order, fields, default_user=user)
+    fragment_cache.bump_objects_on_commit(Order, [order.pk for order in orders])
+    return [order.pk for order in orders]
+
+
+def transition_order_ids(order_ids, status, chunk_size=None, user=None):
+    """
+    Переводит заказы с указанными id в status пачками.
+    Заказы, для которых переход не разрешён или которых нет, попадают в skipped_ids.
+    """
+    chunk_size = _chunk_size(chunk_size)
+    allowed_from = Order.statuses_allowed_before(status)
+    order_ids = sorted(set(order_ids))
+    updated_ids = []
+
+    for start in range(0, len(order_ids), chunk_size):
+        chunk = order_ids[start:start + chunk_size]
+        with transaction.atomic():
+            orders = list(
+                Order.objects.select_for_update()
+                .filter(pk__in=chunk, status__in=allowed_from)
+                .order_by("pk")
+            )
+            updated_ids.extend(_apply_status(orders, status, user))
+
+    updated = set(updated_ids)
+    return TransitionResult(updated_ids, [pk for pk in order_ids if pk not in updated])
+
+
+def transition_matching_orders(queryset, status, chunk_size=None, user=None):
+    """
+    Переводит в status все заказы из queryset, для которых переход разрешён.
+    Заказы выбираются по возрастанию pk пачками, каждая в короткой транзакции.
+    """
+    chunk_size = _chunk_size(chunk_size)
+    scope = queryset.filter(status__in=Order.statuses_allowed_before(status)).order_by("pk")
+    updated_ids = []
+    last_pk = 0
+
+    while True:
+        with transaction.atomic():
+            orders = list(scope.select_for_update().filter(pk__gt=last_pk)[:chunk_size])
+            if not orders:
+                break
+            updated_ids.extend(_apply_status(orders, status, user))
+        last_pk = orders[-1].pk
+
+    return TransitionResult(updated_ids, [])
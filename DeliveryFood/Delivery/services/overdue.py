@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Order
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def overdue_cutoff():
+    """Момент, раньше которого незавершённый заказ считается просроченным."""
+    return timezone.now() - timedelta(minutes=settings.ORDER_OVERDUE_AFTER_MINUTES)
+
+
+def _update_in_chunks(queryset, chunk_size, **values):
+    """
+    Обновляет строки queryset пачками по первичному ключу. Обновлённые строки
+    выпадают из условия выборки; пачка выбирается по возрастанию pk, чтобы
+    порядок обхода был детерминированным и шёл по индексу.
+    """
+    updated = 0
+    while True:
+        chunk = list(queryset.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not chunk:
+            return updated
+        updated += queryset.filter(pk__in=chunk).update(**values)
+
+
+def sweep_overdue_orders(chunk_size=None):
+    """
+    Поддерживает флаг Order.is_overdue: помечает незавершённые заказы старше
+    порога и снимает флаг с завершённых. Возвращает (помечено, снято).
+    """
+    chunk_size = chunk_size or getattr(settings, "ORDER_OVERDUE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    to_mark = Order.objects.filter(
+        is_overdue=False,
+        status__in=Order.OPEN_STATUSES,
+        order_date__lt=overdue_cutoff(),
+    )
+    to_clear = Order.objects.filter(is_overdue=True).exclude(status__in=Order.OPEN_STATUSES)
+    marked = _update_in_chunks(to_mark, chunk_size, is_overdue=True)
+    cleared = _update_in_chunks(to_clear, chunk_size, is_overdue=False)
+    return marked, cleared
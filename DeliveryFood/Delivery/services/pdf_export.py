@@ -0,0 +1,86 @@
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from ..models import Order, OrderPdfExport
+
+TEMPLATE_NAME = "Delivery/admin/orders_pdf_template.html"
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _html_to_pdf(html_string):
+    """
+    Рендерит HTML в PDF. WeasyPrint импортируется здесь, чтобы веб-процессу
+    не нужны были системные библиотеки pango.
+    """
+    from weasyprint import HTML
+
+    return HTML(string=html_string).write_pdf()
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def render_chunk_html(order_ids):
+    """HTML одной пачки заказов: пользователь и ресторан приходят тем же запросом."""
+    orders = (
+        Order.objects.filter(pk__in=order_ids)
+        .select_related("user", "restaurant")
+        .order_by("pk")
+    )
+    return render_to_string(TEMPLATE_NAME, {"orders": orders})
+
+
+def render_orders_pdf(order_ids, chunk_size=None):
+    """
+    Формирует PDF по заказам. Пачки по chunk_size заказов выбираются,
+    рендерятся и конвертируются по одной, поэтому HTML и отрисовка WeasyPrint
+    держатся в памяти только для текущей пачки. Сам итоговый документ
+    собирается в памяти: PdfWriter хранит страницы всех добавленных пачек до
+    записи, а результат возвращается байтами, так что память растёт с
+    размером итогового PDF. Задача работает в обычном процессе воркера Celery, без дочерних
+    процессов (воркеры prefork — демоны и не могут их заводить).
+    """
+    from pypdf import PdfWriter
+
+    chunk_size = chunk_size or getattr(settings, "PDF_EXPORT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    chunks = list(_chunks(sorted(order_ids), chunk_size)) or [[]]
+    if len(chunks) == 1:
+        return _html_to_pdf(render_chunk_html(chunks[0]))
+
+    writer = PdfWriter()
+    for chunk in chunks:
+        writer.append(io.BytesIO(_html_to_pdf(render_chunk_html(chunk))))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def run_pdf_export(export_id):
+    """
+    Выполняет выгрузку и сохраняет файл в закрытое хранилище
+    (PRIVATE_MEDIA_ROOT/exports/pdf/); скачать его можно только из админки.
+    """
+    export = OrderPdfExport.objects.get(pk=export_id)
+    export.status = "running"
+    export.save(update_fields=["status"])
+
+    try:
+        pdf = render_orders_pdf(export.order_ids)
+    except Exception as exc:
+        export.status = "failed"
+        export.error = str(exc)
+        export.finished_at = timezone.now()
+        export.save(update_fields=["status", "error", "finished_at"])
+        raise
+
+    export.file.save(f"orders_{export.pk}.pdf", ContentFile(pdf), save=False)
+    export.status = "done"
+    export.finished_at = timezone.now()
+    export.save(update_fields=["file", "status", "finished_at"])
+    return export
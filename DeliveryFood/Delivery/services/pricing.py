@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Order, OrderMenuItem
+
+ZERO = Decimal("0.00")
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+
+
+def line_total_expression(prefix=""):
+    """Выражение стоимости позиции: зафиксированная цена * количество."""
+    return F(f"{prefix}unit_price") * F(f"{prefix}quantity")
+
+
+def items_total(queryset):
+    """SUM(unit_price * quantity) по позициям без соединения с меню."""
+    return queryset.aggregate(
+        total=Coalesce(
+            Sum(line_total_expression(), output_field=MONEY), Value(ZERO), output_field=MONEY
+        )
+    )["total"]
+
+
+def calculate_order_total(order_id):
+    """Считает стоимость заказа одним агрегирующим запросом."""
+    return items_total(OrderMenuItem.objects.filter(order_id=order_id))
+
+
+def recalculate_order_total(order):
+    """
+    Полный пересчёт стоимости заказа (запасной путь).
+    Используется, когда накопленная сумма могла разойтись с позициями.
+    """
+    total = calculate_order_total(order.pk)
+    Order.objects.filter(pk=order.pk).update(total_price=total)
+    order.total_price = total
+    return total
+
+
+def apply_total_delta(order_id, delta):
+    """Атомарно сдвигает стоимость заказа на delta через F()-выражение."""
+    if not delta:
+        return 0
+    return Order.objects.filter(pk=order_id).update(total_price=F("total_price") + delta)
+
+
+def item_deltas_on_save(item, created):
+    """
+    Изменения стоимости заказов после сохранения позиции: {order_id: delta}.
+    При переносе позиции в другой заказ прежняя стоимость вычитается из
+    старого заказа, а полная — прибавляется к новому. Возвращает None,
+    если прежнее состояние позиции неизвестно.
+    """
+    line_total = item.unit_price * item.quantity
+    if created:
+        return {item.order_id: line_total}
+    if item.saved_unit_price is None:
+        return None
+    saved_total = item.saved_unit_price * item.saved_quantity
+    if item.saved_order_id != item.order_id:
+        return {item.saved_order_id: -saved_total, item.order_id: line_total}
+    return {item.order_id: line_total - saved_total}
+
+
+def item_deltas_on_delete(item):
+    """Изменение стоимости заказа после удаления позиции: {order_id: delta}."""
+    if item.saved_unit_price is None:
+        return {item.order_id: -(item.unit_price * item.quantity)}
+    return {item.saved_order_id: -(item.saved_unit_price * item.saved_quantity)}
@@ -0,0 +1,129 @@
+import sqlite3
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ..models import MenuItem, Order, OrderMenuItem
+from .pricing import MONEY, ZERO, line_total_expression
+
+DEFAULT_CHUNK_SIZE = 500
+
+UPDATE_FROM_SQL = """
+    UPDATE {order_table}
+    SET total_price = totals.total
+    FROM (
+        SELECT item.order_id AS order_id, SUM(item.unit_price * item.quantity) AS total
+        FROM {item_table} AS item
+        WHERE item.order_id IN ({placeholders})
+        GROUP BY item.order_id
+    ) AS totals
+    WHERE {order_table}.id = totals.order_id
+"""
+
+
+def _supports_update_from():
+    if connection.vendor == "postgresql":
+        return True
+    return connection.vendor == "sqlite" and sqlite3.sqlite_version_info >= (3, 33, 0)
+
+
+def _update_totals_from_select(order_ids):
+    """Пересчитывает стоимость пачки заказов одним UPDATE ... FROM (SELECT SUM ...)."""
+    quote = connection.ops.quote_name
+    sql = UPDATE_FROM_SQL.format(
+        order_table=quote(Order._meta.db_table),
+        item_table=quote(OrderMenuItem._meta.db_table),
+        placeholders=", ".join(["%s"] * len(order_ids)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(order_ids))
+        return cursor.rowcount
+
+
+def _update_totals_with_subquery(order_ids):
+    """Тот же пересчёт коррелированным подзапросом для СУБД без UPDATE ... FROM."""
+    totals = (
+        OrderMenuItem.objects.filter(order_id=OuterRef("pk"))
+        .values("order_id")
+        .annotate(total=Sum(line_total_expression(), output_field=MONEY))
+        .values("total")
+    )
+    return Order.objects.filter(pk__in=order_ids).update(
+        total_price=Coalesce(Subquery(totals), Value(ZERO), output_field=MONEY)
+    )
+
+
+def recalculate_totals(order_ids):
+    """Пересчитывает стоимость переданных заказов одним групповым запросом."""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+    if _supports_update_from():
+        return _update_totals_from_select(order_ids)
+    return _update_totals_with_subquery(order_ids)
+
+
+def open_order_ids_with_menu_items(menu_item_ids, chunk_size):
+    """
+    Отдаёт id незавершённых заказов с любым из блюд пачками по chunk_size,
+    двигаясь по ключу order_id без OFFSET.
+    """
+    last_id = 0
+    while True:
+        chunk = list(
+            OrderMenuItem.objects.filter(
+                menu_item_id__in=menu_item_ids,
+                order__status__in=Order.OPEN_STATUSES,
+                order_id__gt=last_id,
+            )
+            .order_by("order_id")
+            .values_list("order_id", flat=True)
+            .distinct()[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def reprice_orders_for_menu_items(menu_item_ids, chunk_size=None):
+    """
+    Переносит текущие цены блюд в позиции незавершённых заказов и пересчитывает
+    их стоимость за один проход по заказам. Каждая пачка обновляется в своей
+    короткой транзакции; завершённые заказы сохраняют зафиксированные цены.
+    """
+    chunk_size = chunk_size or getattr(settings, "REPRICING_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    menu_item_ids = list(
+        MenuItem.objects.filter(pk__in=menu_item_ids).values_list("pk", flat=True)
+    )
+    if not menu_item_ids:
+        return 0
+
+    menu_price = MenuItem.objects.filter(pk=OuterRef("menu_item_id")).values("price")[:1]
+    updated = 0
+    for order_ids in open_order_ids_with_menu_items(menu_item_ids, chunk_size):
+        with transaction.atomic():
+            OrderMenuItem.objects.filter(
+                menu_item_id__in=menu_item_ids, order_id__in=order_ids
+            ).update(unit_price=Subquery(menu_price))
+            updated += recalculate_totals(order_ids)
+    return updated
+
+
+def schedule_repricing(*menu_item_ids):
+    """
+    Запускает пересчёт после фиксации транзакции: в фоне через Celery,
+    если включён REPRICING_DEFERRED, иначе сразу в текущем процессе.
+    Несколько блюд пересчитываются одним проходом.
+    """
+    menu_item_ids = list(menu_item_ids)
+    if not menu_item_ids:
+        return
+    if getattr(settings, "REPRICING_DEFERRED", False):
+        from ..tasks import reprice_orders_for_menu_items_task
+
+        transaction.on_commit(lambda: reprice_orders_for_menu_items_task.delay(menu_item_ids))
+    else:
+        transaction.on_commit(lambda: reprice_orders_for_menu_items(menu_item_ids))
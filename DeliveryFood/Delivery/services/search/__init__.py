@@ -0,0 +1,107 @@
+"""
+Полнотекстовый поиск по ресторанам, блюдам и типам кухни.
+
+Бэкенд выбирается настройкой SEARCH_BACKEND ("sqlite" — FTS5, "postgres" —
+tsvector + pg_trgm); по умолчанию — по СУБД подключения. Индекс
+обновляется сигналами при сохранении моделей и пересобирается командой
+rebuild_search_index.
+"""
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from ...models import Restaurant
+from .backends import BACKENDS
+from .documents import (
+    CUISINE,
+    KIND_BY_MODEL,
+    MENU_ITEM,
+    MODEL_BY_KIND,
+    RESTAURANT,
+    document_for,
+    iter_documents,
+)
+
+
+def get_backend():
+    name = getattr(settings, "SEARCH_BACKEND", "") or (
+        "postgres" if connection.vendor == "postgresql" else "sqlite"
+    )
+    return BACKENDS[name]()
+
+
+def get_match(kind, query):
+    """Найденные документы вида kind (SearchMatch) или None, если искать нечего."""
+    if not query or not query.strip():
+        return None
+    return get_backend().match(kind, query)
+
+
+def search_ids(kind, query):
+    """Подзапрос id объектов вида kind, подходящих под запрос, для фильтра __in."""
+    match = get_match(kind, query)
+    if match is None:
+        return []
+    return RawSQL(match.ids_sql, match.ids_params)
+
+
+def filter_by_search(queryset, kind, query, keep_order=False):
+    """
+    Оставляет в queryset найденные объекты (подзапросом к индексу, без
+    ограничения числа результатов, поэтому count и пагинация точны). С
+    keep_order=False результаты сортируются по релевантности, иначе
+    сохраняется сортировка queryset.
+    """
+    match = get_match(kind, query)
+    if match is None:
+        return queryset.none()
+    queryset = queryset.filter(pk__in=RawSQL(match.ids_sql, match.ids_params))
+    if keep_order:
+        return queryset
+    meta = queryset.model._meta
+    quote = connection.ops.quote_name
+    object_id = f"{quote(meta.db_table)}.{quote(meta.pk.column)}"
+    relevance = RawSQL(match.rank_sql.format(object_id=object_id), match.rank_params)
+    return queryset.order_by(relevance.asc(), "pk")
+
+
+def search(query, kind):
+    """Найденные объекты вида kind в порядке релевантности."""
+    return filter_by_search(MODEL_BY_KIND[kind].objects.all(), kind, query)
+
+
+def index_instance(instance):
+    get_backend().index([document_for(instance)])
+
+
+def index_instances(instances):
+    """Индексирует пачку объектов (после bulk_create/bulk_update, минуя сигналы)."""
+    get_backend().index(document_for(instance) for instance in instances)
+
+
+def unindex_instance(instance):
+    get_backend().remove_many([(KIND_BY_MODEL[type(instance)], instance.pk)])
+
+
+def reindex_restaurants(restaurant_ids):
+    """Переиндексирует рестораны (их документ включает названия кухонь)."""
+    restaurants = Restaurant.objects.filter(pk__in=restaurant_ids)
+    get_backend().index(document_for(restaurant) for restaurant in restaurants)
+
+
+def rebuild_index(batch_size=1000):
+    """Пересобирает индекс целиком. Возвращает количество документов."""
+    backend = get_backend()
+    backend.clear()
+    batch = []
+    total = 0
+    for document in iter_documents(chunk_size=batch_size):
+        batch.append(document)
+        if len(batch) >= batch_size:
+            backend.index(batch)
+            total += len(batch)
+            batch = []
+    backend.index(batch)
+    return total + len(batch)
+
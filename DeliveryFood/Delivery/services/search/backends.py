@@ -0,0 +1,216 @@
+import re
+from collections import namedtuple
+
+from django.db import connection
+
+from .documents import KIND_CODES
+from .stemmer import stem, stem_text, tokenize
+
+# Минимальная длина запроса для поиска по триграммам
+TRIGRAM_MIN_LENGTH = 3
+# Документов в одном INSERT: многострочные запросы вместо executemany
+# (5 параметров на строку, в пределах лимита переменных SQLite)
+SQLITE_INSERT_CHUNK = 100
+# Спецсимволы шаблона LIKE (экранируются обратной косой чертой)
+LIKE_SPECIAL = re.compile(r"[\\%_]")
+
+# Найденные документы одного вида: ids_sql — подзапрос id объектов,
+# rank_sql — ранг объекта {object_id} (меньше — релевантнее)
+SearchMatch = namedtuple("SearchMatch", ["ids_sql", "ids_params", "rank_sql", "rank_params"])
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SqliteFtsBackend:
+    """
+    Индекс на виртуальных таблицах SQLite FTS5.
+
+    delivery_search_fts хранит основы слов (стемминг делается в Python) и
+    ранжируется bm25 с весом названия 10:1. delivery_search_trigram хранит
+    исходный текст с токенизатором trigram и нужен для поиска по подстроке,
+    когда по словам ничего не нашлось. rowid = object_id * 4 + код вида,
+    поэтому обновление документа — поиск по первичному ключу. Сортировка по
+    релевантности использует MATERIALIZED CTE (SQLite 3.35+).
+    """
+
+    fts_table = "delivery_search_fts"
+    trigram_table = "delivery_search_trigram"
+
+    def _rowid(self, kind, object_id):
+        return object_id * 4 + KIND_CODES[kind]
+
+    def index(self, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        self.remove_many([(doc.kind, doc.object_id) for doc in documents])
+        with connection.cursor() as cursor:
+            for chunk in _chunks(documents, SQLITE_INSERT_CHUNK):
+                cursor.execute(
+                    f"INSERT INTO {self.fts_table} (rowid, kind, object_id, title, body) "
+                    "VALUES " + ", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk)),
+                    [
+                        value
+                        for doc in chunk
+                        for value in (
+                            self._rowid(doc.kind, doc.object_id),
+                            doc.kind,
+                            doc.object_id,
+                            stem_text(doc.title),
+                            stem_text(doc.body),
+                        )
+                    ],
+                )
+                cursor.execute(
+                    f"INSERT INTO {self.trigram_table} (rowid, kind, object_id, text) "
+                    "VALUES " + ", ".join(["(%s, %s, %s, %s)"] * len(chunk)),
+                    [
+                        value
+                        for doc in chunk
+                        for value in (
+                            self._rowid(doc.kind, doc.object_id),
+                            doc.kind,
+                            doc.object_id,
+                            f"{doc.title} {doc.body}".lower(),
+                        )
+                    ],
+                )
+
+    def remove_many(self, keys):
+        rowids = [self._rowid(kind, object_id) for kind, object_id in keys]
+        with connection.cursor() as cursor:
+            for chunk in _chunks(rowids, SQLITE_INSERT_CHUNK * 5):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                for table in (self.fts_table, self.trigram_table):
+                    cursor.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders})", chunk)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            for table in (self.fts_table, self.trigram_table):
+                cursor.execute(f"DELETE FROM {table}")
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {self.fts_table}")
+            return cursor.fetchone()[0]
+
+    def _has_match(self, table, expression, kind):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT 1 FROM {table} WHERE {table} MATCH %s AND kind = %s LIMIT 1",
+                [expression, kind],
+            )
+            return cursor.fetchone() is not None
+
+    def _match(self, table, expression, kind, rank):
+        return SearchMatch(
+            f"SELECT object_id FROM {table} WHERE {table} MATCH %s AND kind = %s",
+            [expression, kind],
+            # Ранги считаются один раз (MATERIALIZED) и ищутся по rowid документа:
+            # MATCH внутри коррелированного подзапроса выполнялся бы на каждую строку
+            f"(WITH ranked AS MATERIALIZED (SELECT rowid, {rank} AS rank FROM {table} "
+            f"WHERE {table} MATCH %s) "
+            f"SELECT rank FROM ranked WHERE ranked.rowid = {{object_id}} * 4 + %s)",
+            [expression, KIND_CODES[kind]],
+        )
+
+    def match(self, kind, query):
+        terms = [stem(token) for token in tokenize(query)]
+        if not terms:
+            return None
+        # Каждая основа — префиксный запрос в кавычках: спецсимволы FTS5 не проходят
+        words = " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        expression = "{title body}: (" + words + ")"
+        if self._has_match(self.fts_table, expression, kind):
+            return self._match(
+                self.fts_table, expression, kind, f"bm25({self.fts_table}, 0.0, 0.0, 10.0, 1.0)"
+            )
+
+        text = " ".join(tokenize(query))
+        if len(text) < TRIGRAM_MIN_LENGTH:
+            return None
+        return self._match(
+            self.trigram_table, '"{}"'.format(text.replace('"', '""')), kind, "rank"
+        )
+
+
+class PostgresBackend:
+    """
+    Индекс в таблице delivery_search_document с tsvector по словарю russian
+    (GIN-индекс, ранжирование ts_rank с весами A/B) и триграммным
+    GIN-индексом pg_trgm для поиска по подстроке.
+    """
+
+    table = "delivery_search_document"
+
+    def index(self, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (kind, object_id, title, body) "
+                "VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT (kind, object_id) "
+                "DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body",
+                [(doc.kind, doc.object_id, doc.title, doc.body) for doc in documents],
+            )
+
+    def remove_many(self, keys):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE kind = %s AND object_id = %s", list(keys)
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.table}")
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+            return cursor.fetchone()[0]
+
+    def match(self, kind, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        # Префиксный поиск по каждому слову; to_tsquery сам приводит слова к основам
+        tsquery = " & ".join(f"{token}:*" for token in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT 1 FROM {self.table} "
+                "WHERE kind = %s AND document @@ to_tsquery('russian', %s) LIMIT 1",
+                [kind, tsquery],
+            )
+            found = cursor.fetchone() is not None
+        if found:
+            return SearchMatch(
+                f"SELECT object_id FROM {self.table} "
+                "WHERE kind = %s AND document @@ to_tsquery('russian', %s)",
+                [kind, tsquery],
+                f"(SELECT -ts_rank(document, to_tsquery('russian', %s)) FROM {self.table} "
+                "WHERE kind = %s AND object_id = {object_id})",
+                [tsquery, kind],
+            )
+
+        text = " ".join(tokens)
+        if len(text) < TRIGRAM_MIN_LENGTH:
+            return None
+        return SearchMatch(
+            f"SELECT object_id FROM {self.table} "
+            "WHERE kind = %s AND lower(title || ' ' || body) LIKE %s",
+            [kind, "%{}%".format(LIKE_SPECIAL.sub(r"\\\g<0>", text))],
+            f"(SELECT -similarity(title, %s) FROM {self.table} "
+            "WHERE kind = %s AND object_id = {object_id})",
+            [text, kind],
+        )
+
+
+BACKENDS = {
+    "sqlite": SqliteFtsBackend,
+    "postgres": PostgresBackend,
+}
@@ -0,0 +1,54 @@
+from collections import namedtuple
+
+from ...models import MenuItem, Restaurant, TypeCuisine
+
+# Документ индекса: title весит больше body при ранжировании
+SearchDocument = namedtuple("SearchDocument", ["kind", "object_id", "title", "body"])
+
+RESTAURANT = "restaurant"
+MENU_ITEM = "menu_item"
+CUISINE = "cuisine"
+
+# Код вида документа нужен SQLite-бэкенду для rowid = object_id * 4 + код
+KIND_CODES = {RESTAURANT: 1, MENU_ITEM: 2, CUISINE: 3}
+KIND_BY_MODEL = {Restaurant: RESTAURANT, MenuItem: MENU_ITEM, TypeCuisine: CUISINE}
+MODEL_BY_KIND = {kind: model for model, kind in KIND_BY_MODEL.items()}
+
+
+def restaurant_document(restaurant, cuisine_names=None):
+    if cuisine_names is None:
+        cuisine_names = restaurant.cuisine_types.values_list("name", flat=True)
+    return SearchDocument(
+        RESTAURANT,
+        restaurant.pk,
+        restaurant.name,
+        " ".join([restaurant.address or "", *cuisine_names]),
+    )
+
+
+def menu_item_document(menu_item):
+    return SearchDocument(MENU_ITEM, menu_item.pk, menu_item.name, menu_item.description or "")
+
+
+def cuisine_document(cuisine):
+    return SearchDocument(CUISINE, cuisine.pk, cuisine.name, "")
+
+
+def document_for(instance):
+    if isinstance(instance, Restaurant):
+        return restaurant_document(instance)
+    if isinstance(instance, MenuItem):
+        return menu_item_document(instance)
+    return cuisine_document(instance)
+
+
+def iter_documents(chunk_size=1000):
+    """Все документы индекса; рестораны читаются вместе с типами кухни."""
+    restaurants = Restaurant.objects.prefetch_related("cuisine_types").order_by("pk")
+    for restaurant in restaurants.iterator(chunk_size=chunk_size):
+        names = [cuisine.name for cuisine in restaurant.cuisine_types.all()]
+        yield restaurant_document(restaurant, names)
+    for menu_item in MenuItem.objects.order_by("pk").iterator(chunk_size=chunk_size):
+        yield menu_item_document(menu_item)
+    for cuisine in TypeCuisine.objects.order_by("pk").iterator(chunk_size=chunk_size):
+        yield cuisine_document(cuisine)
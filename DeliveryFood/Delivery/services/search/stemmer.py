@@ -0,0 +1,131 @@
+"""
+Стеммер русского языка по алгоритму Snowball (Портера).
+
+Используется бэкендом SQLite FTS5, у которого нет своего русского стеммера:
+текст документов и запросов приводится к основам до записи в индекс.
+"""
+
+import re
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND = (("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+ADJECTIVE = (
+    (),
+    (
+        "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+        "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+    ),
+)
+PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+REFLEXIVE = ((), ("ся", "сь"))
+VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть",
+     "ешь", "нно"),
+    (
+        "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им",
+        "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть",
+        "ишь", "ую", "ю",
+    ),
+)
+NOUN = (
+    (),
+    (
+        "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей",
+        "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы",
+        "ь", "ию", "ью", "ю", "ия", "ья", "я",
+    ),
+)
+DERIVATIONAL = ("ость", "ост")
+SUPERLATIVE = ("ейше", "ейш")
+
+WORD_RE = re.compile(r"\w+")
+
+
+def _strip(rv, endings):
+    """
+    Отрезает от RV самое длинное окончание из endings = (группа 1, группа 2).
+    Окончания первой группы допустимы только после «а» или «я».
+    Возвращает укороченную RV или None, если окончание не найдено.
+    """
+    best = None
+    for group, needs_a in ((endings[0], True), (endings[1], False)):
+        for ending in group:
+            if rv.endswith(ending) and (best is None or len(ending) > len(best[0])):
+                best = (ending, needs_a)
+    if best is None:
+        return None
+    ending, needs_a = best
+    stem = rv[: -len(ending)]
+    if needs_a and not stem.endswith(("а", "я")):
+        return None
+    return stem
+
+
+def _regions(word):
+    """Позиции начала RV и R2 в слове."""
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in VOWELS), len(word))
+
+    def after_vowel_consonant(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_vowel_consonant(0)
+    r2 = after_vowel_consonant(r1)
+    return rv, r2
+
+
+def stem(word):
+    """Основа одного слова (в нижнем регистре)."""
+    word = word.lower().replace("ё", "е")
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is None:
+        reflexive = _strip(rv, REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        adjectival = _strip(rv, ADJECTIVE)
+        if adjectival is not None:
+            participle = _strip(adjectival, PARTICIPLE)
+            stripped = participle if participle is not None else adjectival
+        else:
+            stripped = _strip(rv, VERB)
+            if stripped is None:
+                stripped = _strip(rv, NOUN)
+    rv = stripped if stripped is not None else rv
+
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразующее окончание должно лежать в R2
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and rv_start + len(rv) - len(ending) >= r2_start:
+            rv = rv[: -len(ending)]
+            break
+
+    # Шаг 4
+    superlative = next((ending for ending in SUPERLATIVE if rv.endswith(ending)), None)
+    if superlative:
+        rv = rv[: -len(superlative)]
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    elif not superlative and rv.endswith("ь"):
+        rv = rv[:-1]
+
+    return prefix + rv
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре."""
+    return WORD_RE.findall((text or "").lower())
+
+
+def stem_text(text):
+    """Текст, приведённый к основам слов через пробел."""
+    return " ".join(stem(token) for token in tokenize(text))
@@ -0,0 +1,145 @@
+"""
+Индексы в памяти процесса, согласованные между процессами общей версией в кэше.
+
+Процесс применяет свои изменения к своему индексу сам и сдвигает версию;
+чужие изменения он замечает, сверяя версию не чаще раза в refresh секунд.
+Устаревший индекс перестраивается в фоновом потоке, а запросы тем временем
+обслуживает прежний: новый подменяет его целиком, когда готов. Синхронно
+строится только первый индекс процесса, если его не прогрели при запуске
+(warm_all_in_background из wsgi.py и asgi.py).
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_registry = []
+
+
+class VersionedIndex:
+    """
+    Индекс, который строит build() из базы. Имена настроек: cache_alias_setting —
+    алиас кэша с общей версией, refresh_setting — период сверки версии в секундах.
+    """
+
+    def __init__(self, name, version_key, build, cache_alias_setting, refresh_setting):
+        self.name = name
+        self.version_key = version_key
+        self.build = build
+        self.cache_alias_setting = cache_alias_setting
+        self.refresh_setting = refresh_setting
+        self.index = None
+        self.version = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        self.rebuilding = False
+        _registry.append(self)
+
+    def cache(self):
+        return caches[getattr(settings, self.cache_alias_setting, "default")]
+
+    def shared_version(self):
+        cache = self.cache()
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def get(self):
+        """
+        Индекс процесса. Первый строится сразу; устаревший отдаётся, пока в
+        фоне строится новый.
+        """
+        now = time.monotonic()
+        refresh = getattr(settings, self.refresh_setting, 5)
+        if self.index is not None and now - self.checked_at < refresh:
+            return self.index
+
+        with self.lock:
+            if self.index is None:
+                version = self.shared_version()
+                self.index, self.version = self.build(), version
+                self.checked_at = now
+                return self.index
+            if now - self.checked_at < refresh:
+                return self.index
+            self.checked_at = now
+            version = self.shared_version()
+            if version != self.version and not self.rebuilding:
+                self.rebuilding = True
+                threading.Thread(
+                    target=self._rebuild, args=(version,), name=f"{self.name}-rebuild", daemon=True
+                ).start()
+        return self.index
+
+    def _rebuild(self, version):
+        try:
+            index = self.build()
+            with self.lock:
+                # Изменения этого процесса, пришедшие во время сборки, могли не
+                # попасть в новый индекс: версия до них заставит собрать его ещё раз
+                self.index, self.version = index, version
+        except Exception:
+            logger.exception("Не удалось перестроить индекс %s", self.name)
+        finally:
+            self.rebuilding = False
+            connections.close_all()
+
+    def warm(self):
+        """Строит индекс заранее, чтобы первый запрос процесса не ждал сборки."""
+        with self.lock:
+            if self.index is None:
+                version = self.shared_version()
+                self.index, self.version = self.build(), version
+                self.checked_at = time.monotonic()
+
+    def apply(self, change):
+        """
+        Применяет change(index) к индексу этого процесса и сдвигает общую
+        версию, чтобы остальные процессы перестроили свои индексы.
+        """
+        index = self.index
+        if index is not None:
+            change(index)
+        try:
+            version = self.cache().incr(self.version_key)
+        except ValueError:
+            return
+        with self.lock:
+            # Своё изменение уже учтено — перестраивать индекс этого процесса не нужно
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+
+    def invalidate(self):
+        """
+        Сбрасывает индексы всех процессов после массовых изменений в обход
+        сигналов: индекс этого процесса перестроится при следующем запросе.
+        """
+        try:
+            self.cache().incr(self.version_key)
+        except ValueError:
+            pass
+        self.checked_at = 0.0
+
+
+def _warm_all():
+    try:
+        for index in _registry:
+            index.warm()
+    except Exception:
+        # База может быть ещё не готова (до migrate): индекс построит первый запрос
+        logger.exception("Не удалось прогреть индексы при запуске")
+    finally:
+        connections.close_all()
+
+
+def warm_all_in_background():
+    """Прогревает все индексы процесса в фоновом потоке при старте веб-процесса."""
+    threading.Thread(target=_warm_all, name="versioned-index-warm", daemon=True).start()
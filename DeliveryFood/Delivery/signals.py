@@ -1,22 +1,344 @@
-from django.db.models.signals import post_save, post_delete
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import MenuItem, OrderMenuItem
+from .models import (
+    Courier,
+    Delivery,
+    MenuItem,
+    Order,
+    OrderMenuItem,
+    Restaurant,
+    RestaurantCuisine,
+    SiteCounter,
+    TypeCuisine,
+    User,
+)
+from .services import (
+    autocomplete,
+    courier_stats,
+    cuisine_popularity,
+    dish_popularity,
+    fragment_cache,
+    geo,
+    search,
+)
+from .services.counters import shift_restaurant_orders, shift_site_counter
+from .services.images import cached_variants, schedule_derivatives
+from .services.menu_cache import bump_menu_version_on_commit
+from .services.menu_stats import (
+    ItemState,
+    apply_item_change,
+    rebuild_restaurant_stats,
+    saved_item_state,
+)
+from .services.pricing import (
+    apply_total_delta,
+    item_deltas_on_delete,
+    item_deltas_on_save,
+    recalculate_order_total,
+)
+from .services.repricing import schedule_repricing
 
 
 @receiver(post_save, sender=OrderMenuItem)
+def update_order_total_price(sender, instance, created, **kwargs):
+    """Сдвигает стоимость заказа (и прежнего заказа при переносе позиции)."""
+    deltas = item_deltas_on_save(instance, created)
+    if deltas is None:
+        recalculate_order_total(instance.order)
+        return
+    for order_id, delta in deltas.items():
+        apply_total_delta(order_id, delta)
+
+
 @receiver(post_delete, sender=OrderMenuItem)
-def update_order_total_price(sender, instance, **kwargs):
-    """Обновляет общую стоимость заказа при изменении позиций."""
-    order = instance.order
-    order.update_total_price()
-    order.save()
+def subtract_deleted_item_price(sender, instance, **kwargs):
+    """Вычитает стоимость удалённой позиции из общей стоимости заказа."""
+    for order_id, delta in item_deltas_on_delete(instance).items():
+        apply_total_delta(order_id, delta)
+
+
+@receiver(post_save, sender=MenuItem)
+def update_related_orders_on_menuitem_change(sender, instance, created, update_fields, **kwargs):
+    """Пересчитывает незавершённые заказы, только если цена блюда изменилась."""
+    if created or not instance.price_changed:
+        return
+    if update_fields is not None and "price" not in update_fields:
+        return
+    schedule_repricing(instance.pk)
 
 
 @receiver(post_save, sender=MenuItem)
-def update_related_orders_on_menuitem_change(sender, instance, **kwargs):
-    """Обновляет общую стоимость заказов при изменении цены блюда."""
-    related_order_items = OrderMenuItem.objects.filter(menu_item=instance)
-    orders = set(item.order for item in related_order_items)
-    for order in orders:
-        order.update_total_price()
-        order.save()
+@receiver(post_delete, sender=MenuItem)
+def invalidate_menu_cache_on_menuitem_change(sender, instance, **kwargs):
+    """Сбрасывает кэш меню ресторана (и прежнего ресторана, если блюдо перенесли)."""
+    bump_menu_version_on_commit(instance.restaurant_id)
+    if instance.saved_restaurant_id not in (None, instance.restaurant_id):
+        bump_menu_version_on_commit(instance.saved_restaurant_id)
+
+
+@receiver(post_save, sender=RestaurantCuisine)
+@receiver(post_delete, sender=RestaurantCuisine)
+def invalidate_menu_cache_on_cuisine_change(sender, instance, **kwargs):
+    bump_menu_version_on_commit(instance.restaurant_id)
+
+
+@receiver(m2m_changed, sender=Restaurant.cuisine_types.through)
+def invalidate_menu_cache_on_cuisine_types_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    add()/remove()/clear() по cuisine_types не вызывают post_save у
+    RestaurantCuisine, поэтому версия меняется здесь.
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            bump_menu_version_on_commit(instance.pk)
+        return
+
+    # Изменение со стороны типа кухни: затронуты рестораны из pk_set
+    if action == "pre_clear":
+        pk_set = set(instance.restaurants.values_list("pk", flat=True))
+    elif action not in ("post_add", "post_remove"):
+        return
+    for restaurant_id in pk_set or ():
+        bump_menu_version_on_commit(restaurant_id)
+
+
+@receiver(post_save, sender=MenuItem)
+def update_menu_stats_on_save(sender, instance, created, **kwargs):
+    """Переносит изменение блюда в сводку меню ресторана."""
+    new = ItemState(instance.price, instance.is_available)
+    if created:
+        apply_item_change(instance.restaurant_id, None, new)
+        return
+
+    old = saved_item_state(instance)
+    if old is None:
+        # Прежнее состояние неизвестно — пересчитываем сводку ресторана
+        rebuild_restaurant_stats(instance.restaurant_id)
+    elif instance.saved_restaurant_id != instance.restaurant_id:
+        apply_item_change(instance.saved_restaurant_id, old, None)
+        apply_item_change(instance.restaurant_id, None, new)
+    else:
+        apply_item_change(instance.restaurant_id, old, new)
+
+
+@receiver(post_delete, sender=MenuItem)
+def update_menu_stats_on_delete(sender, instance, **kwargs):
+    old = saved_item_state(instance) or ItemState(instance.price, instance.is_available)
+    apply_item_change(instance.saved_restaurant_id or instance.restaurant_id, old, None)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=TypeCuisine)
+def update_search_index_on_save(sender, instance, **kwargs):
+    """Обновляет документ поискового индекса в той же транзакции."""
+    search.index_instance(instance)
+    if sender is TypeCuisine:
+        # Название кухни входит в документы ресторанов
+        search.reindex_restaurants(instance.restaurants.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_delete, sender=TypeCuisine)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex_instance(instance)
+
+
+@receiver(post_save, sender=RestaurantCuisine)
+@receiver(post_delete, sender=RestaurantCuisine)
+def update_search_index_on_cuisine_link_change(sender, instance, **kwargs):
+    search.reindex_restaurants([instance.restaurant_id])
+
+
+@receiver(m2m_changed, sender=Restaurant.cuisine_types.through)
+def update_search_index_on_cuisine_types_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            search.reindex_restaurants([instance.pk])
+        return
+
+    # Изменение со стороны типа кухни: при clear() рестораны запоминаются заранее
+    if action == "pre_clear":
+        instance.cleared_restaurant_ids = list(instance.restaurants.values_list("pk", flat=True))
+    elif action == "post_clear":
+        search.reindex_restaurants(getattr(instance, "cleared_restaurant_ids", []))
+    elif action in ("post_add", "post_remove"):
+        search.reindex_restaurants(pk_set)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=TypeCuisine)
+def update_autocomplete_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Обновляет префиксный индекс подсказок после фиксации транзакции. Сохранение
+    без смены названия и доступности версию индекса не сдвигает.
+    """
+    if not autocomplete.indexed_fields_changed(instance, created, update_fields):
+        return
+    transaction.on_commit(lambda: autocomplete.apply_change(instance))
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_delete, sender=TypeCuisine)
+def update_autocomplete_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete.apply_change(instance, deleted=True))
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=Order)
+def generate_image_derivatives_on_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Новое изображение уменьшается фоновой задачей. Уже обработанные файлы
+    (их ширины есть в кэше) повторно не ставятся в очередь.
+    """
+    if update_fields is not None and "image" not in update_fields:
+        return
+    if instance.image and cached_variants(instance.image.name) is None:
+        schedule_derivatives(instance.image.name)
+
+
+@receiver(pre_save, sender=Restaurant)
+@receiver(pre_save, sender=User)
+def geocode_address_on_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Координаты по адресу через настроенный геокодер (GEOCODER). Сохранения
+    отдельных полей без адреса (например, last_login при входе) не геокодируются.
+    """
+    if update_fields is not None and "address" not in update_fields:
+        return
+    geo.fill_coordinates(instance)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_geo_index_on_save(sender, instance, created, **kwargs):
+    if not geo.coordinates_changed(instance, created):
+        return
+    transaction.on_commit(lambda: geo.apply_change(instance))
+
+
+@receiver(post_delete, sender=Restaurant)
+def update_geo_index_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: geo.apply_change(instance, deleted=True))
+
+
+SITE_COUNTER_BY_MODEL = {
+    Restaurant: SiteCounter.RESTAURANTS,
+    MenuItem: SiteCounter.DISHES,
+    Order: SiteCounter.ORDERS,
+}
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=Order)
+def increment_site_counter(sender, instance, created, **kwargs):
+    """Счётчики главной страницы сдвигаются в транзакции сохранения."""
+    if not created:
+        return
+    shift_site_counter(SITE_COUNTER_BY_MODEL[sender], 1)
+    if sender is Order:
+        shift_restaurant_orders({instance.restaurant_id: 1})
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_delete, sender=Order)
+def decrement_site_counter(sender, instance, **kwargs):
+    shift_site_counter(SITE_COUNTER_BY_MODEL[sender], -1)
+    if sender is Order:
+        shift_restaurant_orders({instance.restaurant_id: -1})
+
+
+def _order_created_at(item):
+    """Время создания заказа позиции (None, если заказ уже удалён)."""
+    if OrderMenuItem.order.is_cached(item):
+        return item.order.created_at
+    return (
+        Order.objects.filter(pk=item.order_id).values_list("created_at", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=OrderMenuItem)
+def update_dish_popularity_on_save(sender, instance, created, **kwargs):
+    """Рейтинг блюд за всё время и за окна; при замене блюда в позиции — у обоих блюд."""
+    if created:
+        lines = [(instance.menu_item_id, 1)]
+    elif instance.saved_menu_item_id not in (None, instance.menu_item_id):
+        lines = [(instance.saved_menu_item_id, -1), (instance.menu_item_id, 1)]
+    else:
+        return
+    created_at = _order_created_at(instance)
+    dish_popularity.record_lines(
+        (menu_item_id, created_at, delta) for menu_item_id, delta in lines
+    )
+
+
+@receiver(post_delete, sender=OrderMenuItem)
+def update_dish_popularity_on_delete(sender, instance, **kwargs):
+    menu_item_id = instance.saved_menu_item_id or instance.menu_item_id
+    dish_popularity.record_lines([(menu_item_id, _order_created_at(instance), -1)])
+
+
+@receiver(post_save, sender=OrderMenuItem)
+def update_cuisine_popularity_on_save(sender, instance, created, **kwargs):
+    """Корзины объёма заказов ресторанов: новые позиции, смена количества и перенос."""
+    cuisine_popularity.record_order_quantities(
+        cuisine_popularity.quantity_deltas_on_save(instance, created)
+    )
+
+
+@receiver(post_delete, sender=OrderMenuItem)
+def update_cuisine_popularity_on_delete(sender, instance, **kwargs):
+    cuisine_popularity.record_order_quantities(
+        cuisine_popularity.quantity_deltas_on_delete(instance)
+    )
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=OrderMenuItem)
+@receiver(post_save, sender=TypeCuisine)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=OrderMenuItem)
+@receiver(post_delete, sender=TypeCuisine)
+def bump_fragment_versions(sender, instance, **kwargs):
+    """Закэшированные фрагменты шаблонов с этой моделью или объектом устаревают."""
+    fragment_cache.bump_for_instance(instance)
+
+
+@receiver(post_save, sender=Delivery)
+def update_courier_load_on_save(sender, instance, created, **kwargs):
+    """Число доставок в процессе у курьера; при смене курьера — у обоих."""
+    deltas = Counter()
+    if not created and instance.saved_delivery_status == courier_stats.IN_PROGRESS:
+        deltas[instance.saved_courier_id] -= 1
+    if instance.delivery_status == courier_stats.IN_PROGRESS:
+        deltas[instance.courier_id] += 1
+    courier_stats.shift_active_deliveries(deltas)
+
+
+@receiver(post_delete, sender=Delivery)
+def update_courier_load_on_delete(sender, instance, **kwargs):
+    status = instance.saved_delivery_status or instance.delivery_status
+    if status == courier_stats.IN_PROGRESS:
+        courier_id = instance.saved_courier_id or instance.courier_id
+        courier_stats.shift_active_deliveries({courier_id: -1})
+
+
+@receiver(post_save, sender=User)
+def copy_user_activity_to_courier(sender, instance, created, **kwargs):
+    """Активность пользователя переносится в профиль курьера (если он есть и она изменилась)."""
+    if not created:
+        Courier.objects.filter(user_id=instance.pk).exclude(
+            user_is_active=instance.is_active
+        ).update(user_is_active=instance.is_active)
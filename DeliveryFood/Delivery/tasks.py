@@ -0,0 +1,63 @@
+from celery import shared_task
+
+from .services.courier_locations import prune_tracks
+from .services.cuisine_popularity import rollup_cuisine_popularity
+from .services.dish_popularity import refresh_windows
+from .services.dispatch import dispatch_tick
+from .services.images import generate_derivatives
+from .services.overdue import sweep_overdue_orders
+from .services.pdf_export import run_pdf_export
+from .services.repricing import reprice_orders_for_menu_items
+
+
+@shared_task
+def reprice_orders_for_menu_items_task(menu_item_ids):
+    """Фоновый пересчёт незавершённых заказов после смены цен нескольких блюд."""
+    return reprice_orders_for_menu_items(menu_item_ids)
+
+
+@shared_task
+def sweep_overdue_orders_task():
+    """Периодическая задача: обновляет флаг просроченных заказов."""
+    marked, cleared = sweep_overdue_orders()
+    return {"marked": marked, "cleared": cleared}
+
+
+@shared_task
+def rollup_cuisine_popularity_task():
+    """Периодическая задача: сдвигает скользящие окна популярности кухонь."""
+    result = rollup_cuisine_popularity()
+    return result._asdict()
+
+
+@shared_task
+def refresh_dish_popularity_task():
+    """Периодическая задача: сдвигает скользящие окна рейтинга блюд."""
+    result = refresh_windows()
+    return result._asdict()
+
+
+@shared_task
+def dispatch_couriers_task():
+    """Периодическая задача: назначает свободных курьеров на готовые заказы."""
+    result = dispatch_tick()
+    return result._asdict() if result else None
+
+
+@shared_task
+def prune_courier_tracks_task():
+    """Периодическая задача: удаляет устаревшие точки треков курьеров."""
+    return prune_tracks()
+
+
+@shared_task
+def export_orders_pdf_task(export_id):
+    """Фоновое формирование PDF по заказам, выбранным в админке."""
+    export = run_pdf_export(export_id)
+    return export.file.name
+
+
+@shared_task
+def generate_image_derivatives_task(name):
+    """Фоновое построение уменьшенных копий загруженного изображения."""
+    return generate_derivatives(name)
@@ -1,42 +1,48 @@
-from ..models import Restaurant, MenuItem, Order, TypeCuisine
+from ..models import Restaurant, MenuItem, Order
+from ..services import dish_popularity
+from ..services.counters import site_counters
+from ..services.menu_cache import get_menu
+from ..services import search as search_index
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Count, Q
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject
 
 
 
+# Окна рейтинга популярных блюд для переключателя на странице
+WINDOW_LABELS = {
+    'all': 'За всё время',
+    '24h': 'За сутки',
+    '7d': 'За неделю',
+    '30d': 'За месяц',
+}
+
+
 def home(request):
-    # Простая статистика
-    total_restaurants = Restaurant.objects.count()
-    total_dishes = MenuItem.objects.count()
-    total_orders = Order.objects.count()
+    # Блоки страницы кэшируются фрагментами (fragment_tags), поэтому данные
+    # передаются лениво и читаются из базы только при перестроении блока.
+
+    # Простая статистика: готовые счётчики одним запросом по первичному ключу
+    counters = SimpleLazyObject(site_counters)
 
-    # Топ 5 ресторанов (по количеству заказов и количеству блюд)
+    # Топ 5 ресторанов (по количеству заказов и количеству доступных блюд) из сводок
     top_restaurants = (
-        Restaurant.objects.annotate(
-            menu_items_count=Count('menu_items'),
-            orders_count=Count('orders')
-        )
-        .filter(menu_items__is_available=True)
-        .order_by('-orders_count', '-menu_items_count')[:5]
+        Restaurant.objects.filter(menu_stats__available_count__gt=0)
+        .order_by('-menu_stats__order_count', '-menu_stats__available_count')[:5]
     )
 
     # Топ 5 популярных блюд (по количеству "вхождений" в заказы)
-    popular_dishes = (
-        MenuItem.objects.filter(is_available=True)
-        .annotate(orders_count=Count('order_items'))
-        .order_by('-orders_count')[:5]
-    )
+    popular_dishes = dish_popularity.top_dishes()[:5]
 
     # Топ 5 текущих заказов (заявок): статусы new / preparing / delivering
     current_orders = (
         Order.objects.filter(status__in=['new', 'preparing', 'delivering'])
+        .select_related('restaurant')
         .order_by('-created_at')[:5]
     )
 
     context = {
-        'total_restaurants': total_restaurants,
-        'total_dishes': total_dishes,
-        'total_orders': total_orders,
+        'counters': counters,
         'top_restaurants': top_restaurants,
         'popular_dishes': popular_dishes,
         'current_orders': current_orders,
@@ -47,18 +53,20 @@ def home(request):
 def top_restaurants_list(request):
     query = request.GET.get('q', '')
 
-    # Получаем список всех ресторанов с аннотацией количества блюд и заказов
-    restaurants = Restaurant.objects.annotate(
-        menu_items_count=Count('menu_items', filter=Q(menu_items__is_available=True)),
-        orders_count=Count('orders')
-    )
+    # Количество доступных блюд и заказов берётся из сводки ресторана
+    restaurants = Restaurant.objects.select_related('menu_stats')
 
-    # Поиск по имени ресторана
+    # Поиск по имени ресторана через полнотекстовый индекс
     if query:
-        restaurants = restaurants.filter(name__iregex=query)
+        restaurants = search_index.filter_by_search(
+            restaurants, search_index.RESTAURANT, query, keep_order=True
+        )
 
     # Сортируем по количеству заказов и блюд
-    restaurants = restaurants.order_by('-orders_count', '-menu_items_count')
+    restaurants = restaurants.order_by(
+        F('menu_stats__order_count').desc(nulls_last=True),
+        F('menu_stats__available_count').desc(nulls_last=True),
+    )
 
     context = {
         'restaurants': restaurants,
@@ -70,18 +78,23 @@ def top_restaurants_list(request):
 
 def popular_dishes_list(request):
     query = request.GET.get('q', '')
-    # Фильтруем доступные блюда
-    menu_items = MenuItem.objects.filter(is_available=True).annotate(
-        orders_count=Count('order_items')
-    ).order_by('-orders_count')
+    window = request.GET.get('window', dish_popularity.DEFAULT_WINDOW)
+    if window not in dish_popularity.WINDOWS:
+        window = dish_popularity.DEFAULT_WINDOW
+    # Доступные блюда по числу заказов за окно (за всё время, 24 часа, 7 или 30 дней)
+    menu_items = dish_popularity.top_dishes(window)
 
-    # Поиск по названию блюда
+    # Поиск по названию блюда через полнотекстовый индекс
     if query:
-        menu_items = menu_items.filter(name__iregex=query)
+        menu_items = search_index.filter_by_search(
+            menu_items, search_index.MENU_ITEM, query, keep_order=True
+        )
 
     context = {
         'menu_items': menu_items,
         'query': query,
+        'window': window,
+        'windows': WINDOW_LABELS,
     }
     return render(request, 'Delivery/main/popular_dishes_list.html', context)
 
@@ -94,9 +107,11 @@ def current_orders_list(request):
     # Текущие заказы: статусы new, preparing, delivering
     orders = Order.objects.filter(status__in=['new', 'preparing', 'delivering']).select_related('restaurant', 'user')
 
-    # Простой поиск по названию ресторана (можно расширить)
+    # Поиск по ресторану через полнотекстовый индекс
     if query:
-        orders = orders.filter(restaurant__name__iregex=query)
+        orders = orders.filter(
+            restaurant_id__in=search_index.search_ids(search_index.RESTAURANT, query)
+        )
 
     orders = orders.order_by('-created_at')
     context = {
@@ -110,10 +125,11 @@ def current_orders_list(request):
 
 def restaurant_detail(request, pk):
     restaurant = get_object_or_404(Restaurant, pk=pk)
-    # Типы кухни (через M2M)
-    cuisines = restaurant.cuisine_types.all()
+    # Меню и типы кухни берутся из кэша меню ресторана
+    menu = get_menu(restaurant.pk)
+    cuisines = menu.cuisines
     # Доступные блюда ресторана
-    menu_items = restaurant.menu_items.filter(is_available=True)
+    menu_items = [item for item in menu.items if item.is_available]
 
     context = {
         'restaurant': restaurant,
@@ -141,17 +157,14 @@ def order_detail(request, pk):
 def search(request):
     query = request.GET.get('q', '')
 
-    # Поиск ресторанов
-    restaurants = Restaurant.objects.filter(name__iregex=query)
+    # Поиск по полнотекстовому индексу, результаты упорядочены по релевантности
+    restaurants = search_index.search(query, search_index.RESTAURANT)
 
     # Поиск блюд
-    menu_items = MenuItem.objects.filter(
-        name__icontains=query,
-        is_available=True
-    )
+    menu_items = search_index.search(query, search_index.MENU_ITEM).filter(is_available=True)
 
     # Поиск по типам кухни
-    cuisines = TypeCuisine.objects.filter(name__iregex=query)
+    cuisines = search_index.search(query, search_index.CUISINE)
 
     context = {
         'query': query,
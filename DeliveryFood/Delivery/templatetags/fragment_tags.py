@@ -0,0 +1,48 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..services.fragment_cache import get_or_build
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, scopes):
+        self.nodelist = nodelist
+        self.name = name
+        self.scopes = scopes
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        scopes = [scope.resolve(context) for scope in self.scopes]
+        # Содержимое рендерится (и обращается к базе) только при промахе
+        return mark_safe(get_or_build(name, scopes, lambda: self.nodelist.render(context)))
+
+
+@register.filter
+def scope(pk, model_name):
+    """Область объекта по id без загрузки объекта: {{ dish.restaurant_id|scope:"restaurant" }}."""
+    return f"{model_name}:{pk}"
+
+
+@register.tag
+def fragmentcache(parser, token):
+    """
+    {% fragmentcache "имя" область ... %} ... {% endfragmentcache %}
+
+    Кэширует содержимое блока до изменения любой из областей: строки
+    ("restaurants", "dishes", "orders", "order-items") или объекта модели
+    (restaurant, dish) — см. services.fragment_cache.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"Тег {bits[0]} ожидает имя фрагмента и хотя бы одну область."
+        )
+    nodelist = parser.parse(("endfragmentcache",))
+    parser.delete_first_token()
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:]],
+    )
@@ -0,0 +1,45 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from ..services.images import FORMATS, available_variants, variant_name
+
+register = template.Library()
+
+# Карточки в списках — около 300px шириной, на узком экране во всю ширину
+DEFAULT_SIZES = "(max-width: 600px) 100vw, 320px"
+
+
+@register.simple_tag
+def responsive_image(image, alt="", sizes=DEFAULT_SIZES):
+    """
+    Тег <picture> с уменьшенными копиями изображения: браузер сам выбирает
+    ширину по sizes и WebP, если умеет. Пока копий нет — исходный файл.
+    """
+    widths = available_variants(image.name)
+    if not widths:
+        return format_html('<img src="{}" alt="{}" loading="lazy">', image.url, alt)
+
+    def srcset(image_format):
+        return ", ".join(
+            f"{default_storage.url(variant_name(image.name, width, image_format))} {width}w"
+            for width in widths
+        )
+
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (mime_type, srcset(image_format), sizes)
+            for image_format, (_, mime_type) in FORMATS.items()
+            if image_format != "JPEG"
+        ),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"></picture>',
+        sources,
+        default_storage.url(variant_name(image.name, widths[0], "JPEG")),
+        srcset("JPEG"),
+        sizes,
+        alt,
+    )
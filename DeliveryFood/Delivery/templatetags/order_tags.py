@@ -1,5 +1,6 @@
 from django import template
 from ..models import Order
+from ..services import fragment_cache
 
 register = template.Library()
 
@@ -15,5 +16,9 @@ def calculate_total(price, quantity):
 
 @register.simple_tag
 def recent_orders(count=5):
-    """Шаблонный тег, возвращающий последние заказы."""
-    return Order.objects.order_by('-order_date')[:count]
+    """Шаблонный тег, возвращающий последние заказы (кэшируются до изменения заказов)."""
+    return fragment_cache.get_or_build(
+        f"recent-orders-{count}",
+        [fragment_cache.ORDERS],
+        lambda: list(Order.objects.order_by('-order_date')[:count]),
+    )
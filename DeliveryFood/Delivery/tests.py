@@ -1,3 +1,863 @@
-from django.test import TestCase
+import base64
+import io
+import itertools
+import json
+import re
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+import numpy as np
+from openpyxl import Workbook
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from .models import (
+    Courier,
+    CourierLocation,
+    MenuItem,
+    Order,
+    OrderMenuItem,
+    Restaurant,
+    RestaurantCuisine,
+    RestaurantMenuStats,
+    RestaurantOrderVolume,
+    TypeCuisine,
+    User,
+)
+from .pagination import KeysetPagination
+from .serializers.order_serializers import OrderSerializer
+from .services import (
+    autocomplete,
+    courier_locations,
+    courier_stats,
+    cuisine_popularity,
+    dish_popularity,
+    dispatch,
+    geo,
+    repricing,
+    search,
+)
+from .services.bulk_orders import ingest_orders
+from .services.order_status import transition_matching_orders, transition_order_ids
+from .services.overdue import overdue_cutoff
+from .services.versioned_index import VersionedIndex
+from .views.courier_views import DeliveryViewSet
+from .views.order_views import OrderViewSet
+from .views.restaurant_views import MenuItemViewSet, RestaurantViewSet
+
+
+class QueryPlanTests(TestCase):
+    """
+    Планы запросов горячих эндпоинтов должны опираться на индексы:
+    полный проход по таблице без индекса считается регрессией.
+    """
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # На пустых таблицах Postgres всегда выбирает Seq Scan
+                cursor.execute("SET enable_seqscan = off")
+
+    def assertIndexBacked(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == "sqlite":
+            full_scans = [
+                line for line in plan.splitlines()
+                if re.search(r"\bSCAN \S+$", line.strip())
+            ]
+        else:
+            full_scans = [line for line in plan.splitlines() if "Seq Scan" in line]
+        self.assertEqual(full_scans, [], f"Запрос без индекса:\n{queryset.query}\n{plan}")
+
+    def test_order_list_uses_ordering_index(self):
+        self.assertIndexBacked(OrderViewSet.queryset.order_by(*OrderViewSet.ordering, "id"))
+        self.assertIndexBacked(Order.objects.all())
+
+    def test_orders_by_user(self):
+        self.assertIndexBacked(OrderViewSet.queryset.filter(user__id=1))
+
+    def test_orders_by_status(self):
+        self.assertIndexBacked(OrderViewSet.queryset.filter(status="preparing"))
+
+    def test_ready_or_past_due(self):
+        orders = OrderViewSet().get_orders_for_status_or_time()
+        self.assertIndexBacked(orders)
+        self.assertIndexBacked(orders.order_by().values("pk"))
+
+    def test_overdue_sweep(self):
+        self.assertIndexBacked(
+            Order.objects.filter(
+                is_overdue=False,
+                status__in=Order.OPEN_STATUSES,
+                order_date__lt=overdue_cutoff(),
+            ).order_by("pk").values_list("pk", flat=True)[:1000]
+        )
+
+    def test_current_orders(self):
+        self.assertIndexBacked(
+            Order.objects.filter(status__in=Order.OPEN_STATUSES).order_by("-created_at")[:5]
+        )
+
+    def test_home_leaderboards(self):
+        self.assertIndexBacked(
+            Restaurant.objects.filter(menu_stats__available_count__gt=0)
+            .order_by("-menu_stats__order_count", "-menu_stats__available_count")[:5]
+        )
+        self.assertIndexBacked(MenuItem.objects.filter(is_available=True).order_by("-order_count")[:5])
+
+    def test_dish_leaderboards(self):
+        for window in dish_popularity.WINDOWS:
+            self.assertIndexBacked(dish_popularity.top_dishes(window)[:10])
+            self.assertIndexBacked(dish_popularity.top_dishes(window, restaurant_id=1)[:10])
+
+    def test_menu_items_by_restaurant(self):
+        self.assertIndexBacked(MenuItemViewSet.queryset.filter(restaurant__id=1))
+        self.assertIndexBacked(MenuItem.objects.filter(restaurant_id=1, is_available=True))
+
+    def test_restaurants_by_cuisine_popularity(self):
+        for window in ("24h", "7d", "30d"):
+            self.assertIndexBacked(RestaurantViewSet.restaurants_for_cuisines([1], window))
+
+    def test_search_filter(self):
+        self.assertIndexBacked(search.search("пицца", search.MENU_ITEM))
+        self.assertIndexBacked(search.search("пицца", search.MENU_ITEM).order_by("pk")[:20])
+
+    def test_repricing_chunk(self):
+        self.assertIndexBacked(
+            OrderMenuItem.objects.filter(
+                menu_item_id=1, order__status__in=Order.OPEN_STATUSES, order_id__gt=0
+            )
+            .order_by("order_id")
+            .values_list("order_id", flat=True)
+            .distinct()
+        )
+
+    def test_deliveries_by_status(self):
+        self.assertIndexBacked(DeliveryViewSet.queryset.filter(delivery_status="in_progress"))
+
+    def test_dispatch_candidates(self):
+        self.assertIndexBacked(dispatch.dispatchable_orders())
+        self.assertIndexBacked(dispatch.available_couriers())
+
+    def test_couriers_by_vehicle_type(self):
+        self.assertIndexBacked(Courier.objects.by_vehicle_type("car"))
+
+    def test_active_couriers_stats(self):
+        self.assertIndexBacked(courier_stats.vehicle_stats_rows())
+
+
+class OrderTestCase(TestCase):
+    """Пользователь, ресторан и два блюда для тестов заказов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="client", phone="+79990000000")
+        cls.restaurant = Restaurant.objects.create(name="Ресторан", address="Адрес", phone="1")
+        cls.soup = MenuItem.objects.create(
+            name="Борщ", price=Decimal("100"), restaurant=cls.restaurant
+        )
+        cls.dumplings = MenuItem.objects.create(
+            name="Пельмени", price=Decimal("250.50"), restaurant=cls.restaurant
+        )
+
+    def create_order(self):
+        return Order.objects.create(user=self.user, restaurant=self.restaurant)
+
+    def assertTotal(self, order, expected):
+        order.refresh_from_db(fields=["total_price"])
+        self.assertEqual(order.total_price, Decimal(expected))
+
+
+class OrderTotalTests(OrderTestCase):
+    """Стоимость заказа сдвигается на изменение позиции, без полного пересчёта."""
+
+    def test_item_changes_shift_total(self):
+        order = self.create_order()
+        item = OrderMenuItem.objects.create(order=order, menu_item=self.soup, quantity=2)
+        other = OrderMenuItem.objects.create(order=order, menu_item=self.dumplings)
+        self.assertTotal(order, "450.50")
+
+        item = OrderMenuItem.objects.get(pk=item.pk)
+        item.quantity = 3
+        with CaptureQueriesContext(connection) as queries:
+            item.save()
+        # Позиции заказа не перечитываются: только UPDATE с F()-сдвигом
+        self.assertFalse([q["sql"] for q in queries if "SUM(" in q["sql"]])
+        self.assertTotal(order, "550.50")
+
+        item.menu_item = self.dumplings
+        item.save()
+        self.assertTotal(order, "1002.00")
+
+        other.delete()
+        self.assertTotal(order, "751.50")
+
+    def test_order_save_keeps_total(self):
+        order = self.create_order()
+        OrderMenuItem.objects.create(order=order, menu_item=self.soup)
+        order.refresh_from_db()
+        order.total_price = 0
+        order.save()
+        self.assertTotal(order, "100")
+
+    def test_item_moved_to_another_order(self):
+        source, target = self.create_order(), self.create_order()
+        OrderMenuItem.objects.create(order=source, menu_item=self.dumplings)
+        item = OrderMenuItem.objects.create(order=source, menu_item=self.soup, quantity=2)
+        OrderMenuItem.objects.create(order=target, menu_item=self.soup)
+
+        item = OrderMenuItem.objects.get(pk=item.pk)
+        item.order = target
+        item.quantity = 3
+        item.save()
+        self.assertTotal(source, "250.50")
+        self.assertTotal(target, "400")
+
+        item.delete()
+        self.assertTotal(target, "100")
+
+    def test_total_price_is_read_only(self):
+        serializer = OrderSerializer(
+            data={
+                "user": self.user.pk,
+                "restaurant": self.restaurant.pk,
+                "status": "new",
+                "total_price": "999.00",
+            }
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().total_price, 0)
+
+
+class MenuStatsTests(OrderTestCase):
+    """Сводка меню ресторана сдвигается при создании блюд с ценой любого числового типа."""
+
+    def test_int_and_float_prices(self):
+        MenuItem.objects.create(name="Чай", price=50, restaurant=self.restaurant)
+        MenuItem.objects.create(name="Пирог", price=300.5, restaurant=self.restaurant)
+
+        stats = RestaurantMenuStats.objects.get(restaurant=self.restaurant)
+        self.assertEqual(stats.item_count, 4)
+        self.assertEqual(stats.price_sum, Decimal("701.00"))
+        self.assertEqual((stats.min_price, stats.max_price), (Decimal("50"), Decimal("300.50")))
+
+
+class CuisinePopularityTests(OrderTestCase):
+    """Корзины объёма заказов ресторанов сдвигаются сигналами позиций."""
+
+    def volume(self):
+        return sum(RestaurantOrderVolume.objects.values_list("quantity", flat=True))
+
+    def test_item_changes_shift_buckets(self):
+        cuisine = TypeCuisine.objects.create(name="Русская")
+        RestaurantCuisine.objects.create(restaurant=self.restaurant, cuisine_type=cuisine)
+        order = self.create_order()
+        item = OrderMenuItem.objects.create(order=order, menu_item=self.soup, quantity=2)
+        OrderMenuItem.objects.create(order=order, menu_item=self.dumplings, quantity=1)
+        self.assertEqual(self.volume(), 3)
+
+        item.quantity = 5
+        item.save()
+        self.assertEqual(self.volume(), 6)
+
+        other_restaurant = Restaurant.objects.create(name="Другой", address="Адрес", phone="2")
+        item.order = Order.objects.create(user=self.user, restaurant=other_restaurant)
+        item.save()
+        self.assertEqual(
+            dict(RestaurantOrderVolume.objects.values_list("restaurant_id", "quantity")),
+            {self.restaurant.pk: 1, other_restaurant.pk: 5},
+        )
+
+        item.delete()
+        self.assertEqual(self.volume(), 1)
+
+        self.assertEqual(cuisine_popularity.rollup_cuisine_popularity().updated_links, 1)
+        link = RestaurantCuisine.objects.get(restaurant=self.restaurant)
+        self.assertEqual((link.popularity_24h, link.popularity, link.popularity_30d), (1, 1, 1))
+
+        RestaurantOrderVolume.objects.all().delete()
+        cuisine_popularity.rebuild_cuisine_popularity()
+        self.assertEqual(self.volume(), 1)
+
+
+class RepricingTests(OrderTestCase):
+    """Смена цены блюда переносится в незавершённые заказы одним проходом."""
+
+    def test_update_from_and_subquery_paths(self):
+        for supports_update_from in (True, False):
+            with self.subTest(update_from=supports_update_from):
+                open_order, completed = self.create_order(), self.create_order()
+                OrderMenuItem.objects.create(order=open_order, menu_item=self.soup, quantity=2)
+                OrderMenuItem.objects.create(order=open_order, menu_item=self.dumplings)
+                OrderMenuItem.objects.create(order=completed, menu_item=self.soup)
+                Order.objects.filter(pk=completed.pk).update(status="completed")
+                MenuItem.objects.filter(pk=self.soup.pk).update(price=Decimal("120"))
+
+                with mock.patch.object(
+                    repricing, "_supports_update_from", return_value=supports_update_from
+                ):
+                    repricing.reprice_orders_for_menu_items([self.soup.pk], chunk_size=1)
+
+                self.assertTotal(open_order, "490.50")
+                self.assertTotal(completed, "100")
+                MenuItem.objects.filter(pk=self.soup.pk).update(price=Decimal("100"))
+
+
+class BulkOrderTests(OrderTestCase):
+    """Пакетная загрузка создаёт валидные заказы и возвращает ошибки остальных."""
+
+    def payload(self, **overrides):
+        payload = {
+            "user": self.user.pk,
+            "restaurant": self.restaurant.pk,
+            "items": [
+                {"menu_item": self.soup.pk, "quantity": 2},
+                {"menu_item": self.dumplings.pk},
+            ],
+        }
+        payload.update(overrides)
+        return payload
+
+    def test_partial_failures(self):
+        other = Restaurant.objects.create(name="Другой", address="Адрес", phone="2")
+        foreign = MenuItem.objects.create(name="Суп", price=Decimal("50"), restaurant=other)
+        payloads = [
+            self.payload(),
+            self.payload(user=0),
+            self.payload(items=[{"menu_item": foreign.pk}]),
+            "не заказ",
+            self.payload(status="preparing", items=[{"menu_item": self.soup.pk}]),
+        ]
+
+        results = ingest_orders(payloads)
+
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["created", "error", "error", "error", "created"],
+        )
+        self.assertIn("user", results[1]["errors"])
+        self.assertIn("items", results[2]["errors"])
+        created = Order.objects.filter(pk__in=[results[0]["id"], results[4]["id"]])
+        self.assertEqual(created.count(), 2)
+        self.assertEqual(results[0]["total_price"], Decimal("450.50"))
+        self.assertTotal(created.get(pk=results[0]["id"]), "450.50")
+        self.assertEqual(OrderMenuItem.objects.filter(order__in=created).count(), 3)
+        self.assertEqual(Order.history.filter(id__in=created.values("pk")).count(), 2)
+
+    def test_endpoint_statuses(self):
+        client = APIClient()
+        url = "/api/orders/bulk/"
+        response = client.post(url, {"orders": [self.payload()]}, format="json")
+        self.assertEqual(response.status_code, 201)
+        orders = [self.payload(), self.payload(user=0)]
+        response = client.post(url, {"orders": orders}, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 1))
+        response = client.post(url, {"orders": [self.payload(user=0)]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        response = client.post(url, {"orders": []}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class MenuImportTests(OrderTestCase):
+    """Импорт меню сверяет строки с меню по названию и сообщает ошибки по строкам."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def upload(self, name, content):
+        return self.client.post(
+            "/api/menu-items/import/",
+            {"file": SimpleUploadedFile(name, content), "restaurant_id": self.restaurant.pk},
+            format="multipart",
+        )
+
+    def menu(self):
+        return dict(
+            MenuItem.objects.filter(restaurant=self.restaurant).values_list("name", "price")
+        )
+
+    def test_csv_with_russian_headers(self):
+        history = MenuItem.history.count()
+        content = (
+            "Название;Цена;Описание;Доступно\n"
+            "Борщ;120;;\n"
+            "Пельмени;250.50;;\n"
+            ";;;\n"
+            "Чай;50;Чёрный;да\n"
+            "Квас;-5;;\n"
+            "борщ;130;;\n"
+        )
+        response = self.upload("menu.csv", content.encode("utf-8-sig"))
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            (response.data["created"], response.data["updated"], response.data["unchanged"]),
+            (1, 1, 1),
+        )
+        self.assertEqual([error["row"] for error in response.data["errors"]], [6, 7])
+        self.assertIn("price", response.data["errors"][0]["errors"])
+        self.assertEqual(response.data["errors"][1]["errors"]["name"], ["Повтор строки 2."])
+        self.assertEqual(
+            self.menu(),
+            {"Борщ": Decimal("120"), "Пельмени": Decimal("250.50"), "Чай": Decimal("50")},
+        )
+        self.assertEqual(MenuItem.history.count(), history + 2)
+        latest = MenuItem.history.order_by("-history_id")[:2]
+        self.assertEqual(
+            sorted(latest.values_list("name", "history_type")), [("Борщ", "~"), ("Чай", "+")]
+        )
+
+    def test_xlsx(self):
+        history = MenuItem.history.count()
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["name", "price", "is_available"])
+        sheet.append(["Борщ", 100, None])
+        sheet.append(["Пельмени", 300, "Не доступно"])
+        sheet.append([None, None, None])
+        sheet.append(["Компот", 80, None])
+        sheet.append(["Морс", "дорого", None])
+        content = io.BytesIO()
+        workbook.save(content)
+
+        response = self.upload("menu.xlsx", content.getvalue())
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            (response.data["created"], response.data["updated"], response.data["unchanged"]),
+            (1, 1, 1),
+        )
+        self.assertEqual([error["row"] for error in response.data["errors"]], [6])
+        self.assertFalse(MenuItem.objects.get(name="Пельмени").is_available)
+        self.assertEqual(self.menu()["Компот"], Decimal("80"))
+        self.assertEqual(MenuItem.history.count(), history + 2)
+
+    def test_status_codes(self):
+        response = self.upload("menu.csv", "name,price\nБорщ,0\n,5\n".encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["failed"], 2)
+
+        response = self.upload("menu.csv", "name,price\nБорщ,100\nСырники,90\n".encode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["unchanged"]), (1, 1))
+
+        response = self.upload("menu.csv", "name,description\nБорщ,Суп\n".encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.data)
+
+
+class MenuAvailabilityTests(OrderTestCase):
+    """Массовое переключение доступности блюд по id и по фильтрам."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, payload):
+        return self.client.post("/api/menu-items/availability/", payload, format="json")
+
+    def available_count(self, restaurant):
+        return RestaurantMenuStats.objects.get(restaurant=restaurant).available_count
+
+    def test_ids(self):
+        MenuItem.objects.filter(pk=self.dumplings.pk).update(is_available=False)
+        RestaurantMenuStats.objects.filter(restaurant=self.restaurant).update(available_count=1)
+
+        response = self.post(
+            {"is_available": False, "ids": [self.soup.pk, self.dumplings.pk, 10**6]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated_ids"], [self.soup.pk])
+        self.assertEqual(response.data["skipped_ids"], [self.dumplings.pk, 10**6])
+        self.assertEqual(response.data["restaurant_ids"], [self.restaurant.pk])
+        self.assertFalse(MenuItem.objects.get(pk=self.soup.pk).is_available)
+        self.assertEqual(self.available_count(self.restaurant), 0)
+        self.assertEqual(MenuItem.history.filter(id=self.soup.pk, is_available=False).count(), 1)
+
+    def test_filters(self):
+        other = Restaurant.objects.create(name="Другой", address="Адрес", phone="2")
+        other_soup = MenuItem.objects.create(name="Борщ", price=Decimal("90"), restaurant=other)
+
+        response = self.post(
+            {"is_available": False, "filters": {"restaurant": self.restaurant.pk, "name": "Борщ"}}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated_ids"], [self.soup.pk])
+        self.assertTrue(MenuItem.objects.get(pk=other_soup.pk).is_available)
+        self.assertEqual(self.available_count(self.restaurant), 1)
+        self.assertEqual(self.available_count(other), 1)
+
+        response = self.post({"is_available": True, "filters": {"name": "Борщ"}})
+        self.assertEqual(response.data["updated_ids"], [self.soup.pk])
+        self.assertEqual(self.available_count(self.restaurant), 2)
+
+    def test_invalid_payloads(self):
+        for payload in (
+            {"is_available": "да", "ids": [self.soup.pk]},
+            {"is_available": False, "ids": str(self.soup.pk)},
+            {"is_available": False, "ids": ["борщ"]},
+            {"is_available": False, "filters": "борщ"},
+            {"is_available": False, "filters": {"restaurant": "первый"}},
+            {"is_available": False, "filters": {}},
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(payload).status_code, 400)
+        self.assertTrue(MenuItem.objects.get(pk=self.soup.pk).is_available)
+
+
+class KeysetPaginationTests(OrderTestCase):
+    """Курсор проходит заказы вперёд и назад без пропусков при равных ключах."""
+
+    def setUp(self):
+        self.client = APIClient()
+        base = timezone.now().replace(microsecond=0)
+        self.ids = []
+        # Пары заказов с одинаковой датой: порядок внутри пары — по id
+        for minutes in (30, 10, 20, 10, 30, 0, 20):
+            order = self.create_order()
+            Order.objects.filter(pk=order.pk).update(order_date=base + timedelta(minutes=minutes))
+            self.ids.append(order.pk)
+        self.expected = list(
+            Order.objects.order_by("order_date", "pk").values_list("pk", flat=True)
+        )
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row["id"] for row in response.data["results"]])
+            url = response.data[link]
+        return pages
+
+    def test_next_and_previous(self):
+        forward = self.walk("/api/orders/?cursor=&page_size=3", "next")
+        self.assertEqual([len(page) for page in forward], [3, 3, 1])
+        self.assertEqual(sum(forward, []), self.expected)
+
+        last = self.client.get("/api/orders/?cursor=&page_size=3")
+        for _ in range(2):
+            last = self.client.get(last.data["next"])
+        backward = self.walk(last.data["previous"], "previous")
+        self.assertEqual(sum(reversed(backward), []), self.expected[:6])
+
+    def test_descending_ordering(self):
+        forward = self.walk("/api/orders/?cursor=&page_size=2&ordering=-order_date", "next")
+        expected = list(Order.objects.order_by("-order_date", "-pk").values_list("pk", flat=True))
+        self.assertEqual(sum(forward, []), expected)
+
+    def test_invalid_cursors(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for cursor in (
+            "не-курсор",
+            encode({"v": ["вчера", 1]}),
+            encode({"v": [timezone.now().isoformat(), "x"]}),
+            encode({"v": [timezone.now().isoformat()]}),
+            encode({"v": [None, 1]}),
+            encode(["v"]),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/api/orders/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_expression_ordering_rejected(self):
+        request = Request(RequestFactory().get("/api/orders/", {"cursor": ""}))
+        queryset = Order.objects.order_by(F("order_date").desc())
+        with self.assertRaises(ValidationError):
+            KeysetPagination().paginate_queryset(queryset, request)
+
+    def test_to_many_ordering_rejected(self):
+        request = Request(RequestFactory().get("/api/restaurants/", {"cursor": ""}))
+        queryset = Restaurant.objects.order_by("-restaurant_cuisines__popularity")
+        with self.assertRaises(ValidationError):
+            KeysetPagination().paginate_queryset(queryset, request)
+
+    def test_cuisine_popularity_cursor_is_bad_request(self):
+        cuisine = TypeCuisine.objects.create(name="Итальянская")
+        RestaurantCuisine.objects.create(restaurant=self.restaurant, cuisine_type=cuisine)
+        response = self.client.get(
+            "/api/restaurants/by-cuisine-type/",
+            {"cuisine_type": "Итал", "cursor": "", "page_size": 1},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderStatusTransitionTests(OrderTestCase):
+    """Массовая смена статуса соблюдает разрешённые переходы и идёт пачками."""
+
+    def create_orders(self, *statuses):
+        orders = []
+        for status in statuses:
+            order = self.create_order()
+            Order.objects.filter(pk=order.pk).update(status=status, is_overdue=True)
+            orders.append(order.pk)
+        return orders
+
+    def statuses(self, order_ids):
+        orders = Order.objects.filter(pk__in=order_ids).order_by("pk")
+        return list(orders.values_list("status", flat=True))
+
+    def test_transition_order_ids(self):
+        order_ids = self.create_orders("new", "preparing", "completed", "delivering", "new")
+        result = transition_order_ids([*order_ids, 0], "delivering", chunk_size=2)
+
+        self.assertEqual(result.updated_ids, [order_ids[0], order_ids[1], order_ids[4]])
+        self.assertEqual(result.skipped_ids, [0, order_ids[2], order_ids[3]])
+        self.assertEqual(
+            self.statuses(order_ids),
+            ["delivering", "delivering", "completed", "delivering", "delivering"],
+        )
+        self.assertEqual(Order.history.filter(status="delivering").count(), 3)
+
+    def test_transition_matching_orders(self):
+        order_ids = self.create_orders("new", "completed", "delivering", "preparing", "new")
+        result = transition_matching_orders(
+            Order.objects.filter(pk__in=order_ids), "completed", chunk_size=2
+        )
+
+        self.assertEqual(result.updated_ids, [order_ids[0], *order_ids[2:]])
+        self.assertEqual(self.statuses(order_ids), ["completed"] * 5)
+        # Завершённые заказы больше не считаются просроченными
+        self.assertFalse(Order.objects.filter(pk__in=result.updated_ids, is_overdue=True).exists())
+        self.assertTrue(Order.objects.get(pk=order_ids[1]).is_overdue)
+
+
+class DispatchSolverTests(SimpleTestCase):
+    """Решатель назначения совпадает с полным перебором на малых матрицах."""
+
+    def brute_force(self, cost):
+        """(число допустимых пар, сумма) лучшего назначения полным перебором."""
+        rows, cols = cost.shape
+        if rows <= cols:
+            perms = itertools.permutations(range(cols), rows)
+            pairs = (list(zip(range(rows), perm)) for perm in perms)
+        else:
+            perms = itertools.permutations(range(rows), cols)
+            pairs = (list(zip(perm, range(cols))) for perm in perms)
+        best = None
+        for assignment in pairs:
+            finite = [cost[row, col] for row, col in assignment if np.isfinite(cost[row, col])]
+            key = (-len(finite), sum(finite))
+            if best is None or key < best:
+                best = key
+        return -best[0], best[1]
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for case in range(300):
+            rows, cols = rng.integers(1, 6, size=2)
+            cost = rng.integers(1, 50, size=(rows, cols)).astype(float)
+            cost[rng.random((rows, cols)) < 0.3] = np.inf
+            with self.subTest(case=case, cost=cost.tolist()):
+                row_index, col_index = dispatch.solve_assignment(cost)
+                self.assertEqual(len(set(row_index)), len(row_index))
+                self.assertEqual(len(set(col_index)), len(col_index))
+                self.assertTrue(np.isfinite(cost[row_index, col_index]).all())
+                count, total = self.brute_force(cost)
+                self.assertEqual(len(row_index), count)
+                self.assertAlmostEqual(cost[row_index, col_index].sum(), total)
+
+    def test_empty_and_forbidden(self):
+        for cost in (np.empty((0, 3)), np.full((2, 2), np.inf)):
+            row_index, col_index = dispatch.solve_assignment(cost)
+            self.assertEqual((len(row_index), len(col_index)), (0, 0))
+
+    def test_simulation_is_deterministic(self):
+        def run(seed):
+            ticks = dispatch.simulate(couriers=30, orders_per_tick=25, ticks=4, seed=seed)
+            return [tick._replace(solve_ms=0) for tick in ticks]
+
+        first = run(seed=7)
+        self.assertEqual(first, run(seed=7))
+        self.assertNotEqual(first, run(seed=8))
+        self.assertEqual([tick.tick for tick in first], [0, 1, 2, 3])
+        for tick in first:
+            self.assertLessEqual(tick.assigned, min(tick.pending_orders, tick.free_couriers))
+
+
+class CourierLocationTests(TestCase):
+    """Отметки GPS прореживаются, пишутся пачкой и не затирают свежее положение."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username="courier", phone="+79990000001")
+        cls.courier = Courier.objects.create(user=user, vehicle_type="bike")
+        cls.now = timezone.now().replace(microsecond=0)
+
+    def setUp(self):
+        self.buffer = courier_locations.LocationBuffer(size=100)
+        self.flusher = courier_locations.LocationFlusher(self.buffer)
+
+    def ping(self, seconds, latitude=55.75, courier_id=None):
+        return courier_locations.Ping(
+            courier_id or self.courier.pk, latitude, 37.62, self.now + timedelta(seconds=seconds)
+        )
+
+    def test_downsample(self):
+        track = [self.ping(seconds) for seconds in (16, 0, 5, 10, 30, 31)]
+        kept = courier_locations.downsample(track, sample_seconds=15)
+        self.assertEqual(kept, [self.ping(0), self.ping(16), self.ping(31)])
+        kept = courier_locations.downsample(track, self.ping(10).recorded_at, sample_seconds=15)
+        self.assertEqual(kept, [self.ping(30)])
+
+    def test_flush_writes_track_and_position(self):
+        self.buffer.add([self.ping(seconds, 55 + seconds / 100) for seconds in (0, 5, 20, 22)])
+        self.buffer.add([self.ping(0, courier_id=10**6)])
+
+        result = self.flusher.flush()
+
+        self.assertEqual(result, courier_locations.FlushResult(couriers=1, points=2, dropped=1))
+        self.assertEqual(CourierLocation.objects.filter(courier=self.courier).count(), 2)
+        courier = Courier.objects.get(pk=self.courier.pk)
+        self.assertEqual(courier.latitude, 55.22)
+        self.assertEqual(courier.location_updated_at, self.ping(22).recorded_at)
+        # Записанная отметка больше не держится в буфере процесса
+        self.assertEqual(self.buffer.latest, {})
+        self.assertEqual(self.flusher.flush(), courier_locations.FlushResult(0, 0, 0))
+
+    def test_older_ping_does_not_overwrite_position(self):
+        Courier.objects.filter(pk=self.courier.pk).update(
+            latitude=1.0, longitude=2.0, location_updated_at=self.ping(60).recorded_at
+        )
+        self.buffer.add([self.ping(30, latitude=55.0)])
+        self.flusher.flush()
+        courier = Courier.objects.get(pk=self.courier.pk)
+        self.assertEqual(courier.latitude, 1.0)
+        self.assertEqual(courier.location_updated_at, self.ping(60).recorded_at)
+
+    def test_latest_position_prefers_newer(self):
+        buffer = courier_locations._buffer
+        self.addCleanup(buffer.forget, [self.courier.pk])
+        self.addCleanup(buffer.take)
+        Courier.objects.filter(pk=self.courier.pk).update(
+            latitude=1.0, longitude=2.0, location_updated_at=self.ping(60).recorded_at
+        )
+        courier = Courier.objects.get(pk=self.courier.pk)
+
+        buffer.add([self.ping(30, latitude=55.0)])
+        self.assertEqual(courier_locations.latest_position(courier).latitude, 1.0)
+        buffer.add([self.ping(90, latitude=56.0)])
+        self.assertEqual(courier_locations.latest_position(courier).latitude, 56.0)
+
+
+class AutocompleteIndexTests(TestCase):
+    """Версия индекса подсказок сдвигается только при смене индексируемых полей."""
+
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Пышечная", address="A", phone="+7000")
+        # Индекс, собранный другими тестами, мог отстать от общей версии
+        autocomplete._index.index = None
+        autocomplete.get_index()
+
+    def save(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+        return autocomplete._index.shared_version()
+
+    def test_unchanged_name_keeps_version(self):
+        restaurant = Restaurant.objects.get(pk=self.restaurant.pk)
+        version = autocomplete._index.shared_version()
+
+        restaurant.phone = "+7111"
+        self.assertEqual(self.save(restaurant), version)
+
+        restaurant.name = "Чебуречная"
+        self.assertEqual(self.save(restaurant), version + 1)
+        self.assertEqual(autocomplete._index.version, version + 1)
+        self.assertEqual(
+            autocomplete.autocomplete("чебу")[autocomplete.RESTAURANTS],
+            [{"id": restaurant.pk, "name": "Чебуречная"}],
+        )
+
+    def test_availability_change_bumps_version(self):
+        item = MenuItem.objects.create(
+            name="Пышка", price=Decimal("30"), restaurant=self.restaurant
+        )
+        item = MenuItem.objects.get(pk=item.pk)
+        version = autocomplete._index.shared_version()
+
+        item.is_available = False
+        self.assertEqual(self.save(item), version + 1)
+        self.assertEqual(autocomplete.autocomplete("пыш")[autocomplete.DISHES], [])
+
+
+class GeoTests(TestCase):
+    """Геокодирование и версия сетки реагируют только на смену адреса и координат."""
+
+    def test_partial_save_skips_geocoding(self):
+        user = User.objects.create(username="client", phone="+7999")
+        User.objects.filter(pk=user.pk).update(address="Тверская, 1")
+        user = User.objects.get(pk=user.pk)
+
+        user.save(update_fields=["last_login"])
+        self.assertEqual(User.objects.get(pk=user.pk).latitude, None)
+
+        user.address = "Арбат, 2"
+        user.save(update_fields=["address"])
+        stored = User.objects.get(pk=user.pk)
+        self.assertEqual((stored.latitude, stored.longitude), geo.stub_geocoder("Арбат, 2"))
+
+    def test_version_bumps_only_on_coordinate_change(self):
+        restaurant = Restaurant.objects.create(name="R", address="Тверская, 1", phone="+7000")
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        version = geo._index.shared_version()
+
+        restaurant.phone = "+7111"
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant.save()
+        self.assertEqual(geo._index.shared_version(), version)
+
+        restaurant.address = "Арбат, 2"
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant.save()
+        self.assertEqual(geo._index.shared_version(), version + 1)
+
+
+@override_settings(TEST_INDEX_REFRESH_SECONDS=0)
+class VersionedIndexTests(SimpleTestCase):
+    """Устаревший индекс перестраивается в фоне, запросы получают прежний."""
+
+    def test_stale_index_served_while_rebuilding(self):
+        release = threading.Event()
+        builds = []
+
+        def build():
+            if builds:
+                release.wait(5)
+            builds.append(len(builds))
+            return len(builds)
+
+        with mock.patch("Delivery.services.versioned_index._registry", []):
+            index = VersionedIndex(
+                "test",
+                "test-index:version",
+                build,
+                cache_alias_setting="TEST_CACHE_ALIAS",
+                refresh_setting="TEST_INDEX_REFRESH_SECONDS",
+            )
+        self.addCleanup(index.cache().delete, "test-index:version")
+        self.assertEqual(index.get(), 1)
+
+        index.invalidate()
+        self.assertEqual(index.get(), 1)
+        release.set()
+        for _ in range(100):
+            if index.get() == 2:
+                break
+            threading.Event().wait(0.05)
+        self.assertEqual(index.get(), 2)
+        self.assertEqual(index.version, index.shared_version())
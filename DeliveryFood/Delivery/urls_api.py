@@ -10,6 +10,7 @@ from .views.user_views import UserViewSet
 from .views.restaurant_views import RestaurantViewSet, MenuItemViewSet
 from .views.order_views import OrderViewSet, OrderMenuItemViewSet
 from .views.courier_views import CourierViewSet, DeliveryViewSet
+from .views.search_views import AutocompleteViewSet
 
 router = DefaultRouter()
 router.register("users", UserViewSet, basename="user")
@@ -20,6 +21,7 @@ router.register("auth", AuthViewSet, basename="auth")
 router.register("courier", CourierViewSet, basename="courier")
 router.register("delivery", DeliveryViewSet, basename="delivery")
 router.register("order-menu-items", OrderMenuItemViewSet, basename="order-menu-items")
+router.register("autocomplete", AutocompleteViewSet, basename="autocomplete")
 
 
 urlpatterns = [
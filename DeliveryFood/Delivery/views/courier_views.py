@@ -1,25 +1,16 @@
 from rest_framework import viewsets, permissions, filters, status as status_code
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Q, Manager
 from rest_framework.decorators import action
 from ..models import Courier, Delivery
+from ..pagination import StandardResultsSetPagination
 from ..serializers.courier_serializers import CourierSerializer, DeliverySerializer
-
-
-class StandardResultsSetPagination(PageNumberPagination):
-    """
-    Кастомная пагинация для стандартного набора результатов.
-    """
-
-    page_size = 10  # Количество элементов на странице по умолчанию
-    page_size_query_param = (
-        "page_size"  # Параметр для задания размера страницы через запрос
-    )
-    max_page_size = 100  # Максимальное количество элементов на странице
+from ..services import courier_locations, courier_stats
 
 
 class CourierViewSet(viewsets.ModelViewSet):
@@ -99,18 +90,94 @@ class CourierViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @swagger_auto_schema(
+        operation_summary="Пакетная передача отметок GPS курьеров",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "pings": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                    description="Отметки: courier, latitude, longitude, recorded_at (ISO 8601)",
+                )
+            },
+        ),
+        responses={
+            202: openapi.Response("Отметки приняты (ошибочные перечислены в errors)"),
+            400: openapi.Response("Ни одна отметка не принята"),
+        },
+    )
+    @action(methods=["POST"], detail=False, url_path="locations")
+    def ingest_locations(self, request):
+        """
+        Принимает пачку отметок GPS. Отметки только проверяются и кладутся в
+        буфер процесса, в базу их пачками пишет фоновый поток.
+        """
+        payloads = request.data.get("pings") if isinstance(request.data, dict) else request.data
+        if not isinstance(payloads, list) or not payloads:
+            return Response(
+                {"error": "Параметр 'pings' должен быть непустым списком."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        max_size = getattr(settings, "COURIER_LOCATION_MAX_BATCH", 1000)
+        if len(payloads) > max_size:
+            return Response(
+                {"error": f"За один запрос можно передать не более {max_size} отметок."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        pings, errors = courier_locations.parse_pings(payloads)
+        if not pings:
+            return Response(
+                {"accepted": 0, "errors": errors}, status=status_code.HTTP_400_BAD_REQUEST
+            )
+        courier_locations.ingest(pings)
+        return Response(
+            {"accepted": len(pings), "errors": errors}, status=status_code.HTTP_202_ACCEPTED
+        )
+
+    @swagger_auto_schema(operation_summary="Последнее положение курьера")
+    @action(methods=["GET"], detail=True, url_path="location")
+    def location(self, request, pk=None):
+        """
+        Последнее положение курьера: отметка из буфера процесса, если она
+        новее записанного в базу положения, иначе положение из базы.
+        """
+        ping = courier_locations.latest_position(self.get_object())
+        return Response(
+            {
+                "courier": ping.courier_id,
+                "latitude": ping.latitude,
+                "longitude": ping.longitude,
+                "recorded_at": ping.recorded_at,
+            }
+        )
+
     @swagger_auto_schema(
         operation_summary="Получить количество активных курьеров",
         responses={
             200: openapi.Response(
-                description="Количество активных курьеров",
+                description="Активные курьеры по типам транспорта, занятые и свободные",
                 schema=openapi.Schema(
                     type=openapi.TYPE_OBJECT,
                     properties={
-                        "active_couriers_count": openapi.Schema(
+                        "total_active": openapi.Schema(
                             type=openapi.TYPE_INTEGER,
                             description="Количество активных курьеров",
-                        )
+                        ),
+                        "busy": openapi.Schema(
+                            type=openapi.TYPE_INTEGER,
+                            description="Курьеры с доставкой в процессе",
+                        ),
+                        "free": openapi.Schema(
+                            type=openapi.TYPE_INTEGER,
+                            description="Курьеры без доставки в процессе",
+                        ),
+                        "by_vehicle": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            description="По типам транспорта: active, busy, free",
+                        ),
                     },
                 ),
             )
@@ -119,14 +186,16 @@ class CourierViewSet(viewsets.ModelViewSet):
     @action(methods=["GET"], detail=False, url_path="active-couriers-stats")
     def get_active_couriers_stats(self, request):
         """
-        Возвращает статистику активных курьеров по типу транспорта.
+        Возвращает статистику активных курьеров по типу транспорта, а также
+        занятых и свободных курьеров. Считается одним сгруппированным запросом
+        по денормализованным полям курьера.
         """
-        vehicle_stats = {
-            vehicle: Courier.objects.filter(vehicle_type=vehicle, user__is_active=True).count()
-            for vehicle, _ in Courier.VEHICLE_CHOICES
-        }
-        total_active = sum(vehicle_stats.values())
-        vehicle_stats["total_active"] = total_active
+        by_vehicle = courier_stats.vehicle_stats()
+        vehicle_stats = {vehicle: stats["active"] for vehicle, stats in by_vehicle.items()}
+        vehicle_stats["total_active"] = sum(stats["active"] for stats in by_vehicle.values())
+        vehicle_stats["busy"] = sum(stats["busy"] for stats in by_vehicle.values())
+        vehicle_stats["free"] = sum(stats["free"] for stats in by_vehicle.values())
+        vehicle_stats["by_vehicle"] = by_vehicle
         return Response(vehicle_stats, status=status_code.HTTP_200_OK)
 
 
@@ -222,7 +291,13 @@ class DeliveryViewSet(viewsets.ModelViewSet):
         if not deliveries_query.exists():
             return Response({"error": "Нет доставок для изменения."}, status=status_code.HTTP_404_NOT_FOUND)
 
-        deliveries_query.update(delivery_status=delivery_status)
+        with transaction.atomic():
+            courier_ids = list(
+                deliveries_query.order_by().values_list("courier_id", flat=True).distinct()
+            )
+            deliveries_query.update(delivery_status=delivery_status)
+            # UPDATE идёт в обход сигналов: счётчики доставок курьеров пересчитываются
+            courier_stats.recount_active_deliveries(courier_ids)
 
         serializer = self.get_serializer(deliveries_query, many=True)
         return Response(serializer.data)
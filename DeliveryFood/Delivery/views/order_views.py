@@ -2,15 +2,19 @@ from datetime import timedelta
 
 from rest_framework import viewsets, permissions, filters, status as status_code
 from rest_framework.generics import get_object_or_404
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from django.conf import settings
 from django.utils import timezone
 from django.db.models import Q
 from rest_framework.decorators import action
 from ..models import Order, OrderMenuItem
+from ..pagination import StandardResultsSetPagination
 from ..serializers.order_serializers import OrderSerializer, OrderMenuItemSerializer
+from ..services.bulk_orders import ingest_orders
+from ..services.exports import EXPORT_FORMATS, ORDER_EXPORT, export_response
+from ..services.order_status import transition_matching_orders, transition_order_ids
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
 from django_filters import CharFilter, NumberFilter
 
@@ -26,17 +30,6 @@ class OrderFilter(FilterSet):
         fields = ["restaurant_name", "min_price", "max_price"]
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """
-    Кастомная пагинация для стандартного набора результатов.
-    """
-
-    page_size = 10  # Количество элементов на странице по умолчанию
-    page_size_query_param = (
-        "page_size"  # Параметр для задания размера страницы через запрос
-    )
-    max_page_size = 100  # Максимальное количество элементов на странице
-
 
 class OrderViewSet(viewsets.ModelViewSet):
     """
@@ -85,6 +78,12 @@ class OrderViewSet(viewsets.ModelViewSet):
                 type=openapi.TYPE_INTEGER,
                 description="Размер страницы",
             ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Курсор для пагинации по ключу (пустой — первая страница)",
+            ),
             openapi.Parameter(
                 "ordering",
                 openapi.IN_QUERY,
@@ -236,13 +235,9 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     # Функция для выборки заказов по условиям
     def get_orders_for_status_or_time(self):
-        one_hour_ago = timezone.now() - timedelta(hours=1)
-
-        # Используем Q для фильтрации
-        orders = self.queryset.filter(
-            Q(status="preparing")
-            | (Q(order_date__lt=one_hour_ago) & ~Q(status="completed"))
-        )
+        # Флаг is_overdue поддерживается фоновой задачей sweep_overdue_orders_task,
+        # поэтому запрос читает индексы, а не сканирует даты заказов
+        orders = self.queryset.filter(Q(status="preparing") | Q(is_overdue=True))
         return orders
 
     @swagger_auto_schema(
@@ -265,38 +260,55 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         # Функция для изменения статуса заказов
 
-    def change_status_for_orders(self, status_new):
-        one_hour_ago = timezone.now() - timedelta(hours=1)
-
-        # Выбираем все заказы, где прошло больше 1 часа и статус не 'completed'
-        orders = self.queryset.filter(
-            Q(order_date__lt=one_hour_ago) & ~Q(status="completed")
-        )
-
-        # Изменяем статус для выбранных заказов
-        orders.update(status=status_new)
-        return orders
+    def change_status_for_orders(self, status_new, filters=None, user=None):
+        """
+        Переводит в status_new заказы, подходящие под фильтры, пачками.
+        Без older_than_minutes берутся просроченные заказы (флаг is_overdue).
+        """
+        filters = filters or {}
+        if "older_than_minutes" in filters:
+            older_than = int(filters["older_than_minutes"])
+            orders = self.queryset.filter(
+                order_date__lt=timezone.now() - timedelta(minutes=older_than)
+            )
+        else:
+            orders = self.queryset.filter(is_overdue=True)
+        if filters.get("status"):
+            orders = orders.filter(status=filters["status"])
+        if filters.get("restaurant"):
+            orders = orders.filter(restaurant_id=filters["restaurant"])
+        return transition_matching_orders(orders, status_new, user=user)
 
     @swagger_auto_schema(
-        operation_summary="Изменить статус для заказов старше 1 часа",
+        operation_summary="Массово изменить статус заказов",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
                 "status": openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description="Новый статус для заказов ('delivered')",
-                )
+                    description="Новый статус ('preparing', 'delivering', 'completed')",
+                ),
+                "ids": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                    description="ID заказов (если не заданы, применяются фильтры)",
+                ),
+                "filters": openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    description="status, restaurant, older_than_minutes (по умолчанию — просроченные)",
+                ),
             },
         ),
         responses={
-            200: OrderSerializer(many=True),
+            200: openapi.Response("ID и количество изменённых заказов"),
             400: openapi.Response("Ошибка валидации данных"),
         },
     )
     @action(methods=["POST"], detail=False, url_path="change-status")
     def change_status(self, request):
         """
-        Меняет статус заказов старше 1 часа на новый.
+        Меняет статус заказов из списка ids или подходящих под фильтры
+        (по умолчанию — просроченные) с учётом разрешённых переходов.
         """
         status_new = request.data.get("status")
         if not status_new:
@@ -306,18 +318,149 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
 
         # Проверка, что статус валиден
-        valid_statuses = ["delivered", "cancelled", "preparing", "new"]
+        valid_statuses = [choice[0] for choice in Order.STATUS_CHOICES]
         if status_new not in valid_statuses:
             return Response(
                 {"error": "Неверный статус."}, status=status_code.HTTP_400_BAD_REQUEST
             )
 
-        # Меняем статус заказов
-        orders = self.change_status_for_orders(status_new)
+        ids = request.data.get("ids")
+        filters = request.data.get("filters") or {}
+        user = request.user if request.user.is_authenticated else None
+        try:
+            if ids is not None:
+                if not isinstance(ids, list):
+                    raise ValueError
+                result = transition_order_ids([int(pk) for pk in ids], status_new, user=user)
+            else:
+                if not isinstance(filters, dict):
+                    raise ValueError
+                result = self.change_status_for_orders(status_new, filters, user=user)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Параметры 'ids' и 'filters' заданы неверно."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
 
-        # Сериализуем измененные заказы
-        serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
+        return Response(
+            {
+                "status": status_new,
+                "updated_count": len(result.updated_ids),
+                "updated_ids": result.updated_ids,
+                "skipped_count": len(result.skipped_ids),
+                "skipped_ids": result.skipped_ids,
+            }
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Пакетная загрузка заказов с позициями",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "orders": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                    description="Заказы: user, restaurant, status, items [{menu_item, quantity}]",
+                )
+            },
+        ),
+        responses={
+            201: openapi.Response("Все заказы созданы"),
+            207: openapi.Response("Часть заказов не прошла валидацию"),
+            400: openapi.Response("Ни один заказ не создан"),
+        },
+    )
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk_create_orders(self, request):
+        """
+        Создаёт сотни заказов с позициями за один запрос и одну транзакцию.
+        Возвращает результат по каждому заказу, включая ошибки валидации.
+        """
+        payloads = request.data.get("orders") if isinstance(request.data, dict) else request.data
+        if not isinstance(payloads, list) or not payloads:
+            return Response(
+                {"error": "Параметр 'orders' должен быть непустым списком."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        max_size = getattr(settings, "BULK_ORDERS_MAX_SIZE", 500)
+        if len(payloads) > max_size:
+            return Response(
+                {"error": f"За один запрос можно загрузить не более {max_size} заказов."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        user = request.user if request.user.is_authenticated else None
+        results = ingest_orders(payloads, user=user)
+        created = sum(1 for result in results if result["status"] == "created")
+        failed = len(results) - created
+
+        if not created:
+            response_status = status_code.HTTP_400_BAD_REQUEST
+        elif failed:
+            response_status = status_code.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status_code.HTTP_201_CREATED
+        return Response(
+            {"created": created, "failed": failed, "results": results},
+            status=response_status,
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Потоковая выгрузка заказов в CSV, NDJSON или XLSX",
+        manual_parameters=[
+            openapi.Parameter(
+                "file_format",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=EXPORT_FORMATS,
+                description="Формат файла (по умолчанию csv)",
+            ),
+            openapi.Parameter(
+                "status",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Статус заказов",
+            ),
+            openapi.Parameter(
+                "restaurant_id",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="ID ресторана",
+            ),
+        ],
+    )
+    @action(methods=["GET"], detail=False, url_path="export")
+    def export_orders(self, request):
+        """
+        Выгружает заказы построчно, не загружая таблицу в память целиком.
+        Колонки и подписи статусов совпадают с CompletedOrderResource.
+        """
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Допустимые форматы: {', '.join(EXPORT_FORMATS)}."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        orders = Order.objects.all()
+        status_filter = request.query_params.get("status")
+        if status_filter:
+            if status_filter not in dict(Order.STATUS_CHOICES):
+                return Response(
+                    {"error": "Неверный статус."}, status=status_code.HTTP_400_BAD_REQUEST
+                )
+            orders = orders.filter(status=status_filter)
+        restaurant_id = request.query_params.get("restaurant_id")
+        if restaurant_id:
+            try:
+                orders = orders.filter(restaurant_id=int(restaurant_id))
+            except ValueError:
+                return Response(
+                    {"error": "Параметр 'restaurant_id' должен быть числом."},
+                    status=status_code.HTTP_400_BAD_REQUEST,
+                )
+        return export_response(ORDER_EXPORT, orders, file_format)
 
 
 class OrderMenuItemViewSet(viewsets.ModelViewSet):
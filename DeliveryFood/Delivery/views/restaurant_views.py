@@ -1,36 +1,40 @@
 from datetime import timedelta
 
-from rest_framework import viewsets, permissions, filters, status as status_code
-from rest_framework.pagination import PageNumberPagination
+from rest_framework import viewsets, permissions, status as status_code
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Avg, Count
+from django.db.models import F, Max, Q, Sum
 from rest_framework.decorators import action
-from ..models import Restaurant, MenuItem
+from rest_framework.parsers import MultiPartParser
+from ..models import Restaurant, MenuItem, RestaurantMenuStats, TypeCuisine, User
+from ..filters import IndexedSearchFilter
+from ..pagination import StandardResultsSetPagination
+from ..services import dish_popularity, geo, search
+from ..services.cuisine_popularity import (
+    DEFAULT_WINDOW as DEFAULT_POPULARITY_WINDOW,
+    WINDOWS as POPULARITY_WINDOWS,
+)
+from ..services.exports import EXPORT_FORMATS, MENU_ITEM_EXPORT, export_response
+from ..services.menu_availability import set_availability, set_availability_for_ids
+from ..services.menu_cache import get_menu, menu_cache_stats
+from ..services.menu_import import MenuImportError, import_menu, iter_file_rows
+from ..services.menu_stats import average_price
 from ..serializers.restaurant_serializers import (
     RestaurantSerializer,
     MenuItemSerializer,
+    MenuCardItemSerializer,
 )
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """
-    Кастомная пагинация для стандартного набора результатов.
-    """
-
-    page_size = 10  # Количество элементов на странице по умолчанию
-    page_size_query_param = (
-        "page_size"  # Параметр для задания размера страницы через запрос
-    )
-    max_page_size = 100  # Максимальное количество элементов на странице
-
 class RestaurantViewSet(viewsets.ModelViewSet):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [IndexedSearchFilter]
     search_fields = ["name", "address"]
+    search_index_kind = search.RESTAURANT
     pagination_class = StandardResultsSetPagination
 
     @swagger_auto_schema(operation_summary="Получить список ресторанов")
@@ -54,12 +58,20 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                 type=openapi.TYPE_STRING,
                 description="Тип кухни",
             ),
+            openapi.Parameter(
+                "window",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=tuple(POPULARITY_WINDOWS),
+                description=f"Окно популярности (по умолчанию {DEFAULT_POPULARITY_WINDOW})",
+            ),
         ],
     )
     @action(methods=["GET"], detail=False, url_path="by-cuisine-type")
     def restaurants_by_cuisine_type(self, request):
         """
-        Возвращает рестораны, которые предлагают определённый тип кухни.
+        Возвращает рестораны, которые предлагают определённый тип кухни,
+        по убыванию популярности кухни в ресторане за выбранное окно.
         """
         cuisine_type = request.query_params.get("cuisine_type")
         if not cuisine_type:
@@ -68,7 +80,18 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                 status=status_code.HTTP_400_BAD_REQUEST,
             )
 
-        restaurants = self.queryset.filter(cuisine_types__name__icontains=cuisine_type)
+        window = request.query_params.get("window", DEFAULT_POPULARITY_WINDOW)
+        if window not in POPULARITY_WINDOWS:
+            return Response(
+                {"error": f"Допустимые окна: {', '.join(POPULARITY_WINDOWS)}."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        # Типов кухни немного: подходящие id находятся отдельно, без join по названию
+        cuisine_ids = list(
+            TypeCuisine.objects.filter(name__icontains=cuisine_type).values_list("pk", flat=True)
+        )
+        restaurants = self.restaurants_for_cuisines(cuisine_ids, window)
         restaurants = restaurants.prefetch_related("cuisine_types")  # Оптимизация
         page = self.paginate_queryset(restaurants)
         if page is not None:
@@ -78,6 +101,36 @@ class RestaurantViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(restaurants, many=True)
         return Response(serializer.data)
 
+    @staticmethod
+    def restaurants_for_cuisines(cuisine_ids, window=DEFAULT_POPULARITY_WINDOW):
+        """Рестораны с кухнями cuisine_ids по убыванию популярности за окно."""
+        field = "restaurant_cuisines__" + POPULARITY_WINDOWS[window][0]
+        if len(cuisine_ids) == 1:
+            # Одна кухня: порядок берётся из индекса (cuisine_type, -popularity)
+            return (
+                Restaurant.objects.filter(restaurant_cuisines__cuisine_type_id=cuisine_ids[0])
+                .annotate(cuisine_popularity=F(field))
+                .order_by("-cuisine_popularity", "pk")
+            )
+        return (
+            Restaurant.objects.filter(restaurant_cuisines__cuisine_type_id__in=cuisine_ids)
+            .annotate(cuisine_popularity=Max(field))
+            .order_by("-cuisine_popularity", "pk")
+        )
+
+    @swagger_auto_schema(operation_summary="Счётчики попаданий и промахов кэша меню")
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="menu-cache-stats",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def get_menu_cache_stats(self, request):
+        """
+        Возвращает число попаданий и промахов кэша меню ресторанов.
+        """
+        return Response(menu_cache_stats())
+
     @swagger_auto_schema(operation_summary="Получить статистику блюд по ресторанам")
     @action(methods=["GET"], detail=False, url_path="menu-stats")
     def menu_stats(self, request):
@@ -85,21 +138,122 @@ class RestaurantViewSet(viewsets.ModelViewSet):
         Возвращает количество блюд и среднюю цену по каждому ресторану.
         """
         stats = (
-            MenuItem.objects.values("restaurant__id", "restaurant__name")
-            .annotate(
-                total_items=Count("id"),
-                average_price=Avg("price"),
-            )
-            .order_by("-total_items")
+            RestaurantMenuStats.objects.filter(item_count__gt=0)
+            .select_related("restaurant")
+            .order_by("-item_count")
+        )
+        return Response(
+            [
+                {
+                    "restaurant__id": row.restaurant_id,
+                    "restaurant__name": row.restaurant.name,
+                    "total_items": row.item_count,
+                    "average_price": average_price(row.price_sum, row.item_count),
+                }
+                for row in stats
+            ]
         )
-        return Response(stats)
+
+
+    @swagger_auto_schema(
+        operation_summary="Рестораны рядом с точкой",
+        manual_parameters=[
+            openapi.Parameter(
+                "lat", openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description="Широта"
+            ),
+            openapi.Parameter(
+                "lon", openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description="Долгота"
+            ),
+            openapi.Parameter(
+                "user_id",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="ID пользователя: точкой служит его адрес (вместо lat/lon)",
+            ),
+            openapi.Parameter(
+                "radius",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_NUMBER,
+                description="Радиус в километрах",
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="Максимальное количество ресторанов",
+            ),
+        ],
+    )
+    @action(methods=["GET"], detail=False, url_path="nearby")
+    def nearby(self, request):
+        """
+        Возвращает рестораны в радиусе от точки по возрастанию расстояния.
+        Поиск идёт по сетке координат в памяти, из базы читается только ответ.
+        """
+        params = request.query_params
+        max_radius = getattr(settings, "GEO_MAX_RADIUS_KM", 50)
+        try:
+            radius = float(params.get("radius", getattr(settings, "GEO_DEFAULT_RADIUS_KM", 3)))
+            limit = int(params.get("limit", getattr(settings, "GEO_NEARBY_LIMIT", 20)))
+            if params.get("user_id"):
+                lat, lon = (
+                    User.objects.filter(pk=int(params["user_id"]))
+                    .values_list("latitude", "longitude")
+                    .get()
+                )
+            else:
+                lat, lon = float(params["lat"]), float(params["lon"])
+        except User.DoesNotExist:
+            return Response(
+                {"error": "Пользователь не найден."}, status=status_code.HTTP_404_NOT_FOUND
+            )
+        except KeyError:
+            return Response(
+                {"error": "Укажите параметры 'lat' и 'lon' или 'user_id'."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+        except ValueError:
+            return Response(
+                {"error": "Параметры 'lat', 'lon', 'radius' и 'limit' должны быть числами."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        if lat is None or lon is None:
+            return Response(
+                {"error": "У пользователя не определены координаты адреса."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return Response(
+                {"error": "Координаты вне допустимого диапазона."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+        if not 0 < radius <= max_radius:
+            return Response(
+                {"error": f"Радиус должен быть от 0 до {max_radius} км."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+        limit = min(max(limit, 1), getattr(settings, "GEO_NEARBY_MAX_LIMIT", 100))
+
+        found = geo.nearby_restaurants(lat, lon, radius, limit)
+        restaurants = Restaurant.objects.in_bulk([item.restaurant_id for item in found])
+        results = []
+        for item in found:
+            restaurant = restaurants.get(item.restaurant_id)
+            if restaurant is None:
+                continue
+            data = self.get_serializer(restaurant).data
+            data["distance_km"] = round(item.distance_km, 3)
+            results.append(data)
+        return Response(results)
 
 
 class MenuItemViewSet(viewsets.ModelViewSet):
     queryset = MenuItem.objects.select_related("restaurant").all()  # Оптимизация
     serializer_class = MenuItemSerializer
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [IndexedSearchFilter]
     search_fields = ["name", "description"]
+    search_index_kind = search.MENU_ITEM
     pagination_class = StandardResultsSetPagination
 
     @swagger_auto_schema(operation_summary="Получить список блюд")
@@ -120,18 +274,20 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         """
         Возвращает статистику: средняя цена и общее количество блюд.
         """
-        stats = self.queryset.aggregate(
-            average_price=Avg("price"), total_items=Count("id")
+        stats = RestaurantMenuStats.objects.aggregate(
+            price_sum=Sum("price_sum"), total_items=Sum("item_count")
         )
+        total_items = stats["total_items"] or 0
         return Response(
             {
-                "average_price": stats["average_price"],
-                "total_items": stats["total_items"],
+                "average_price": average_price(stats["price_sum"], total_items),
+                "total_items": total_items,
             }
         )
 
     @swagger_auto_schema(
         operation_summary="Получить блюда по ресторану",
+        responses={200: MenuCardItemSerializer(many=True)},
         manual_parameters=[
             openapi.Parameter(
                 "restaurant_id",
@@ -153,8 +309,74 @@ class MenuItemViewSet(viewsets.ModelViewSet):
                 status=status_code.HTTP_400_BAD_REQUEST,
             )
 
-        menu_items = self.queryset.filter(restaurant__id=restaurant_id)
-        menu_items = menu_items.select_related("restaurant")  # Оптимизация
+        try:
+            restaurant_id = int(restaurant_id)
+        except ValueError:
+            return Response(
+                {"error": "Параметр 'restaurant_id' должен быть числом."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        # Курсорной пагинации нужен queryset, поэтому она идёт мимо кэша
+        if self.paginator.cursor_query_param in request.query_params:
+            menu_items = self.queryset.filter(restaurant__id=restaurant_id).defer(
+                *MenuItem.ORDER_COUNT_FIELDS
+            )
+        else:
+            menu_items = get_menu(restaurant_id).items
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(menu_items)
+        if page is not None:
+            serializer = MenuCardItemSerializer(page, many=True, context=context)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = MenuCardItemSerializer(menu_items, many=True, context=context)
+        return Response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_summary="Популярные блюда по числу заказов",
+        manual_parameters=[
+            openapi.Parameter(
+                "window",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=tuple(dish_popularity.WINDOWS),
+                description=f"Окно рейтинга (по умолчанию {dish_popularity.DEFAULT_WINDOW})",
+            ),
+            openapi.Parameter(
+                "restaurant_id",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="ID ресторана (без него — по всем ресторанам)",
+            ),
+        ],
+    )
+    @action(methods=["GET"], detail=False, url_path="popular")
+    def popular(self, request):
+        """
+        Возвращает доступные блюда по убыванию числа позиций заказов за окно:
+        за всё время, 24 часа, 7 или 30 дней, по всем ресторанам или в одном.
+        """
+        window = request.query_params.get("window", dish_popularity.DEFAULT_WINDOW)
+        if window not in dish_popularity.WINDOWS:
+            return Response(
+                {"error": f"Допустимые окна: {', '.join(dish_popularity.WINDOWS)}."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        restaurant_id = request.query_params.get("restaurant_id")
+        if restaurant_id is not None:
+            try:
+                restaurant_id = int(restaurant_id)
+            except ValueError:
+                return Response(
+                    {"error": "Параметр 'restaurant_id' должен быть числом."},
+                    status=status_code.HTTP_400_BAD_REQUEST,
+                )
+
+        menu_items = dish_popularity.top_dishes(window, restaurant_id).select_related(
+            "restaurant"
+        )
         page = self.paginate_queryset(menu_items)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -228,5 +450,229 @@ class MenuItemViewSet(viewsets.ModelViewSet):
                 status=status_code.HTTP_400_BAD_REQUEST,
             )
 
-        items = self.queryset.filter(restaurant_id=restaurant_id).values_list("name", "price")
-        return Response(list(items))
+        try:
+            restaurant_id = int(restaurant_id)
+        except ValueError:
+            return Response(
+                {"error": "Параметр 'restaurant_id' должен быть числом."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        items = [(item.name, item.price) for item in get_menu(restaurant_id).items]
+        return Response(items)
+
+    @swagger_auto_schema(
+        operation_summary="Потоковая выгрузка блюд в CSV, NDJSON или XLSX",
+        manual_parameters=[
+            openapi.Parameter(
+                "file_format",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=EXPORT_FORMATS,
+                description="Формат файла (по умолчанию csv)",
+            ),
+            openapi.Parameter(
+                "restaurant_id",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="ID ресторана",
+            ),
+        ],
+    )
+    @action(methods=["GET"], detail=False, url_path="export")
+    def export_menu_items(self, request):
+        """
+        Выгружает блюда построчно, не загружая таблицу в память целиком.
+        Колонки и подписи совпадают с MenuItemResource.
+        """
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Допустимые форматы: {', '.join(EXPORT_FORMATS)}."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        menu_items = MenuItem.objects.all()
+        restaurant_id = request.query_params.get("restaurant_id")
+        if restaurant_id:
+            try:
+                menu_items = menu_items.filter(restaurant_id=int(restaurant_id))
+            except ValueError:
+                return Response(
+                    {"error": "Параметр 'restaurant_id' должен быть числом."},
+                    status=status_code.HTTP_400_BAD_REQUEST,
+                )
+        return export_response(MENU_ITEM_EXPORT, menu_items, file_format)
+
+    @swagger_auto_schema(
+        operation_summary="Импорт меню ресторана из CSV или XLSX",
+        manual_parameters=[
+            openapi.Parameter(
+                "file",
+                openapi.IN_FORM,
+                type=openapi.TYPE_FILE,
+                required=True,
+                description="Файл .csv или .xlsx с колонками name, price, description, is_available",
+            ),
+            openapi.Parameter(
+                "restaurant_id",
+                openapi.IN_FORM,
+                type=openapi.TYPE_INTEGER,
+                required=True,
+                description="ID ресторана",
+            ),
+        ],
+        responses={
+            200: openapi.Response("Меню обновлено"),
+            207: openapi.Response("Часть строк не прошла валидацию"),
+            400: openapi.Response("Ни одна строка не импортирована"),
+        },
+    )
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_menu_items(self, request):
+        """
+        Сверяет файл с текущим меню ресторана по названию блюда: новые блюда
+        добавляются, изменённые обновляются пачками. Возвращает ошибки по строкам.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "Параметр 'file' обязателен."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            restaurant = Restaurant.objects.get(pk=int(request.data.get("restaurant_id")))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Параметр 'restaurant_id' должен быть числом."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+        except Restaurant.DoesNotExist:
+            return Response(
+                {"error": "Ресторан не найден."},
+                status=status_code.HTTP_404_NOT_FOUND,
+            )
+
+        user = request.user if request.user.is_authenticated else None
+        try:
+            result = import_menu(
+                restaurant.pk, iter_file_rows(upload, upload.name), user=user
+            )
+        except MenuImportError as exc:
+            return Response({"error": str(exc)}, status=status_code.HTTP_400_BAD_REQUEST)
+
+        imported = result.created + result.updated + result.unchanged
+        if result.errors and not imported:
+            response_status = status_code.HTTP_400_BAD_REQUEST
+        elif result.errors:
+            response_status = status_code.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status_code.HTTP_200_OK
+        return Response(
+            {
+                "created": result.created,
+                "updated": result.updated,
+                "unchanged": result.unchanged,
+                "failed": len(result.errors),
+                "errors": result.errors,
+            },
+            status=response_status,
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Массово изменить доступность блюд",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["is_available"],
+            properties={
+                "is_available": openapi.Schema(
+                    type=openapi.TYPE_BOOLEAN, description="Новое значение доступности"
+                ),
+                "ids": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                    description="ID блюд (если не заданы, применяются фильтры)",
+                ),
+                "filters": openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    description="restaurant (ID или список ID) и/или name (название блюда)",
+                ),
+            },
+        ),
+        responses={
+            200: openapi.Response("ID и количество изменённых блюд"),
+            400: openapi.Response("Ошибка валидации данных"),
+        },
+    )
+    @action(methods=["POST"], detail=False, url_path="availability")
+    def change_availability(self, request):
+        """
+        Включает или выключает блюда из списка ids или подходящие под фильтры
+        (ресторан и название) пачками, без сохранения каждого блюда отдельно.
+        """
+        is_available = request.data.get("is_available")
+        if not isinstance(is_available, bool):
+            return Response(
+                {"error": "Параметр 'is_available' должен быть булевым значением."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        ids = request.data.get("ids")
+        filters = request.data.get("filters") or {}
+        user = request.user if request.user.is_authenticated else None
+        try:
+            if ids is not None:
+                if not isinstance(ids, list):
+                    raise ValueError
+                result = set_availability_for_ids(
+                    [int(pk) for pk in ids], is_available, user=user
+                )
+            else:
+                if not isinstance(filters, dict):
+                    raise ValueError
+                menu_items = self.filter_menu_items(filters)
+                if menu_items is None:
+                    return Response(
+                        {"error": "Укажите 'ids' или фильтры 'restaurant' и/или 'name'."},
+                        status=status_code.HTTP_400_BAD_REQUEST,
+                    )
+                result = set_availability(menu_items, is_available, user=user)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Параметры 'ids' и 'filters' заданы неверно."},
+                status=status_code.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {
+                "is_available": is_available,
+                "updated_count": len(result.updated_ids),
+                "updated_ids": result.updated_ids,
+                "skipped_count": len(result.skipped_ids),
+                "skipped_ids": result.skipped_ids,
+                "restaurant_ids": result.restaurant_ids,
+            }
+        )
+
+    @staticmethod
+    def filter_menu_items(filters):
+        """Блюда по фильтрам restaurant и name; None, если не задан ни один фильтр."""
+        restaurant = filters.get("restaurant")
+        name = filters.get("name")
+        if restaurant in (None, "", []) and not name:
+            return None
+
+        menu_items = MenuItem.objects.all()
+        if restaurant not in (None, "", []):
+            if not isinstance(restaurant, list):
+                restaurant = [restaurant]
+            menu_items = menu_items.filter(restaurant_id__in=[int(pk) for pk in restaurant])
+        if name:
+            menu_items = menu_items.filter(name__iexact=str(name).strip())
+        return menu_items
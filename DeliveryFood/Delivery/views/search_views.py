@@ -0,0 +1,52 @@
+from django.conf import settings
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions, viewsets, status as status_code
+from rest_framework.response import Response
+
+from ..services.autocomplete import autocomplete
+
+
+class AutocompleteViewSet(viewsets.ViewSet):
+    """
+    Подсказки при наборе из префиксного индекса в памяти процесса, без запросов к базе.
+    """
+
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    @swagger_auto_schema(
+        operation_summary="Подсказки ресторанов, блюд и типов кухни по префиксу",
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Начало названия или слова в названии",
+                required=True,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="Количество подсказок каждого вида",
+            ),
+        ],
+    )
+    def list(self, request):
+        """
+        Возвращает до limit ресторанов, доступных блюд и типов кухни, название
+        или слово названия которых начинается с q.
+        """
+        query = request.query_params.get("q", "")
+        limit = request.query_params.get("limit")
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return Response(
+                    {"error": "Параметр 'limit' должен быть числом."},
+                    status=status_code.HTTP_400_BAD_REQUEST,
+                )
+            limit = max(1, min(limit, getattr(settings, "AUTOCOMPLETE_MAX_LIMIT", 20)))
+        return Response(autocomplete(query, limit))
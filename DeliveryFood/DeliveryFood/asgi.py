@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "DeliveryFood.settings")
 
 application = get_asgi_application()
+
+# Индексы в памяти процесса строятся в фоне, пока процесс ждёт первых запросов
+from Delivery.services.versioned_index import warm_all_in_background  # noqa: E402
+
+warm_all_in_background()
@@ -91,12 +91,23 @@ SWAGGER_SETTINGS = {
 
 ROOT_URLCONF = "DeliveryFood.urls"
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],  # Глобальная папка для шаблонов, если требуется
-        'APP_DIRS': True,  # Включает автоматический поиск шаблонов в папках приложений
         'OPTIONS': {
+            # Шаблоны ищутся в DIRS и в папках приложений. Вне DEBUG скомпилированные
+            # шаблоны кэшируются в памяти процесса и не перечитываются с диска
+            'loaders': (
+                TEMPLATE_LOADERS
+                if DEBUG
+                else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -156,6 +167,8 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Закрытые файлы (выгрузки заказов): вне MEDIA_ROOT, отдаются только через админку
+PRIVATE_MEDIA_ROOT = BASE_DIR / "private"
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -165,4 +178,138 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 DEBUG_TOOLBAR_CONFIG = {
     'SHOW_COLLAPSED': True,
     'SHOW_TOOLBAR_CALLBACK': lambda request: True,
-}
\ No newline at end of file
+}
+
+# Celery
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+CELERY_TASK_ALWAYS_EAGER = os.environ.get("CELERY_TASK_ALWAYS_EAGER", "") == "1"
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    "sweep-overdue-orders": {
+        "task": "Delivery.tasks.sweep_overdue_orders_task",
+        "schedule": 60.0,  # Раз в минуту
+    },
+    "rollup-cuisine-popularity": {
+        "task": "Delivery.tasks.rollup_cuisine_popularity_task",
+        "schedule": 300.0,  # Раз в пять минут
+    },
+    "refresh-dish-popularity": {
+        "task": "Delivery.tasks.refresh_dish_popularity_task",
+        "schedule": 300.0,  # Раз в пять минут
+    },
+    "dispatch-couriers": {
+        "task": "Delivery.tasks.dispatch_couriers_task",
+        "schedule": 10.0,  # Каждые десять секунд
+    },
+    "prune-courier-tracks": {
+        "task": "Delivery.tasks.prune_courier_tracks_task",
+        "schedule": 3600.0,  # Раз в час
+    },
+}
+
+# Пересчёт стоимости заказов при смене цены блюда
+REPRICING_DEFERRED = os.environ.get("REPRICING_DEFERRED", "") == "1"  # в фоне через Celery
+REPRICING_CHUNK_SIZE = 500  # Количество заказов в одном UPDATE
+
+# Максимальное количество заказов в одном запросе POST /api/orders/bulk/
+BULK_ORDERS_MAX_SIZE = 500
+
+# Количество заказов в одной транзакции при массовой смене статуса
+ORDER_STATUS_CHUNK_SIZE = 500
+
+# Количество блюд в одной транзакции при массовом переключении доступности
+MENU_AVAILABILITY_CHUNK_SIZE = 500
+
+# Через сколько минут незавершённый заказ считается просроченным
+ORDER_OVERDUE_AFTER_MINUTES = 60
+ORDER_OVERDUE_CHUNK_SIZE = 1000
+
+# Количество строк, читаемых из базы за один раз при потоковой выгрузке
+EXPORT_CHUNK_SIZE = 2000
+
+# Количество блюд в одной пачке bulk_create/bulk_update при импорте меню
+MENU_IMPORT_BATCH_SIZE = 500
+
+# Фоновая выгрузка заказов в PDF: заказов в одной пачке
+PDF_EXPORT_CHUNK_SIZE = 500
+
+# Кэши: меню ресторанов хранится в Redis, если задан REDIS_CACHE_URL, иначе в памяти процесса
+REDIS_CACHE_URL = os.environ.get("REDIS_CACHE_URL", "")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "menu": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+            "KEY_PREFIX": "delivery",
+        }
+        if REDIS_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "menu",
+        }
+    ),
+}
+MENU_CACHE_ALIAS = "menu"
+MENU_CACHE_TIMEOUT = 60 * 60  # Страховка: актуальность обеспечивает версия меню
+
+# Полнотекстовый поиск: "sqlite" (FTS5) или "postgres" (tsvector + pg_trgm); пусто — по СУБД
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "")
+
+# Подсказки при наборе: объектов каждого вида в ответе и частота сверки версии индекса
+AUTOCOMPLETE_LIMIT = 5
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_REFRESH_SECONDS = 5
+AUTOCOMPLETE_CACHE_ALIAS = MENU_CACHE_ALIAS  # Общий для процессов (Redis в docker-compose)
+
+# Уменьшенные копии изображений (WebP и JPEG): ширины в пикселях, качество сжатия
+# и кэш со списком готовых копий (общий для процессов, как и кэш меню)
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANTS_CACHE_ALIAS = MENU_CACHE_ALIAS
+
+# Геокодер адресов: путь к функции address -> (широта, долгота) или None.
+# По умолчанию — офлайн-заглушка, раскладывающая адреса по GEOCODER_STUB_BBOX
+GEOCODER = os.environ.get("GEOCODER", "Delivery.services.geo.stub_geocoder")
+GEOCODER_STUB_BBOX = (55.55, 37.35, 55.92, 37.85)
+
+# Поиск ресторанов рядом: размер ячейки сетки в градусах, ограничения запроса
+# и частота сверки версии сетки с другими процессами
+GEO_GRID_CELL_DEGREES = 0.01  # Около 1 км по широте
+GEO_DEFAULT_RADIUS_KM = 3
+GEO_MAX_RADIUS_KM = 50
+GEO_NEARBY_LIMIT = 20
+GEO_NEARBY_MAX_LIMIT = 100
+GEO_INDEX_REFRESH_SECONDS = 5
+GEO_CACHE_ALIAS = MENU_CACHE_ALIAS
+
+# Кэш фрагментов шаблонов (главная, карточки ресторанов, страница блюда): актуальность
+# обеспечивают версии данных, время жизни — страховка. Пока один процесс перестраивает
+# фрагмент (не дольше FRAGMENT_CACHE_LOCK_SECONDS), остальные отдают прежний вариант
+FRAGMENT_CACHE_ALIAS = MENU_CACHE_ALIAS
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+FRAGMENT_CACHE_LOCK_SECONDS = 10
+
+# Автоматическое назначение курьеров: статусы готовых к выдаче заказов, самых старых
+# заказов в одной пачке, предельное расстояние до ресторана, поправка на дороги
+# к расстоянию по прямой и скорость по типу транспорта (км/ч)
+DISPATCH_READY_STATUSES = ("preparing",)
+DISPATCH_MAX_ORDERS = 1000
+DISPATCH_MAX_PICKUP_KM = 10
+DISPATCH_ROUTE_FACTOR = 1.3
+DISPATCH_SPEED_KMH = {"bike": 15, "scooter": 25, "car": 30}
+DISPATCH_LOCK_SECONDS = 60  # Не дольше стольких секунд такт держит блокировку
+DISPATCH_CACHE_ALIAS = MENU_CACHE_ALIAS
+
+# Отметки GPS курьеров: максимум отметок в одном запросе, последних отметок курьера
+# в буфере процесса, период записи буфера в базу, шаг прореживания трека и срок
+# хранения точек трека
+COURIER_LOCATION_MAX_BATCH = 1000
+COURIER_LOCATION_BUFFER_SIZE = 120
+COURIER_LOCATION_FLUSH_SECONDS = 5
+COURIER_LOCATION_BATCH_SIZE = 1000  # Строк в одном INSERT/UPDATE при записи буфера
+COURIER_TRACK_SAMPLE_SECONDS = 15
+COURIER_TRACK_RETENTION_DAYS = 30
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "DeliveryFood.settings")
 
 application = get_wsgi_application()
+
+# Индексы в памяти процесса строятся в фоне, пока процесс ждёт первых запросов
+from Delivery.services.versioned_index import warm_all_in_background  # noqa: E402
+
+warm_all_in_background()